@@ -1,102 +1,172 @@
-import copy
+import bisect
+import sys
+import threading
 
 from automint.utils import convert_from_hex
-from automint.utils.utils import convert_to_hex
+from automint.utils.utils import convert_to_hex, split_token_id
+
+
+def _new_token_entry(token_id, quantity):
+    policy_id, token = split_token_id(token_id)
+    return {
+        'name': token,
+        'policy_id': policy_id,
+        'quantity': quantity
+    }
+
+
+class _TokenLog(object):
+    '''Token dictionary followed by a log of changes, shared by a chain of
+    Accounts derived from one another. An Account sees the dictionary
+    with the first `seq` changes applied.'''
+    __slots__ = ('base', 'changes', 'positions', 'lock')
+
+    def __init__(self, base):
+        self.base = base
+        self.changes = []
+        # Positions of the changes of each token in `changes`, ascending
+        self.positions = {}
+        self.lock = threading.Lock()
+
+    def entry(self, token_id, seq):
+        positions = self.positions.get(token_id)
+        if positions:
+            i = bisect.bisect_left(positions, seq)
+            if i > 0:
+                return self.changes[positions[i - 1]][1]
+        return self.base.get(token_id)
+
+    def append(self, seq, token_id, entry):
+        '''Append a change after the first `seq` changes, returns False if
+        the log already continues past `seq`'''
+        with self.lock:
+            if seq != len(self.changes):
+                return False
+            self.positions.setdefault(token_id, []).append(seq)
+            self.changes.append((token_id, entry))
+            return True
+
+    def materialize(self, seq):
+        native_tokens = dict(self.base)
+        for token_id, entry in self.changes[:seq]:
+            if entry is None:
+                native_tokens.pop(token_id, None)
+            else:
+                native_tokens[token_id] = entry
+        return native_tokens
 
 
 class Account(object):
     '''The Account class is used to keep track of a set of tokens and
     supports arithmetic on the tokens.
 
+    Accounts are immutable, every operation returns a new Account. A
+    per-token operation does not copy the token dictionary: Accounts
+    derived from one another share a log of the changed entries, and
+    the dictionary of an Account is only rebuilt when its tokens are read
+    as a whole, or once the log grows longer than the dictionary. Use
+    `AccountBuilder` to accumulate many changes in place before producing
+    an Account.
+
     '''
     def __init__(self):
         self.lovelace = 0
-        self.native_tokens = {}
-
-    def add_native_token(self, token_id, quantity):
-        assert quantity > 0
+        self._tokens = {}
+        # Set instead of `_tokens` while the tokens are only in a log
+        self._log = None
+        self._seq = 0
+        self._assets_str = None
+
+    @classmethod
+    def _from_parts(cls, lovelace, native_tokens, assets_str=None):
+        new_account = cls.__new__(cls)
+        new_account.lovelace = lovelace
+        new_account._tokens = native_tokens
+        new_account._log = None
+        new_account._seq = 0
+        new_account._assets_str = assets_str
+        return new_account
 
-        new_account = copy.deepcopy(self)
+    @classmethod
+    def _from_log(cls, lovelace, log, seq, assets_str=None):
+        new_account = cls._from_parts(lovelace, None, assets_str)
+        new_account._log = log
+        new_account._seq = seq
+        return new_account
 
-        if token_id not in new_account.native_tokens:
-            policy_id, token = token_id.split('.')
-            new_account.native_tokens[token_id] = {
-                'name': token,
-                'policy_id': policy_id,
-                'quantity': 0
-            }
+    @property
+    def native_tokens(self):
+        if self._tokens is None:
+            self._tokens = self._log.materialize(self._seq)
+        return self._tokens
 
-        new_account.native_tokens[token_id]['quantity'] += quantity
+    def _token_entry(self, token_id):
+        if self._tokens is not None:
+            return self._tokens.get(token_id)
+        return self._log.entry(token_id, self._seq)
 
+    def _with_lovelace(self, lovelace, assets_str):
+        new_account = Account._from_log(lovelace, self._log, self._seq, assets_str)
+        new_account._tokens = self._tokens
         return new_account
 
-    def remove_native_token(self, token_id, quantity):
-        assert quantity > 0
-
-        new_account = copy.deepcopy(self)
+    def _with_token_quantity(self, token_id, quantity):
+        '''Return a new Account with the quantity of `token_id` replaced,
+        only the changed entry is recorded'''
+        if quantity == 0:
+            entry = None
+        else:
+            entry = self._token_entry(token_id)
+            if entry is None:
+                entry = _new_token_entry(token_id, quantity)
+            else:
+                entry = dict(entry)
+                entry['quantity'] = quantity
+        token_id = sys.intern(token_id)
+
+        log, seq = self._log, self._seq
+        # Accounts continue the log they were derived from, unless another
+        # Account already did. The log is restarted once rebuilding the
+        # dictionary costs no more than the changes it holds.
+        if log is None or len(log.changes) > max(32, len(log.base)) or not log.append(seq, token_id, entry):
+            log, seq = _TokenLog(self.native_tokens), 0
+            log.append(seq, token_id, entry)
+
+        return Account._from_log(self.lovelace, log, seq + 1)
+
+    def _token_quantity(self, token_id):
+        entry = self._token_entry(token_id)
+        return 0 if entry is None else entry['quantity']
 
-        if token_id not in new_account.native_tokens:
-            policy_id, token = token_id.split('.')
-            new_account.native_tokens[token_id] = {
-                'name': token,
-                'policy_id': policy_id,
-                'quantity': 0
-            }
+    def add_native_token(self, token_id, quantity):
+        assert quantity > 0
 
-        new_account.native_tokens[token_id]['quantity'] -= quantity
+        return self._with_token_quantity(token_id, self._token_quantity(token_id) + quantity)
 
-        if new_account.native_tokens[token_id]['quantity'] == 0:
-            new_account.native_tokens.pop(token_id)
+    def remove_native_token(self, token_id, quantity):
+        assert quantity > 0
 
-        return new_account
+        return self._with_token_quantity(token_id, self._token_quantity(token_id) - quantity)
 
     def set_native_token(self, token_id, quantity):
         assert quantity > 0
 
-        new_account = copy.deepcopy(self)
-        policy_id, token = token_id.split('.')
-        new_account.native_tokens[token_id] = {
-            'name': token,
-            'policy_id': policy_id,
-            'quantity': quantity
-        }
-
-        if new_account.native_tokens[token_id]['quantity'] == 0:
-            new_account.native_tokens.pop(token_id)
-
-        return new_account
+        return self._with_token_quantity(token_id, quantity)
 
     def add_lovelace(self, quantity):
         assert quantity >= 0
 
-        new_account = copy.deepcopy(self)
-        new_account.lovelace += quantity
-
-        return new_account
+        return self._with_lovelace(self.lovelace + quantity, self._assets_str)
 
     def remove_lovelace(self, quantity):
         assert quantity >= 0
 
-        new_account = copy.deepcopy(self)
-        new_account.lovelace -= quantity
-
-        return new_account
+        return self._with_lovelace(self.lovelace - quantity, self._assets_str)
 
     def set_lovelace(self, quantity):
         assert quantity >= 0
 
-        new_account = copy.deepcopy(self)
-        new_account.lovelace = quantity
-
-        return new_account
-
-    def set_ada(self, quantity):
-        assert quantity >= 0
-
-        new_account = copy.deepcopy(self)
-        new_account.lovelace = quantity
-
-        return new_account
+        return self._with_lovelace(quantity, self._assets_str)
 
     def add_ada(self, quantity):
         return self.add_lovelace(int(quantity * 1000000))
@@ -107,18 +177,39 @@ class Account(object):
     def set_ada(self, quantity):
         return self.set_lovelace(int(quantity * 1000000))
 
-    def __str__(self):
-        assets = []
-        for token_id in sorted(self.native_tokens.keys()):
-            policy_id, ticker = token_id.split('.')
-            ticker_hex = convert_to_hex(ticker)
+    def format_native_tokens(self):
+        '''Return the native tokens formatted as `<qty> <policy_id>.<hex>`
+        joined by " + ", as expected by cardano-cli. The result is cached
+        as the Account never changes.'''
+        if self._assets_str is None:
+            assets = []
+            for token_id in sorted(self.native_tokens.keys()):
+                policy_id, ticker = split_token_id(token_id)
+                ticker_hex = convert_to_hex(ticker)
+
+                token_hex = f'{policy_id}.{ticker_hex}'
+                assets.append(f'{self.native_tokens[token_id]["quantity"]} {token_hex}')
+
+            self._assets_str = ' + '.join(assets)
 
-            token_hex = f'{policy_id}.{ticker_hex}'
-            assets.append(f'{self.native_tokens[token_id]["quantity"]} {token_hex}')
+        return self._assets_str
 
+    def format_value(self):
+        '''Return the value as a single cardano-cli argument, `<lovelace>`
+        followed by `+<assets>` if any. Unlike `__str__()`, the assets are
+        not quoted for a shell as commands are run without one.'''
         output = f'{self.lovelace}'
+        assets = self.format_native_tokens()
         if len(assets) != 0:
-            output += f'+"{" + ".join(assets)}"'
+            output += f'+{assets}'
+
+        return output
+
+    def __str__(self):
+        output = f'{self.lovelace}'
+        assets = self.format_native_tokens()
+        if len(assets) != 0:
+            output += f'+"{assets}"'
 
         return output
 
@@ -132,24 +223,40 @@ class Account(object):
         return self.lovelace / 1000000
 
     def get_native_token(self, token_id):
-        return self.native_tokens.get(token_id, 0)
+        '''Return copy of the entry of a native token, 0 if the Account
+        does not hold it'''
+        entry = self._token_entry(token_id)
+        return 0 if entry is None else dict(entry)
 
     def get_native_tokens(self):
-        return self.native_tokens
+        '''Return copy of the native token entries, the entries themselves
+        are shared between derived Accounts'''
+        return {token_id: dict(entry) for token_id, entry in self.native_tokens.items()}
 
     def duplicate(self):
-        new_account = copy.deepcopy(self)
-        return new_account
+        return Account._from_parts(self.lovelace, dict(self.native_tokens))
+
+    @classmethod
+    def sum(cls, accounts):
+        '''Return the total of an iterable of Accounts, accumulated in a
+        single pass'''
+        return AccountBuilder().merge_all(accounts).build()
+
+    def to_builder(self):
+        '''Return an AccountBuilder initialised with the contents of this
+        account'''
+        return AccountBuilder(self)
 
     def __add__(self, other_account):
-        new_account = Account()
-        new_account = new_account.add_lovelace(self.get_lovelace())
-        new_account = new_account.add_lovelace(other_account.get_lovelace())
-        for token_id in self.native_tokens.keys():
-            new_account = new_account.add_native_token(token_id, self.get_native_token(token_id)['quantity'])
-        for token_id in other_account.native_tokens.keys():
-            new_account = new_account.add_native_token(token_id, other_account.get_native_token(token_id)['quantity'])
-        return new_account
+        builder = self.to_builder()
+        builder.merge(other_account)
+        return builder.build()
+
+    def __radd__(self, other):
+        # Allows the builtin `sum()` to be used with its default start of 0
+        if other == 0:
+            return self
+        return NotImplemented
 
     def __eq__(self, other_account):
         # Check type
@@ -161,13 +268,147 @@ class Account(object):
             return False
 
         # Check native token quantities
+        if self.native_tokens.keys() != other_account.native_tokens.keys():
+            return False
+
         for token_id in self.native_tokens.keys():
-            if token_id not in other_account.native_tokens:
+            if self._token_quantity(token_id) != other_account._token_quantity(token_id):
                 return False
-            for attr in self.native_tokens[token_id].keys():
-                if attr not in other_account.native_tokens[token_id][attr]:
-                    return False
-                if self.native_tokens[token_id][attr] != other_account.native_tokens[token_id][attr]:
-                    return False
 
         return True
+
+
+class AccountBuilder(object):
+    '''Mutable counterpart of Account. All operations are applied in
+    place and `build()` returns an immutable Account snapshot.
+
+    The token dictionary is handed over to the built Account without
+    copying and is only copied again when the builder is next modified
+    (copy-on-write), so interleaving reads and writes stays cheap.
+
+    '''
+    def __init__(self, account=None):
+        if account is None:
+            self.lovelace = 0
+            self.native_tokens = {}
+        else:
+            self.lovelace = account.lovelace
+            self.native_tokens = account.native_tokens
+
+        # The token dictionary is shared with an Account whenever it
+        # was taken from or handed to one
+        self._shared = account is not None
+        self._account = account
+        self._assets_str = None
+
+    def _touch(self):
+        '''Prepare the builder for a modification of the native tokens'''
+        if self._shared:
+            self.native_tokens = dict(self.native_tokens)
+            self._shared = False
+        self._account = None
+        self._assets_str = None
+
+    def _touch_lovelace(self):
+        '''Prepare the builder for a modification of the lovelace only,
+        the formatted native tokens of the last build stay valid'''
+        if self._account is not None:
+            self._assets_str = self._account._assets_str
+        self._account = None
+
+    def _set_token_quantity(self, token_id, quantity):
+        self._touch()
+
+        if quantity == 0:
+            self.native_tokens.pop(token_id, None)
+        elif token_id in self.native_tokens:
+            entry = dict(self.native_tokens[token_id])
+            entry['quantity'] = quantity
+            self.native_tokens[token_id] = entry
+        else:
+            self.native_tokens[sys.intern(token_id)] = _new_token_entry(token_id, quantity)
+
+    def _token_quantity(self, token_id):
+        entry = self.native_tokens.get(token_id)
+        return 0 if entry is None else entry['quantity']
+
+    def add_native_token(self, token_id, quantity):
+        assert quantity > 0
+        self._set_token_quantity(token_id, self._token_quantity(token_id) + quantity)
+        return self
+
+    def remove_native_token(self, token_id, quantity):
+        assert quantity > 0
+        self._set_token_quantity(token_id, self._token_quantity(token_id) - quantity)
+        return self
+
+    def set_native_token(self, token_id, quantity):
+        assert quantity > 0
+        self._set_token_quantity(token_id, quantity)
+        return self
+
+    def add_lovelace(self, quantity):
+        assert quantity >= 0
+        self._touch_lovelace()
+        self.lovelace += quantity
+        return self
+
+    def remove_lovelace(self, quantity):
+        assert quantity >= 0
+        self._touch_lovelace()
+        self.lovelace -= quantity
+        return self
+
+    def set_lovelace(self, quantity):
+        assert quantity >= 0
+        self._touch_lovelace()
+        self.lovelace = quantity
+        return self
+
+    def add_ada(self, quantity):
+        return self.add_lovelace(int(quantity * 1000000))
+
+    def remove_ada(self, quantity):
+        return self.remove_lovelace(int(quantity * 1000000))
+
+    def set_ada(self, quantity):
+        return self.set_lovelace(int(quantity * 1000000))
+
+    def merge(self, other_account):
+        '''Add the contents of another Account (or AccountBuilder) in place'''
+        return self.merge_all([other_account])
+
+    def merge_all(self, accounts):
+        '''Add the contents of an iterable of Accounts (or AccountBuilders)
+        in place. Quantities are summed first so that each token entry
+        is only written once regardless of the number of accounts'''
+        lovelace = 0
+        quantities = {}
+        for account in accounts:
+            lovelace += account.lovelace
+            for token_id, entry in account.native_tokens.items():
+                quantities[token_id] = quantities.get(token_id, 0) + entry['quantity']
+
+        self._touch()
+        self.lovelace += lovelace
+        for token_id, quantity in quantities.items():
+            self._set_token_quantity(token_id, self._token_quantity(token_id) + quantity)
+
+        return self
+
+    def __iadd__(self, other_account):
+        return self.merge(other_account)
+
+    def get_lovelace(self):
+        return self.lovelace
+
+    def get_native_token(self, token_id):
+        entry = self.native_tokens.get(token_id)
+        return 0 if entry is None else dict(entry)
+
+    def build(self):
+        '''Return the current contents as an immutable Account'''
+        if self._account is None:
+            self._account = Account._from_parts(self.lovelace, self.native_tokens, self._assets_str)
+            self._shared = True
+        return self._account
@@ -1 +1,2 @@
 from .Account import Account
+from .Account import AccountBuilder
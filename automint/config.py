@@ -1,5 +1,8 @@
 # This must be either (1) the full file path to the cardano-cli
-# executable or (2) a valid command in the shell (ie `cardano-cli` is
-# working for most people)
+# executable or (2) the name of an executable on the PATH (ie
+# `cardano-cli` is working for most people). It is executed directly,
+# not through a shell.
 CARDANO_CLI = '/opt/cardano-node/cardano-cli'
 TESTNET_MAGIC_DEFAULT = '1097911063'
+# Maximum number of cardano-cli processes automint runs concurrently
+CARDANO_CLI_MAX_PROCESSES = 8
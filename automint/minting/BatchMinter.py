@@ -0,0 +1,363 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from automint.account import Account
+from automint.config import TESTNET_MAGIC_DEFAULT
+from automint.receivers import MintingReceiver, TxReceiver
+from automint.selection import LargestFirst
+from automint.utils import cbor
+from automint.utils.fees import PLACEHOLDER_FEE, estimate_tx_size, load_protocol_params, min_fee, min_utxo_lovelace
+from automint.utils.transaction import build_transaction, build_raw_transaction_native, encode_output
+from automint.utils.utils import sign_tx
+
+logger = logging.getLogger(__name__)
+
+
+class BatchTransaction(object):
+    '''One transaction of a batch, the tokens it mints and how far it got.
+
+    `status` is one of:
+        planned    not processed yet
+        failed     building or signing failed, nothing was submitted
+        signed     signed, submission pending
+        submitted  accepted by the node
+        rejected   submission failed, the transaction may still be on chain
+
+    '''
+    PLANNED = 'planned'
+    FAILED = 'failed'
+    SIGNED = 'signed'
+    SUBMITTED = 'submitted'
+    REJECTED = 'rejected'
+
+    def __init__(self, tx_name, tokens, inputs=(), status=PLANNED, signed_matx_path=None, error=None, tx_size=None):
+        self.tx_name = tx_name
+        self.tokens = list(tokens)
+        self.inputs = list(inputs)
+        # Estimated size of the signed transaction, known once planned
+        self.tx_size = tx_size
+        self.status = status
+        self.signed_matx_path = signed_matx_path
+        self.error = error
+
+    def to_json(self):
+        return {
+            'tx_name': self.tx_name,
+            'tokens': self.tokens,
+            'inputs': [utxo.get_utxo_identifier() for utxo in self.inputs],
+            'status': self.status,
+            'signed_matx_path': self.signed_matx_path,
+            'error': self.error
+        }
+
+    def __str__(self):
+        return f'{self.tx_name} ({len(self.tokens)} tokens): {self.status}'
+
+
+class BatchMinter(object):
+    '''Mints a large number of tokens of one policy in as few transactions
+    as possible.
+
+    Tokens are packed into transactions that stay under the maximum
+    transaction size of the protocol parameters (with metadata and both
+    signatures accounted for) and whose output, after the fee, still
+    holds its minimum lovelace (`coinsPerUTxOByte`), each transaction spending its own input
+    UTXOs from `payment_wallet` so that transactions are independent. The
+    inputs are leased in the wallet's SpendLedger until the transaction
+    is submitted, other builders sharing the ledger do not select them.
+    Transactions are then built, signed and submitted by `max_workers`
+    threads; every step is recorded in the journal (a JSON lines file) so
+    that an interrupted run is resumed by calling `mint()` again with the
+    same tokens: submitted tokens are skipped and signed transactions are
+    submitted again.
+
+    The minted tokens and the lovelace of the inputs less the fee are sent
+    to `receiver_address`, the payment wallet's address by default.
+
+    '''
+    def __init__(self, working_dir, payment_wallet, policy_wallet, policy_id, policy_script, protocol_params,
+                 receiver_address=None, invalid_after=None, max_workers=4, max_tokens_per_tx=None,
+                 lovelace_per_tx=5000000, selector=None, journal_path=None, progress=None,
+                 use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+        self.working_dir = working_dir
+        self.payment_wallet = payment_wallet
+        self.policy_wallet = policy_wallet
+        self.policy_id = policy_id
+        self.policy_script = policy_script
+
+        if isinstance(protocol_params, str):
+            protocol_params = load_protocol_params(protocol_params)
+        self.protocol_params = protocol_params
+
+        self.receiver_address = receiver_address if receiver_address is not None else payment_wallet.get_address()
+        self.invalid_after = invalid_after
+        self.max_workers = max_workers
+        self.max_tokens_per_tx = max_tokens_per_tx
+        self.lovelace_per_tx = lovelace_per_tx
+        self.selector = selector if selector is not None else LargestFirst()
+        self.journal_path = journal_path if journal_path is not None else os.path.join(working_dir, 'batch.journal')
+        self.progress = progress
+        self.use_testnet = use_testnet
+        self.testnet_magic = testnet_magic
+
+        self.signing_wallets = [payment_wallet]
+        if policy_wallet.get_skey_path() != payment_wallet.get_skey_path():
+            self.signing_wallets.append(policy_wallet)
+
+        self._journal_lock = threading.Lock()
+        self._tx_count = 0
+
+    def token_id(self, token_name):
+        return f'{self.policy_id}.{token_name}'
+
+    def read_journal(self):
+        '''Return the latest journal record of every transaction'''
+        records = {}
+        if not os.path.exists(self.journal_path):
+            return records
+
+        with open(self.journal_path, 'r') as f:
+            for line in f:
+                if line.strip() == '':
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Last line may be truncated by a crash
+                    logger.warning(f'Ignoring corrupt journal line in {self.journal_path}')
+                    continue
+                records[record['tx_name']] = record
+            f.close()
+
+        return records
+
+    def _record(self, transaction):
+        with self._journal_lock:
+            with open(self.journal_path, 'a') as f:
+                f.write(json.dumps(transaction.to_json()) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+
+    def _metadata(self, tokens, metadata):
+        token_metadata = {token: metadata[token] for token in tokens if metadata.get(token) is not None}
+        if len(token_metadata) == 0:
+            return None
+        return {'721': {self.policy_id: token_metadata}}
+
+    def _receivers(self, inputs, tokens):
+        tx_receiver = TxReceiver(self.receiver_address)
+        tx_receiver.account = Account.sum(utxo.get_account() for utxo in inputs)
+        minting_receiver = MintingReceiver()
+
+        for token in tokens:
+            tx_receiver.add_native_token(self.token_id(token), 1)
+            minting_receiver.add_native_token(self.token_id(token), 1)
+
+        return tx_receiver, minting_receiver
+
+    def _measure(self, inputs, tokens, metadata):
+        '''Return (size of the signed transaction, lovelace left in the
+        output after the fee, minimum lovelace of the output)'''
+        # The output keeps all the lovelace of the inputs, which takes at
+        # least as many bytes as the amount left after the fee
+        tx_receiver, minting_receiver = self._receivers(inputs, tokens)
+        tx_cbor = build_transaction(inputs, [tx_receiver], minting_receiver,
+                                    fee=PLACEHOLDER_FEE,
+                                    metadata=self._metadata(tokens, metadata),
+                                    invalid_after=self.invalid_after,
+                                    minting_script=self.policy_script)
+        tx_size = estimate_tx_size(tx_cbor, witness_count=len(self.signing_wallets))
+
+        output_lovelace = tx_receiver.get_lovelace() - min_fee(self.protocol_params, tx_size)
+        output_size = len(cbor.dumps(encode_output(tx_receiver)))
+
+        return tx_size, output_lovelace, min_utxo_lovelace(self.protocol_params, output_size)
+
+    def _next_tx_name(self, journal):
+        while True:
+            self._tx_count += 1
+            tx_name = f'batch-{self._tx_count:05}'
+            if tx_name not in journal:
+                return tx_name
+
+    def plan(self, tokens, metadata=None):
+        '''Split the tokens into transactions, selecting the inputs of each
+        transaction from the available UTXOs of the payment wallet (they
+        are leased to the transaction). Tokens recorded in the journal as
+        signed, submitted or rejected are left out. Returns list of
+        BatchTransaction.'''
+        metadata = metadata if metadata is not None else {}
+        max_tx_size = self.protocol_params['maxTxSize']
+
+        journal = self.read_journal()
+        done = set()
+        for record in journal.values():
+            if record['status'] != BatchTransaction.FAILED:
+                done.update(record['tokens'])
+
+        pending = [token for token in tokens if token not in done]
+        target = Account().add_lovelace(self.lovelace_per_tx)
+        utxos = self.payment_wallet.get_available_utxos()
+
+        transactions = []
+        try:
+            while len(pending) > 0:
+                tx_name = self._next_tx_name(journal)
+                inputs = self._lease_inputs(utxos, target, tx_name)
+                try:
+                    batch, tx_size = self._fill(inputs, pending, metadata, max_tx_size)
+                except Exception:
+                    self.payment_wallet.release_utxos(tx_name)
+                    raise
+                pending = pending[len(batch):]
+                transactions.append(BatchTransaction(tx_name, batch, inputs, tx_size=tx_size))
+        except Exception:
+            for transaction in transactions:
+                self.payment_wallet.release_utxos(transaction.tx_name)
+            raise
+
+        logger.info(f'Planned {len(transactions)} transactions minting {sum(len(tx.tokens) for tx in transactions)} tokens')
+
+        return transactions
+
+    def _lease_inputs(self, utxos, target, tx_name):
+        '''Select inputs from `utxos` and lease them to the transaction, the
+        selected UTXOs are removed from `utxos`'''
+        while True:
+            inputs = self.selector.select(utxos, target).get_inputs()
+            for utxo in inputs:
+                utxos.remove(utxo.get_utxo_identifier())
+
+            identifiers = [utxo.get_utxo_identifier() for utxo in inputs]
+            if self.payment_wallet.spend_ledger.lease(identifiers, tx_name):
+                return inputs
+            # Leased by another builder in the meantime, select again
+
+    def _fill(self, inputs, pending, metadata, max_tx_size):
+        '''Return (the first pending tokens which fit in one transaction,
+        size of the transaction)'''
+        limit = len(pending)
+        if self.max_tokens_per_tx is not None:
+            limit = min(limit, self.max_tokens_per_tx)
+
+        sizes = {}
+
+        def fits(count):
+            tx_size, output_lovelace, output_min_lovelace = self._measure(inputs, pending[:count], metadata)
+            sizes[count] = tx_size
+            return tx_size <= max_tx_size and output_lovelace >= output_min_lovelace
+
+        if not fits(1):
+            tx_size, output_lovelace, output_min_lovelace = self._measure(inputs, pending[:1], metadata)
+            if tx_size > max_tx_size:
+                raise Exception(f'Transaction minting token {pending[0]} exceeds maximum size of {max_tx_size} bytes')
+            raise Exception(f'Transaction minting token {pending[0]} leaves {output_lovelace} lovelace in its output '
+                            f'which is below the minimum of {output_min_lovelace}, increase lovelace_per_tx')
+
+        # Both bounds only get tighter with more tokens: double the count
+        # while it fits, then bisect between the last count that fits and
+        # the first that does not. Each check encodes the transaction once.
+        low, high = 1, None
+        while high is None and low < limit:
+            count = min(2 * low, limit)
+            if fits(count):
+                low = count
+            else:
+                high = count
+
+        while high is not None and high - low > 1:
+            count = (low + high) // 2
+            if fits(count):
+                low = count
+            else:
+                high = count
+
+        return pending[:low], sizes[low]
+
+    def resume(self):
+        '''Return the transactions of the journal which were signed but not
+        submitted'''
+        transactions = []
+        for record in self.read_journal().values():
+            if record['status'] == BatchTransaction.SIGNED and os.path.exists(record['signed_matx_path']):
+                transactions.append(BatchTransaction(record['tx_name'], record['tokens'],
+                                                     status=record['status'],
+                                                     signed_matx_path=record['signed_matx_path']))
+        return transactions
+
+    def _process(self, transaction, metadata):
+        if transaction.status == BatchTransaction.PLANNED:
+            tx_size = transaction.tx_size
+            if tx_size is None:
+                tx_size, _, _ = self._measure(transaction.inputs, transaction.tokens, metadata)
+            fee = min_fee(self.protocol_params, tx_size)
+
+            tx_receiver, minting_receiver = self._receivers(transaction.inputs, transaction.tokens)
+            tx_receiver.remove_lovelace(fee)
+            raw_matx_path = build_raw_transaction_native(self.working_dir,
+                                                         transaction.inputs,
+                                                         [tx_receiver],
+                                                         minting_receiver,
+                                                         fee=fee,
+                                                         metadata=self._metadata(transaction.tokens, metadata),
+                                                         invalid_after=self.invalid_after,
+                                                         minting_script=self.policy_script,
+                                                         tx_name=transaction.tx_name)
+
+            signed_matx_path = sign_tx(self.working_dir,
+                                       self.signing_wallets,
+                                       raw_matx_path,
+                                       use_testnet=self.use_testnet,
+                                       testnet_magic=self.testnet_magic)
+            if signed_matx_path == '':
+                raise Exception(f'Failed to sign transaction {transaction.tx_name}')
+
+            transaction.signed_matx_path = signed_matx_path
+            transaction.status = BatchTransaction.SIGNED
+            self._record(transaction)
+
+        if self.payment_wallet.submit_transaction(transaction.signed_matx_path, transaction.tx_name):
+            transaction.status = BatchTransaction.SUBMITTED
+        else:
+            transaction.status = BatchTransaction.REJECTED
+            transaction.error = 'Submission rejected'
+
+    def _run_one(self, transaction, metadata):
+        try:
+            self._process(transaction, metadata)
+        except Exception as e:
+            logger.error(f'Transaction {transaction.tx_name} failed: {e}')
+            if transaction.status == BatchTransaction.PLANNED:
+                transaction.status = BatchTransaction.FAILED
+                self.payment_wallet.release_utxos(transaction.tx_name)
+            transaction.error = str(e)
+
+        self._record(transaction)
+        return transaction
+
+    def run(self, transactions, metadata=None):
+        '''Build, sign and submit the transactions, returns them with their
+        final status'''
+        metadata = metadata if metadata is not None else {}
+        total = len(transactions)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._run_one, transaction, metadata) for transaction in transactions]
+            for completed, future in enumerate(as_completed(futures), start=1):
+                transaction = future.result()
+                logger.info(f'[{completed}/{total}] {transaction}')
+                if self.progress is not None:
+                    self.progress(transaction, completed, total)
+
+        return transactions
+
+    def mint(self, tokens, metadata=None):
+        '''Mint one of each token name in `tokens`, `metadata` maps token
+        names to their CIP-25 metadata. Resumes from the journal, returns
+        the transactions processed by this call.'''
+        transactions = self.resume() + self.plan(tokens, metadata)
+        return self.run(transactions, metadata)
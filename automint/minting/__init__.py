@@ -0,0 +1,2 @@
+from .BatchMinter import BatchTransaction
+from .BatchMinter import BatchMinter
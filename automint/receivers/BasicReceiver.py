@@ -1,51 +1,70 @@
 import copy
-from automint.account import Account
+from automint.account import AccountBuilder
 
 
 # The BasicReceiver class contains the minimal functionality for
-# artithmetic on token quantities
+# artithmetic on token quantities. Changes are accumulated in place in
+# an AccountBuilder, `get_account()` returns an immutable snapshot.
 class BasicReceiver(object):
     def __init__(self):
-        self.account = Account()
+        self._builder = AccountBuilder()
+
+    @property
+    def account(self):
+        return self._builder.build()
+
+    @account.setter
+    def account(self, account):
+        self._builder = AccountBuilder(account)
 
     def get_account(self):
         return self.account
 
     def add_ada(self, quantity):
-        self.account = self.account.add_ada(quantity)
+        self._builder.add_ada(quantity)
 
     def remove_ada(self, quantity):
-        self.account = self.account.remove_ada(quantity)
+        self._builder.remove_ada(quantity)
 
     def add_lovelace(self, quantity):
-        self.account = self.account.add_lovelace(quantity)
+        self._builder.add_lovelace(quantity)
 
     def remove_lovelace(self, quantity):
-        self.account = self.account.remove_lovelace(quantity)
+        self._builder.remove_lovelace(quantity)
 
     def add_native_token(self, token_id, quantity):
-        self.account = self.account.add_native_token(token_id, quantity)
+        self._builder.add_native_token(token_id, quantity)
 
     def remove_native_token(self, token_id, quantity):
-        self.account = self.account.remove_native_token(token_id, quantity)
+        self._builder.remove_native_token(token_id, quantity)
 
     def set_ada(self, quantity):
-        self.account = self.account.set_ada(quantity)
+        self._builder.set_ada(quantity)
 
     def set_native_token(self, token_id, quantity):
-        self.account = self.account.set_native_token(token_id, quantity)
+        self._builder.set_native_token(token_id, quantity)
 
     def duplicate(self):
-        return copy.deepcopy(self)
+        new_receiver = copy.copy(self)
+        new_receiver.account = self.account
+        return new_receiver
 
     def transfer_to(self, other_receiver):
         '''Transfer the convents of this receiver to another receiver,
         emptying this one'''
-        other_receiver.account = self.account + other_receiver.account
-        self.account = Account()
+        other_receiver += self
+        self._builder = AccountBuilder()
+
+    def __iadd__(self, other):
+        '''Add the contents of another receiver (or Account) to this
+        receiver in place'''
+        if isinstance(other, BasicReceiver):
+            other = other._builder
+        self._builder.merge(other)
+        return self
 
     def get_lovelace(self):
-        return self.account.get_lovelace()
+        return self._builder.get_lovelace()
 
     def get_native_token(self, token_id):
-        return self.account.get_native_token(token_id)
+        return self._builder.get_native_token(token_id)
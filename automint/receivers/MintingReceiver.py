@@ -1,8 +1,6 @@
 from automint.account import Account
 from automint.receivers import BasicReceiver
 
-from automint.utils import convert_to_hex
-
 
 # The MintingReceiver class is used to generate the string formatted
 # output for the `--mint` field. It should be used to keep track of
@@ -23,13 +21,9 @@ class MintingReceiver(BasicReceiver):
     def remove_lovelace(self, quantity):
         raise Exception('This method should not be called.')
 
+    def format_mint(self):
+        '''Return the `--mint` argument of cardano-cli'''
+        return self.get_account().format_native_tokens()
+
     def __str__(self):
-        assets = []
-        account = self.get_account()
-        for token_id in sorted(account.native_tokens.keys()):
-            policy_id, ticker = token_id.split('.')
-            ticker_hex = convert_to_hex(ticker)
-
-            token_hex = f'{policy_id}.{ticker_hex}'
-            assets.append(f'{account.native_tokens[token_id]["quantity"]} {token_hex}')
-        return f'"{" + ".join(assets)}"'
+        return f'"{self.get_account().format_native_tokens()}"'
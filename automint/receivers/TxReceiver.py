@@ -21,5 +21,9 @@ class TxReceiver(BasicReceiver):
         new_recevier.addr = addr
         return new_recevier
 
+    def format_tx_out(self):
+        '''Return the `--tx-out` argument of cardano-cli'''
+        return f'{self.addr}+{self.account.format_value()}'
+
     def __str__(self):
         return f'{self.addr}+{self.account}'
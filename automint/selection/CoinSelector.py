@@ -0,0 +1,240 @@
+import abc
+import random
+
+from automint.account import Account
+from automint.utxo import UTXOSet
+
+
+class Selection(object):
+    '''Result of a coin selection, the selected input UTXOs and the change
+    left over after paying for the target'''
+    def __init__(self, inputs, target):
+        self.inputs = inputs
+        self.total = Account.sum(utxo.get_account() for utxo in inputs)
+
+        change = self.total.to_builder()
+        change.remove_lovelace(target.get_lovelace())
+        for token_id, token in target.get_native_tokens().items():
+            change.remove_native_token(token_id, token['quantity'])
+        self.change = change.build()
+
+    def get_inputs(self):
+        return self.inputs
+
+    def get_change(self):
+        return self.change
+
+    def __len__(self):
+        return len(self.inputs)
+
+
+class CoinSelector(abc.ABC):
+    '''Base class of the coin selection strategies. A strategy selects a
+    set of UTXOs from a UTXOSet that covers a target Account (lovelace
+    and native tokens). Fees are not accounted for and should be
+    included in the lovelace of the target.'''
+    def __init__(self, max_inputs=None):
+        self.max_inputs = max_inputs
+
+    def select(self, utxos, target):
+        '''Return Selection covering `target` from `utxos` (a UTXOSet or an
+        iterable of UTXOs)'''
+        if not isinstance(utxos, UTXOSet):
+            utxos = UTXOSet(utxos)
+
+        for token_id, token in target.get_native_tokens().items():
+            assert token['quantity'] > 0, f'Target quantity of {token_id} must be positive'
+
+        inputs = self._select(utxos, target)
+
+        if self.max_inputs is not None and len(inputs) > self.max_inputs:
+            raise Exception(f'Selection requires {len(inputs)} inputs which exceeds the maximum of {self.max_inputs}')
+
+        return Selection(inputs, target)
+
+    @abc.abstractmethod
+    def _select(self, utxos, target):
+        '''Return the list of UTXOs from `utxos` selected to cover
+        `target`'''
+
+    @staticmethod
+    def _token_quantity(utxo, token_id):
+        token = utxo.get_account().get_native_token(token_id)
+        return 0 if token == 0 else token['quantity']
+
+
+class LargestFirst(CoinSelector):
+    '''Select the UTXOs holding the most of each required native token,
+    then the UTXOs holding the most lovelace, until the target is
+    covered. Results in few inputs and consolidates large UTXOs.'''
+    def _select(self, utxos, target):
+        selected = {}
+
+        for token_id, token in target.get_native_tokens().items():
+            quantity = token['quantity']
+            candidates = sorted(utxos.with_asset(token_id),
+                                key=lambda u: self._token_quantity(u, token_id),
+                                reverse=True)
+            covered = sum(self._token_quantity(u, token_id) for u in selected.values())
+            for utxo in candidates:
+                if covered >= quantity:
+                    break
+                if utxo.get_utxo_identifier() in selected:
+                    continue
+                selected[utxo.get_utxo_identifier()] = utxo
+                covered += self._token_quantity(utxo, token_id)
+
+            if covered < quantity:
+                raise Exception(f'Insufficient quantity of {token_id} to cover target')
+
+        lovelace = sum(utxo.get_lovelace() for utxo in selected.values())
+        for utxo in utxos.by_lovelace(descending=True):
+            if lovelace >= target.get_lovelace():
+                break
+            if utxo.get_utxo_identifier() in selected:
+                continue
+            selected[utxo.get_utxo_identifier()] = utxo
+            lovelace += utxo.get_lovelace()
+
+        if lovelace < target.get_lovelace():
+            raise Exception('Insufficient lovelace to cover target')
+
+        return list(selected.values())
+
+
+class RandomImprove(CoinSelector):
+    '''Random-improve selection as described in CIP-2. UTXOs are drawn at
+    random until each asset of the target is covered, then further
+    random UTXOs are added as long as they bring the selected amount
+    closer to twice the target without exceeding three times the
+    target. Produces change outputs of a useful size and so keeps the
+    UTXO set of the wallet healthy.'''
+    def __init__(self, max_inputs=None, seed=None):
+        super().__init__(max_inputs=max_inputs)
+        self.random = random.Random(seed)
+
+    def _draw(self, pool):
+        '''Remove and return a random element of pool in constant time'''
+        i = self.random.randrange(len(pool))
+        pool[i], pool[-1] = pool[-1], pool[i]
+        return pool.pop()
+
+    def _select(self, utxos, target):
+        selected = {}
+
+        # Native tokens first, then lovelace
+        assets = [(token_id, token['quantity']) for token_id, token in target.get_native_tokens().items()]
+        assets.append((None, target.get_lovelace()))
+
+        def amount(utxo, token_id):
+            if token_id is None:
+                return utxo.get_lovelace()
+            return self._token_quantity(utxo, token_id)
+
+        for token_id, quantity in assets:
+            if token_id is None:
+                pool = [u for u in utxos.values() if u.get_utxo_identifier() not in selected]
+            else:
+                pool = [u for u in utxos.with_asset(token_id) if u.get_utxo_identifier() not in selected]
+
+            # Selection phase
+            covered = sum(amount(u, token_id) for u in selected.values())
+            while covered < quantity:
+                if len(pool) == 0:
+                    raise Exception(f'Insufficient quantity of {token_id or "lovelace"} to cover target')
+                utxo = self._draw(pool)
+                selected[utxo.get_utxo_identifier()] = utxo
+                covered += amount(utxo, token_id)
+
+            # Improvement phase
+            ideal, maximum = 2 * quantity, 3 * quantity
+            while len(pool) > 0:
+                if self.max_inputs is not None and len(selected) >= self.max_inputs:
+                    break
+                utxo = self._draw(pool)
+                improved = covered + amount(utxo, token_id)
+                if improved > maximum or abs(ideal - improved) >= abs(ideal - covered):
+                    break
+                selected[utxo.get_utxo_identifier()] = utxo
+                covered = improved
+
+        return list(selected.values())
+
+
+class BranchAndBound(CoinSelector):
+    '''Search for a selection whose lovelace exceeds the target by at most
+    `tolerance` lovelace, so that no (or only a negligible) change output
+    is needed. UTXOs holding native tokens are selected largest first,
+    the remaining lovelace is found by a depth-first search over the
+    UTXOs without native tokens, bounded by `max_tries` steps. If no
+    exact match is found, the selection falls back to `fallback`.'''
+    def __init__(self, tolerance=0, max_tries=100000, fallback=None, max_inputs=None):
+        super().__init__(max_inputs=max_inputs)
+        self.tolerance = tolerance
+        self.max_tries = max_tries
+        self.fallback = fallback if fallback is not None else LargestFirst()
+
+    def _select(self, utxos, target):
+        token_inputs = []
+        if len(target.get_native_tokens()) != 0:
+            token_inputs = LargestFirst()._select(utxos, target.set_lovelace(0))
+
+        remaining = target.get_lovelace() - sum(u.get_lovelace() for u in token_inputs)
+        if remaining <= 0:
+            return token_inputs
+
+        selected_ids = {u.get_utxo_identifier() for u in token_inputs}
+        candidates = [u for u in utxos.by_lovelace(descending=True)
+                      if u.size() == 1 and u.get_utxo_identifier() not in selected_ids]
+
+        match = self._search([u.get_lovelace() for u in candidates], remaining)
+        if match is None:
+            return self.fallback._select(utxos, target)
+
+        return token_inputs + [candidates[i] for i in match]
+
+    def _search(self, values, target):
+        '''Return indices of `values` (sorted descending) summing to within
+        [target, target + tolerance], None if not found'''
+        upper = target + self.tolerance
+
+        # Suffix sums for pruning branches that cannot reach the target
+        remaining = [0] * (len(values) + 1)
+        for i in range(len(values) - 1, -1, -1):
+            remaining[i] = remaining[i + 1] + values[i]
+
+        if remaining[0] < target:
+            return None
+
+        # Iterative depth-first search, including values[i] is explored first
+        selection = []
+        total = 0
+        i = 0
+        tries = 0
+        while tries < self.max_tries:
+            tries += 1
+            backtrack = False
+            if total > upper or total + remaining[i] < target:
+                backtrack = True
+            elif total >= target:
+                return selection
+            elif i >= len(values):
+                backtrack = True
+
+            if backtrack:
+                if len(selection) == 0:
+                    return None
+                # Undo the last inclusion and explore its omission
+                last = selection.pop()
+                total -= values[last]
+                i = last + 1
+                # Skip equivalent values, omitting them leads to the same results
+                while i < len(values) and values[i] == values[last]:
+                    i += 1
+                continue
+
+            selection.append(i)
+            total += values[i]
+            i += 1
+
+        return None
@@ -0,0 +1,5 @@
+from .CoinSelector import Selection
+from .CoinSelector import CoinSelector
+from .CoinSelector import LargestFirst
+from .CoinSelector import RandomImprove
+from .CoinSelector import BranchAndBound
@@ -5,6 +5,8 @@ from .utils import write_policy_script_with_time_lock
 from .utils import get_policy_id
 from .utils import build_raw_transaction
 from .utils import sign_tx
+from .utils import witness_tx
+from .utils import assemble_tx
 from .utils import calculate_tx_fee
 from .utils import submit_transaction
 from .utils import get_return_address_from_utxo
@@ -14,5 +16,52 @@ from .utils import get_cli_version
 from .utils import query_tip
 from .utils import convert_from_hex
 from .utils import convert_to_hex
+from .utils import split_token_id
+from .utils import unique_tx_name
 
 from .metadata import validate_metadata
+from .metadata import validate_metadata_stream
+from .metadata import validate_metadata_files
+
+from .fees import calculate_min_fee
+from .fees import load_protocol_params
+
+from .transaction import build_transaction
+from .transaction import build_raw_transaction_native
+from .transaction import get_tx_id
+from .transaction import get_tx_id_from_file
+
+from .signing import sign_transaction
+from .signing import sign_tx_native
+from .signing import witness_tx_native
+from .signing import assemble_tx_native
+from .signing import sign_batch
+
+from .aio import get_protocol_params_async
+from .aio import build_raw_transaction_async
+from .aio import calculate_tx_fee_async
+from .aio import sign_tx_async
+from .aio import witness_tx_async
+from .aio import assemble_tx_async
+from .aio import submit_transaction_async
+from .aio import query_tip_async
+
+from .protocol import ProtocolParamsCache
+from .tip import TipProvider
+
+from .address import enterprise_address
+from .address import base_address
+from .address import generate_key_pair
+from .address import read_verification_key
+from .address import decode_address
+from .address import is_valid_address
+from .address import payment_credential
+from .address import stake_credential
+from .address import stake_address
+from .address import verification_key_hash
+
+from .policy import sig_script
+from .policy import time_locked_script
+from .policy import multisig_script
+from .policy import script_hash
+from .policy import PolicyRegistry
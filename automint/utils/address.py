@@ -0,0 +1,191 @@
+"""Shelley addresses (CIP-19) and the payment and stake keys behind them,
+derived, decoded and validated in-process instead of through `cardano-cli
+address build`, `address info` and `address key-hash`."""
+import functools
+import hashlib
+import os
+
+import nacl.signing
+
+from automint.utils import bech32
+from automint.utils import cbor
+from automint.utils.envelope import read_text_envelope, write_text_envelope
+
+MAINNET_ID = 1
+TESTNET_ID = 0
+
+# Address types of the header byte (upper 4 bits)
+BASE_ADDRESS = 0b0000
+POINTER_ADDRESS = 0b0100
+ENTERPRISE_ADDRESS = 0b0110
+REWARD_ADDRESS = 0b1110
+
+KEY_CREDENTIAL = 'key'
+SCRIPT_CREDENTIAL = 'script'
+POINTER_CREDENTIAL = 'pointer'
+
+HASH_SIZE = 28
+
+KEY_ENVELOPES = {
+    # (role, is signing key) -> (type, description)
+    ('payment', True): ('PaymentSigningKeyShelley_ed25519', 'Payment Signing Key'),
+    ('payment', False): ('PaymentVerificationKeyShelley_ed25519', 'Payment Verification Key'),
+    ('stake', True): ('StakeSigningKeyShelley_ed25519', 'Stake Signing Key'),
+    ('stake', False): ('StakeVerificationKeyShelley_ed25519', 'Stake Verification Key')
+}
+
+
+def key_hash(vkey):
+    '''Return the blake2b-224 hash of a verification key (bytes)'''
+    return hashlib.blake2b(vkey, digest_size=28).digest()
+
+
+@functools.lru_cache(maxsize=65536)
+def _verification_key_hash(vkey_path, mtime_ns):
+    return key_hash(read_verification_key(vkey_path)).hex()
+
+
+def verification_key_hash(vkey_path):
+    '''Return hex key hash of a `.vkey` file, as `cardano-cli address
+    key-hash`. Hashes are cached until the file is modified.'''
+    return _verification_key_hash(os.path.abspath(vkey_path), os.stat(vkey_path).st_mtime_ns)
+
+
+def read_verification_key(vkey_path):
+    '''Return the verification key (bytes) of a `.vkey` text envelope'''
+    envelope_type, _, key_cbor = read_text_envelope(vkey_path)
+    if 'VerificationKey' not in envelope_type:
+        raise Exception(f'{vkey_path} is not a verification key file ({envelope_type})')
+
+    vkey = cbor.loads(key_cbor)
+    # Extended keys hold the chain code after the key
+    return vkey[:32]
+
+
+def write_key_pair(skey_path, vkey_path, seed, vkey, role='payment'):
+    '''Write a key pair as the text envelopes of `cardano-cli address
+    key-gen` (or `stake-address key-gen` for the stake role)'''
+    write_text_envelope(skey_path, *KEY_ENVELOPES[(role, True)], cbor.dumps(seed))
+    write_text_envelope(vkey_path, *KEY_ENVELOPES[(role, False)], cbor.dumps(vkey))
+
+
+def generate_key_pair(skey_path, vkey_path, role='payment'):
+    '''Generate an Ed25519 key pair in-process and write it as the text
+    envelopes of cardano-cli, returns the verification key (bytes)'''
+    signing_key = nacl.signing.SigningKey.generate()
+    vkey = bytes(signing_key.verify_key)
+    write_key_pair(skey_path, vkey_path, bytes(signing_key), vkey, role=role)
+
+    return vkey
+
+
+def _network_id(use_testnet):
+    return TESTNET_ID if use_testnet else MAINNET_ID
+
+
+def _hrp(use_testnet):
+    return 'addr_test' if use_testnet else 'addr'
+
+
+def enterprise_address(payment_vkey, use_testnet=False):
+    '''Return bech32 enterprise address (no stake rights) of a payment
+    verification key, as built by `cardano-cli address build` given only
+    the payment verification key'''
+    header = ENTERPRISE_ADDRESS << 4 | _network_id(use_testnet)
+    return bech32.encode(_hrp(use_testnet), bytes([header]) + key_hash(payment_vkey))
+
+
+def base_address(payment_vkey, stake_vkey, use_testnet=False):
+    '''Return bech32 base address of a payment and a stake verification
+    key'''
+    header = BASE_ADDRESS << 4 | _network_id(use_testnet)
+    return bech32.encode(_hrp(use_testnet), bytes([header]) + key_hash(payment_vkey) + key_hash(stake_vkey))
+
+
+def _payment_hrp(network_id):
+    return 'addr' if network_id == MAINNET_ID else 'addr_test'
+
+
+def _stake_hrp(network_id):
+    return 'stake' if network_id == MAINNET_ID else 'stake_test'
+
+
+@functools.lru_cache(maxsize=65536)
+def decode_address(address):
+    '''Return (network id, address type, payment credential, stake
+    credential) of a bech32 Shelley address. Credentials are tuples
+    (`KEY_CREDENTIAL` or `SCRIPT_CREDENTIAL`, hash bytes), the stake
+    credential of a pointer address is (`POINTER_CREDENTIAL`, pointer
+    bytes) and None for enterprise addresses. The payment credential of a
+    reward (stake) address is None.
+
+    Raises an Exception if the address is not valid.'''
+    hrp, data = bech32.decode(address)
+    if len(data) < 1 + HASH_SIZE:
+        raise Exception(f'Invalid address {address}, too short')
+
+    address_type, network_id = data[0] >> 4, data[0] & 0x0f
+    if network_id not in (MAINNET_ID, TESTNET_ID):
+        raise Exception(f'Invalid address {address}, unknown network id {network_id}')
+
+    first = (SCRIPT_CREDENTIAL if address_type & 0b0001 else KEY_CREDENTIAL, data[1:1 + HASH_SIZE])
+    rest = data[1 + HASH_SIZE:]
+
+    if address_type <= 0b0011:
+        # Base address, payment and stake credentials
+        expected_hrp, size = _payment_hrp(network_id), 1 + 2 * HASH_SIZE
+        second = (SCRIPT_CREDENTIAL if address_type & 0b0010 else KEY_CREDENTIAL, rest)
+        credentials = (first, second)
+    elif address_type in (POINTER_ADDRESS, POINTER_ADDRESS | 1):
+        expected_hrp, size = _payment_hrp(network_id), len(data)
+        if not rest or rest[-1] & 0x80:
+            raise Exception(f'Invalid address {address}, malformed stake pointer')
+        credentials = (first, (POINTER_CREDENTIAL, rest))
+    elif address_type in (ENTERPRISE_ADDRESS, ENTERPRISE_ADDRESS | 1):
+        expected_hrp, size = _payment_hrp(network_id), 1 + HASH_SIZE
+        credentials = (first, None)
+    elif address_type in (REWARD_ADDRESS, REWARD_ADDRESS | 1):
+        expected_hrp, size = _stake_hrp(network_id), 1 + HASH_SIZE
+        credentials = (None, first)
+    else:
+        raise Exception(f'Invalid address {address}, unsupported address type {address_type}')
+
+    if hrp != expected_hrp:
+        raise Exception(f'Invalid address {address}, expected prefix {expected_hrp} for network id {network_id}')
+    if len(data) != size:
+        raise Exception(f'Invalid address {address}, expected {size} bytes but got {len(data)}')
+
+    return (network_id, address_type) + credentials
+
+
+def is_valid_address(address, use_testnet=None):
+    '''Return True if address is a valid bech32 Shelley address, of the
+    given network unless `use_testnet` is None'''
+    try:
+        network_id = decode_address(address)[0]
+    except Exception:
+        return False
+
+    return use_testnet is None or network_id == _network_id(use_testnet)
+
+
+def payment_credential(address):
+    '''Return payment credential (kind, hash bytes) of an address'''
+    return decode_address(address)[2]
+
+
+def stake_credential(address):
+    '''Return stake credential (kind, hash bytes) of an address, None for
+    enterprise addresses'''
+    return decode_address(address)[3]
+
+
+def stake_address(address):
+    '''Return bech32 reward (stake) address of the stake credential of a
+    base address, None if the address has no stake credential hash'''
+    network_id, _, _, credential = decode_address(address)
+    if credential is None or credential[0] == POINTER_CREDENTIAL:
+        return None
+
+    address_type = REWARD_ADDRESS | (1 if credential[0] == SCRIPT_CREDENTIAL else 0)
+    return bech32.encode(_stake_hrp(network_id), bytes([address_type << 4 | network_id]) + credential[1])
@@ -0,0 +1,86 @@
+"""asyncio counterparts of the cardano-cli utilities. Each coroutine
+builds the same command and returns the same result as the function of
+the same name without the `_async` suffix, with the process run through
+`CLIRunner.run_async()`."""
+from automint.config import TESTNET_MAGIC_DEFAULT
+from automint.utils.runner import get_runner
+from automint.utils.utils import _protocol_params_cmd, _protocol_params_result
+from automint.utils.utils import _build_raw_transaction_cmd, _build_raw_transaction_result
+from automint.utils.utils import _calculate_tx_fee_cmd, _calculate_tx_fee_result
+from automint.utils.utils import _sign_tx_cmd, _sign_tx_result
+from automint.utils.utils import _witness_tx_cmd, _witness_tx_result
+from automint.utils.utils import _assemble_tx_cmd, _assemble_tx_result
+from automint.utils.utils import _submit_transaction_cmd, _submit_transaction_result
+from automint.utils.utils import _query_tip_cmd, _query_tip_result
+
+
+async def get_protocol_params_async(working_dir, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+    """Query protocol parameters and write to file"""
+    cmd_builder, protocol_json_path = _protocol_params_cmd(working_dir, use_testnet, testnet_magic)
+
+    proc = await get_runner().run_async(cmd_builder)
+
+    return _protocol_params_result(proc, protocol_json_path)
+
+
+async def build_raw_transaction_async(working_dir, input_utxos, output_accounts, minting_account=None, fee=0, metadata=None, invalid_after=None, minting_script=None, tx_name='matx'):
+    """Builds transactions, written to `<tx_name>.raw` in working_dir"""
+    cmd_builder, raw_matx_path = _build_raw_transaction_cmd(working_dir, input_utxos, output_accounts, minting_account,
+                                                            fee, metadata, invalid_after, minting_script, tx_name)
+
+    proc = await get_runner().run_async(cmd_builder)
+
+    return _build_raw_transaction_result(proc, cmd_builder, raw_matx_path)
+
+
+async def calculate_tx_fee_async(raw_matx_path, protocol_json_path, input_utxos, output_accounts, witness_count=2, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+    """Calculate transaction fees"""
+    cmd_builder = _calculate_tx_fee_cmd(raw_matx_path, protocol_json_path, input_utxos, output_accounts,
+                                        witness_count, use_testnet, testnet_magic)
+
+    proc = await get_runner().run_async(cmd_builder)
+
+    return _calculate_tx_fee_result(proc)
+
+
+async def sign_tx_async(nft_dir, signing_wallets, raw_matx_path, force=False, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT, tx_name=None):
+    """Generate and write signed transaction file `<tx_name>.signed`, by
+    default named after the raw transaction file"""
+    cmd_builder, signed_matx_path = _sign_tx_cmd(nft_dir, signing_wallets, raw_matx_path, use_testnet, testnet_magic, tx_name)
+
+    proc = await get_runner().run_async(cmd_builder)
+
+    return _sign_tx_result(proc, signed_matx_path)
+
+
+async def witness_tx_async(nft_dir, signing_wallet, raw_matx_path, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT, tx_name=None):
+    """Write the witness of one wallet for a transaction"""
+    cmd_builder, witness_path = _witness_tx_cmd(nft_dir, signing_wallet, raw_matx_path, use_testnet, testnet_magic, tx_name)
+
+    proc = await get_runner().run_async(cmd_builder)
+
+    return _witness_tx_result(proc, witness_path)
+
+
+async def assemble_tx_async(nft_dir, raw_matx_path, witness_paths, tx_name=None):
+    """Write signed transaction from a transaction and its witnesses"""
+    cmd_builder, signed_matx_path = _assemble_tx_cmd(nft_dir, raw_matx_path, witness_paths, tx_name)
+
+    proc = await get_runner().run_async(cmd_builder)
+
+    return _assemble_tx_result(proc, signed_matx_path)
+
+
+async def submit_transaction_async(signed_matx_path, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+    """Submit signed transaction"""
+    cmd_builder = _submit_transaction_cmd(signed_matx_path, use_testnet, testnet_magic)
+
+    proc = await get_runner().run_async(cmd_builder)
+
+    return _submit_transaction_result(proc)
+
+
+async def query_tip_async(use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+    proc = await get_runner().run_async(_query_tip_cmd(use_testnet, testnet_magic))
+
+    return _query_tip_result(proc)
@@ -0,0 +1,72 @@
+"""Bech32 encoding (BIP-173) as used by Cardano addresses and keys. Unlike
+BIP-173, Cardano does not limit the length of the encoded string."""
+
+CHARSET = 'qpzry9x8gf2tvdw0s3jn54khce6mua7l'
+GENERATORS = [0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3]
+
+
+def _polymod(values):
+    checksum = 1
+    for value in values:
+        top = checksum >> 25
+        checksum = (checksum & 0x1ffffff) << 5 ^ value
+        for i in range(5):
+            checksum ^= GENERATORS[i] if ((top >> i) & 1) else 0
+    return checksum
+
+
+def _hrp_expand(hrp):
+    return [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+
+
+def _convert_bits(data, from_bits, to_bits, pad):
+    acc = 0
+    bits = 0
+    result = []
+    max_value = (1 << to_bits) - 1
+    for value in data:
+        acc = (acc << from_bits) | value
+        bits += from_bits
+        while bits >= to_bits:
+            bits -= to_bits
+            result.append((acc >> bits) & max_value)
+    if pad:
+        if bits:
+            result.append((acc << (to_bits - bits)) & max_value)
+    elif bits >= from_bits or ((acc << (to_bits - bits)) & max_value):
+        raise Exception('Invalid padding in bech32 data')
+    return result
+
+
+def encode(hrp, data):
+    '''Return bech32 string of the bytes `data` with human readable part `hrp`'''
+    values = _convert_bits(data, 8, 5, True)
+    polymod = _polymod(_hrp_expand(hrp) + values + [0] * 6) ^ 1
+    checksum = [(polymod >> 5 * (5 - i)) & 31 for i in range(6)]
+    return hrp + '1' + ''.join(CHARSET[value] for value in values + checksum)
+
+
+def decode(bech32_str):
+    '''Return (hrp, data bytes) of a bech32 string, raises an Exception if
+    the string is not valid bech32'''
+    if bech32_str.lower() != bech32_str and bech32_str.upper() != bech32_str:
+        raise Exception('Mixed case in bech32 string')
+    bech32_str = bech32_str.lower()
+
+    separator = bech32_str.rfind('1')
+    if separator < 1 or separator + 7 > len(bech32_str):
+        raise Exception('Invalid bech32 separator position')
+
+    hrp = bech32_str[:separator]
+    if any(ord(c) < 33 or ord(c) > 126 for c in hrp):
+        raise Exception('Invalid character in bech32 human readable part')
+
+    try:
+        values = [CHARSET.index(c) for c in bech32_str[separator + 1:]]
+    except ValueError:
+        raise Exception('Invalid character in bech32 data')
+
+    if _polymod(_hrp_expand(hrp) + values) != 1:
+        raise Exception('Invalid bech32 checksum')
+
+    return hrp, bytes(_convert_bits(values[:-6], 5, 8, False))
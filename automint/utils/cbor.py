@@ -0,0 +1,181 @@
+"""Minimal CBOR (RFC 8949) encoder and decoder covering the subset used by
+Cardano transactions: unsigned/negative integers, byte and text strings,
+arrays, maps, tags, booleans and null. Values are encoded with the
+shortest length headers and maps keep the insertion order of their keys,
+so callers are responsible for the canonical ordering of keys."""
+import struct
+
+
+class Tag(object):
+    '''Tagged CBOR value'''
+    def __init__(self, tag, value):
+        self.tag = tag
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, Tag) and self.tag == other.tag and self.value == other.value
+
+    def __repr__(self):
+        return f'Tag({self.tag}, {self.value!r})'
+
+
+def _encode_head(major_type, length):
+    major_type <<= 5
+    if length < 24:
+        return bytes([major_type | length])
+    if length < 0x100:
+        return bytes([major_type | 24, length])
+    if length < 0x10000:
+        return bytes([major_type | 25]) + struct.pack('>H', length)
+    if length < 0x100000000:
+        return bytes([major_type | 26]) + struct.pack('>I', length)
+    return bytes([major_type | 27]) + struct.pack('>Q', length)
+
+
+def _encode(value, out):
+    if value is False:
+        out.append(b'\xf4')
+    elif value is True:
+        out.append(b'\xf5')
+    elif value is None:
+        out.append(b'\xf6')
+    elif isinstance(value, int):
+        if value >= 0:
+            out.append(_encode_head(0, value))
+        else:
+            out.append(_encode_head(1, -1 - value))
+    elif isinstance(value, (bytes, bytearray)):
+        out.append(_encode_head(2, len(value)))
+        out.append(bytes(value))
+    elif isinstance(value, str):
+        encoded = value.encode('utf-8')
+        out.append(_encode_head(3, len(encoded)))
+        out.append(encoded)
+    elif isinstance(value, (list, tuple)):
+        out.append(_encode_head(4, len(value)))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        out.append(_encode_head(5, len(value)))
+        for key, item in value.items():
+            _encode(key, out)
+            _encode(item, out)
+    elif isinstance(value, Tag):
+        out.append(_encode_head(6, value.tag))
+        _encode(value.value, out)
+    elif isinstance(value, RawCBOR):
+        out.append(value.data)
+    else:
+        raise Exception(f'Unable to encode {type(value)} as CBOR')
+
+
+def dumps(value):
+    '''Return CBOR encoding of value'''
+    out = []
+    _encode(value, out)
+    return b''.join(out)
+
+
+class RawCBOR(object):
+    '''Already encoded CBOR data, it is written as is by `dumps()`. Used to
+    keep the exact bytes of a decoded item (such as a transaction body)
+    when re-encoding the structure around it.'''
+    def __init__(self, data):
+        self.data = bytes(data)
+
+    def __eq__(self, other):
+        return isinstance(other, RawCBOR) and self.data == other.data
+
+    def __repr__(self):
+        return f'RawCBOR({self.data.hex()})'
+
+
+def _decode_head(data, pos):
+    initial = data[pos]
+    major_type, info = initial >> 5, initial & 0x1f
+    pos += 1
+
+    if info < 24:
+        return major_type, info, pos
+    if info == 24:
+        return major_type, data[pos], pos + 1
+    if info == 25:
+        return major_type, struct.unpack_from('>H', data, pos)[0], pos + 2
+    if info == 26:
+        return major_type, struct.unpack_from('>I', data, pos)[0], pos + 4
+    if info == 27:
+        return major_type, struct.unpack_from('>Q', data, pos)[0], pos + 8
+    if info == 31:
+        return major_type, None, pos
+
+    raise Exception(f'Invalid CBOR additional information {info} at offset {pos - 1}')
+
+
+def _decode_items(data, pos, length):
+    '''Decode `length` items (until the break byte if None)'''
+    items = []
+    if length is None:
+        while data[pos] != 0xff:
+            item, pos = _decode(data, pos)
+            items.append(item)
+        return items, pos + 1
+
+    for _ in range(length):
+        item, pos = _decode(data, pos)
+        items.append(item)
+    return items, pos
+
+
+def _decode(data, pos):
+    major_type, arg, pos = _decode_head(data, pos)
+
+    if major_type == 0:
+        return arg, pos
+    if major_type == 1:
+        return -1 - arg, pos
+    if major_type in (2, 3):
+        if arg is None:
+            chunks, pos = _decode_items(data, pos, None)
+            value = b''.join(chunks) if major_type == 2 else ''.join(chunks)
+            return value, pos
+        value = bytes(data[pos:pos + arg])
+        return (value if major_type == 2 else value.decode('utf-8')), pos + arg
+    if major_type == 4:
+        return _decode_items(data, pos, arg)
+    if major_type == 5:
+        items, pos = _decode_items(data, pos, None if arg is None else 2 * arg)
+        return dict(zip(items[::2], items[1::2])), pos
+    if major_type == 6:
+        value, pos = _decode(data, pos)
+        return Tag(arg, value), pos
+    if arg == 20:
+        return False, pos
+    if arg == 21:
+        return True, pos
+    if arg in (22, 23):
+        return None, pos
+
+    raise Exception(f'Unsupported CBOR simple value {arg}')
+
+
+def loads(data):
+    '''Decode a single CBOR item'''
+    value, pos = _decode(data, 0)
+    if pos != len(data):
+        raise Exception(f'Unexpected trailing data after CBOR item at offset {pos}')
+    return value
+
+
+def split_array(data):
+    '''Return the encoded bytes of each item of a CBOR array without
+    re-encoding them'''
+    major_type, length, pos = _decode_head(data, 0)
+    if major_type != 4:
+        raise Exception('CBOR item is not an array')
+
+    items = []
+    while (length is None and data[pos] != 0xff) or (length is not None and len(items) < length):
+        _, end = _decode(data, pos)
+        items.append(bytes(data[pos:end]))
+        pos = end
+    return items
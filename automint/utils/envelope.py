@@ -0,0 +1,26 @@
+"""Reading and writing of the JSON text envelopes used by cardano-cli for
+transactions, witnesses and keys."""
+import json
+
+
+def read_text_envelope(envelope_path):
+    '''Return (type, description, cbor bytes) of a text envelope file'''
+    with open(envelope_path, 'r') as f:
+        envelope = json.load(f)
+        f.close()
+
+    return envelope['type'], envelope.get('description', ''), bytes.fromhex(envelope['cborHex'])
+
+
+def write_text_envelope(envelope_path, envelope_type, description, cbor_bytes):
+    '''Write cbor bytes to a text envelope file in the layout of cardano-cli'''
+    with open(envelope_path, 'w') as f:
+        json.dump({
+            'type': envelope_type,
+            'description': description,
+            'cborHex': cbor_bytes.hex()
+        }, f, indent=4)
+        f.write('\n')
+        f.close()
+
+    return envelope_path
@@ -0,0 +1,109 @@
+import json
+import logging
+from fractions import Fraction
+
+from automint.utils import cbor
+from automint.utils.envelope import read_text_envelope
+
+logger = logging.getLogger(__name__)
+
+# Reference script fees grow by this factor for every full 25KiB of
+# reference scripts (Conway `minFeeRefScriptCostPerByte` tiering)
+REF_SCRIPT_TIER_SIZE = 25600
+REF_SCRIPT_TIER_MULTIPLIER = Fraction(6, 5)
+
+# Bytes added to the size of an output for the minimum lovelace it holds
+# (Babbage `coinsPerUTxOByte`)
+MIN_UTXO_OVERHEAD = 160
+
+# Placeholder fee while sizing transactions, encoded on as many bytes as
+# any real fee
+PLACEHOLDER_FEE = 0xffffffff
+
+
+def load_protocol_params(protocol_json_path):
+    '''Return protocol parameters from the file written by
+    `get_protocol_params()`'''
+    with open(protocol_json_path, 'r') as f:
+        params = json.load(f)
+        f.close()
+
+    return params
+
+
+def _witness_set_with_dummies(witness_set, witness_count):
+    '''Return witness set with `witness_count` dummy vkey witnesses (with
+    distinct keys) in place of any existing vkey witnesses'''
+    witness_set = dict(witness_set)
+
+    # A vkey witness is [vkey (32 bytes), signature (64 bytes)]
+    witnesses = [[i.to_bytes(32, 'big'), bytes(64)] for i in range(witness_count)]
+    if witness_count > 0:
+        # Conway encodes the vkey witnesses as a set (tag 258)
+        witness_set[0] = cbor.Tag(258, witnesses)
+    else:
+        witness_set.pop(0, None)
+
+    return witness_set
+
+
+def estimate_tx_size(tx_cbor, witness_count=2):
+    '''Return the size in bytes of a transaction once it is signed by
+    `witness_count` keys, `tx_cbor` is either a full transaction
+    ([body, witness set, is valid, auxiliary data]) or a transaction body'''
+    major_type = tx_cbor[0] >> 5
+
+    if major_type == 5:
+        # Bare transaction body, without witnesses or auxiliary data
+        items = [tx_cbor, cbor.dumps({}), cbor.dumps(True), cbor.dumps(None)]
+    else:
+        items = cbor.split_array(tx_cbor)
+
+    witness_set = _witness_set_with_dummies(cbor.loads(items[1]), witness_count)
+    items[1] = cbor.dumps(witness_set)
+
+    return len(cbor.dumps([cbor.RawCBOR(item) for item in items]))
+
+
+def reference_script_fee(protocol_params, reference_script_size):
+    '''Return the fee for reference scripts of the given total size'''
+    price = Fraction(protocol_params.get('minFeeRefScriptCostPerByte', 0) or 0)
+
+    fee = Fraction(0)
+    remaining = reference_script_size
+    while remaining > 0:
+        tier_size = min(remaining, REF_SCRIPT_TIER_SIZE)
+        fee += tier_size * price
+        price *= REF_SCRIPT_TIER_MULTIPLIER
+        remaining -= tier_size
+
+    return int(fee)
+
+
+def min_fee(protocol_params, tx_size, reference_script_size=0):
+    '''Return the minimum fee of a transaction of `tx_size` bytes'''
+    fee = protocol_params['txFeeFixed'] + protocol_params['txFeePerByte'] * tx_size
+    return fee + reference_script_fee(protocol_params, reference_script_size)
+
+
+def min_utxo_lovelace(protocol_params, output_size):
+    '''Return the minimum lovelace of a transaction output of
+    `output_size` bytes'''
+    return (MIN_UTXO_OVERHEAD + output_size) * (protocol_params.get('coinsPerUTxOByte', 0) or 0)
+
+
+def calculate_min_fee(raw_matx_path, protocol_params, witness_count=2, reference_script_size=0):
+    """Calculate transaction fees without calling cardano-cli. Counterpart of
+    `calculate_tx_fee()`, `protocol_params` is either the path to the
+    protocol parameters file or the parsed parameters"""
+    if isinstance(protocol_params, str):
+        protocol_params = load_protocol_params(protocol_params)
+
+    _, _, tx_cbor = read_text_envelope(raw_matx_path)
+    tx_size = estimate_tx_size(tx_cbor, witness_count=witness_count)
+
+    fee = min_fee(protocol_params, tx_size, reference_script_size=reference_script_size)
+
+    logger.debug(f'Estimated transaction size {tx_size} bytes, fee {fee} lovelace')
+
+    return fee
@@ -1,10 +1,31 @@
+import glob
 import json
 import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+# Transaction metadata strings are limited to 64 bytes, longer CIP-25
+# values are split into arrays of strings
+METADATA_MAX_BYTES = 64
+ASSET_NAME_MAX_BYTES = 32
+
+
+def validate_metadata(metadata_fp, tokens, policy_id, streaming=False):
+    '''Check that the metadata file holds CIP-25 metadata for exactly the
+    given tokens of the policy. Raises an Exception on the first problem
+    found, or with `streaming` on all problems found by
+    `validate_metadata_stream()`.'''
+    if streaming:
+        errors = validate_metadata_stream(metadata_fp, tokens, policy_id)
+        if len(errors) != 0:
+            raise Exception(f'Metadata {metadata_fp} is invalid:\n' + '\n'.join(errors))
+        return True
+
+    tokens = set(tokens)
 
-def validate_metadata(metadata_fp, tokens, policy_id):
     # Load metadata
     with open(metadata_fp, 'r') as f:
         metadata = json.load(f)
@@ -41,3 +62,351 @@ def validate_metadata(metadata_fp, tokens, policy_id):
             raise Exception(f'"image" attribute not found in metadata for token {token}')
 
     return True
+
+
+class _JSONStream(object):
+    '''Incremental reader of a JSON document. Containers are walked one
+    key at a time with `iter_object()` while values are decoded whole
+    with `read_value()`, so only the value being decoded is buffered.'''
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.offset = 0
+        self.eof = False
+
+    def _fill(self):
+        # Drop the consumed part of the buffer before reading more
+        chunk = self.f.read(self.chunk_size)
+        if chunk == '':
+            self.eof = True
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\n\r':
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                break
+            self._fill()
+        return self.buffer[self.pos] if self.pos < len(self.buffer) else None
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f'Expected {char!r} at offset {self.offset + self.pos}, found {found!r}')
+        self.pos += 1
+
+    def read_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise ValueError(f'Invalid JSON at offset {self.offset + e.pos}: {e.msg}')
+                self._fill()
+                continue
+
+            # A number may continue in the next chunk
+            if end == len(self.buffer) and not self.eof:
+                self._fill()
+                continue
+
+            self.pos = end
+            return value
+
+    def iter_object(self):
+        '''Yield the keys of an object, the value of each key must be
+        consumed before the next iteration'''
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise ValueError(f'Expected object key at offset {self.offset + self.pos}')
+            self.expect(':')
+            yield key
+
+            if self.peek() == ',':
+                self.pos += 1
+            else:
+                self.expect('}')
+                return
+
+    def skip_value(self):
+        '''Skip a value without holding it whole in memory if it is an object'''
+        if self.peek() == '{':
+            for _ in self.iter_object():
+                self.skip_value()
+        else:
+            self.read_value()
+
+
+def _byte_length(value):
+    return len(value.encode('utf-8'))
+
+
+def _check_strings(value, path, errors):
+    '''Check the length of all strings within a metadata value'''
+    if isinstance(value, str):
+        if _byte_length(value) > METADATA_MAX_BYTES:
+            errors.append(f'{path}: string longer than {METADATA_MAX_BYTES} bytes, split it into an array of strings')
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            _check_strings(item, f'{path}[{i}]', errors)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            _check_strings(key, f'{path} key', errors)
+            _check_strings(item, f'{path}.{key}', errors)
+    elif value is None or isinstance(value, (bool, float)):
+        errors.append(f'{path}: {value!r} is not a valid metadata value')
+
+
+def _is_string_or_chunks(value):
+    return isinstance(value, str) or (isinstance(value, list) and all(isinstance(v, str) for v in value))
+
+
+def _check_token(token, token_metadata, path, errors):
+    '''Check the CIP-25 metadata of one token'''
+    if _byte_length(token) > ASSET_NAME_MAX_BYTES:
+        errors.append(f'{path}: token name longer than {ASSET_NAME_MAX_BYTES} bytes')
+
+    if not isinstance(token_metadata, dict):
+        errors.append(f'{path}: token metadata should be an object')
+        return
+
+    if 'name' not in token_metadata:
+        errors.append(f'{path}: "name" attribute not found')
+    elif not isinstance(token_metadata['name'], str):
+        errors.append(f'{path}.name: should be a string')
+
+    if 'image' not in token_metadata:
+        errors.append(f'{path}: "image" attribute not found')
+    elif not _is_string_or_chunks(token_metadata['image']):
+        errors.append(f'{path}.image: should be a string or an array of strings')
+
+    if 'mediaType' in token_metadata and not isinstance(token_metadata['mediaType'], str):
+        errors.append(f'{path}.mediaType: should be a string')
+
+    if 'description' in token_metadata and not _is_string_or_chunks(token_metadata['description']):
+        errors.append(f'{path}.description: should be a string or an array of strings')
+
+    if 'files' in token_metadata:
+        files = token_metadata['files']
+        if not isinstance(files, list):
+            errors.append(f'{path}.files: should be an array')
+        else:
+            for i, file_metadata in enumerate(files):
+                if not isinstance(file_metadata, dict):
+                    errors.append(f'{path}.files[{i}]: should be an object')
+                    continue
+                for attribute in ('mediaType', 'src'):
+                    if attribute not in file_metadata:
+                        errors.append(f'{path}.files[{i}]: "{attribute}" attribute not found')
+                if 'src' in file_metadata and not _is_string_or_chunks(file_metadata['src']):
+                    errors.append(f'{path}.files[{i}].src: should be a string or an array of strings')
+
+    _check_strings(token_metadata, path, errors)
+
+
+def _validate_stream(metadata_fp, expected, policy_id, chunk_size):
+    '''Return (errors, tokens found) of a metadata file, the tokens are
+    None if the file could not be parsed'''
+    seen = {}
+    errors = []
+
+    with open(metadata_fp, 'r', encoding='utf-8') as f:
+        stream = _JSONStream(f, chunk_size)
+        try:
+            labels = set()
+            for label in stream.iter_object():
+                if label in labels:
+                    errors.append(f'Duplicate label {label}')
+                labels.add(label)
+
+                if label != '721':
+                    errors.append(f'Unexpected label {label}, metadata should only contain the "721" label')
+                    stream.skip_value()
+                    continue
+
+                policies = 0
+                for policy in stream.iter_object():
+                    if policy == 'version':
+                        stream.read_value()
+                        continue
+
+                    policies += 1
+                    if policies == 2:
+                        errors.append('721: metadata should contain only 1 policy ID')
+                    if policy != policy_id:
+                        errors.append(f'721: policy ID {policy} does not match {policy_id}')
+
+                    for token in stream.iter_object():
+                        path = f'721.{policy}.{token}'
+                        token_metadata = stream.read_value()
+
+                        if policy != policy_id:
+                            continue
+                        if token in seen:
+                            errors.append(f'{path}: duplicate token')
+                        elif token not in expected:
+                            errors.append(f'{path}: unexpected token')
+                        seen[token] = True
+
+                        _check_token(token, token_metadata, path, errors)
+
+            if stream.peek() is not None:
+                raise ValueError(f'Unexpected data at offset {stream.offset + stream.pos}')
+
+            if '721' not in labels:
+                errors.append('Metadata should contain "721" key not found')
+        except ValueError as e:
+            errors.append(str(e))
+            return errors, None
+        finally:
+            f.close()
+
+    return errors, list(seen)
+
+
+def _missing_tokens_error(missing):
+    missing = sorted(missing)
+    shown = ', '.join(missing[:10]) + (', ...' if len(missing) > 10 else '')
+    return f'{len(missing)} tokens not found in metadata: {shown}'
+
+
+def validate_metadata_stream(metadata_fp, tokens, policy_id, chunk_size=1 << 16):
+    '''Validate CIP-25 metadata like `validate_metadata()` but parse the
+    file incrementally, holding only one token's metadata at a time, and
+    check the CIP-25 constraints (64 byte strings, name and image of every
+    token, files). Returns the list of all the problems found, empty if
+    the metadata is valid.'''
+    expected = set(tokens)
+    errors, seen = _validate_stream(metadata_fp, expected, policy_id, chunk_size)
+
+    if seen is not None:
+        missing = expected.difference(seen)
+        if len(missing) != 0:
+            errors.append(_missing_tokens_error(missing))
+
+    return errors
+
+
+class MetadataFileResult(object):
+    '''Validation result of one metadata file'''
+    def __init__(self, path, tokens, errors, seconds):
+        self.path = path
+        self.tokens = tokens if tokens is not None else []
+        self.errors = errors
+        self.seconds = seconds
+
+    @property
+    def valid(self):
+        return len(self.errors) == 0
+
+
+class MetadataReport(object):
+    '''Validation results of a set of metadata files, `errors` holds the
+    problems across files (tokens found in several files or in none)'''
+    def __init__(self, files, errors, seconds):
+        self.files = files
+        self.errors = errors
+        self.seconds = seconds
+
+    @property
+    def valid(self):
+        return len(self.errors) == 0 and all(result.valid for result in self.files)
+
+    def invalid_files(self):
+        return [result for result in self.files if not result.valid]
+
+    def slowest(self, n=10):
+        return sorted(self.files, key=lambda result: result.seconds, reverse=True)[:n]
+
+    def __str__(self):
+        lines = [f'{len(self.files)} files validated in {self.seconds:.2f}s, {len(self.invalid_files())} invalid']
+        for result in self.invalid_files():
+            lines.append(f'{result.path} ({result.seconds * 1000:.1f}ms):')
+            lines += [f'    {error}' for error in result.errors]
+        lines += self.errors
+        return '\n'.join(lines)
+
+
+# Expected tokens and policy id of the pool workers, set once per worker
+_worker_args = None
+
+
+def _init_worker(expected, policy_id, chunk_size):
+    global _worker_args
+    _worker_args = (expected, policy_id, chunk_size)
+
+
+def _validate_file(metadata_fp):
+    start = time.perf_counter()
+    expected, policy_id, chunk_size = _worker_args
+    try:
+        errors, seen = _validate_stream(metadata_fp, expected, policy_id, chunk_size)
+    except (OSError, UnicodeDecodeError) as e:
+        errors, seen = [f'Unable to read file: {e}'], None
+    return MetadataFileResult(metadata_fp, seen, errors, time.perf_counter() - start)
+
+
+def find_metadata_files(path):
+    '''Return sorted list of the .json files of a directory, or of the
+    files matching a glob pattern'''
+    if os.path.isdir(path):
+        path = os.path.join(path, '*.json')
+    return sorted(glob.glob(path))
+
+
+def validate_metadata_files(path, tokens, policy_id, max_workers=None, chunk_size=1 << 16):
+    '''Validate the metadata files of a directory (or matching a glob
+    pattern) across a pool of `max_workers` processes. Every file is
+    checked as by `validate_metadata_stream()`, except that each file may
+    hold any of the tokens: together, the files must hold every token
+    exactly once. Returns a MetadataReport.'''
+    start = time.perf_counter()
+    expected = frozenset(tokens)
+    metadata_fps = find_metadata_files(path)
+
+    if max_workers == 1 or len(metadata_fps) <= 1:
+        _init_worker(expected, policy_id, chunk_size)
+        results = [_validate_file(metadata_fp) for metadata_fp in metadata_fps]
+    else:
+        max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=_init_worker,
+                                 initargs=(expected, policy_id, chunk_size)) as executor:
+            # Batch the files sent to each worker, per-file tasks would
+            # cost more in IPC than the validation of small files
+            chunksize = max(1, len(metadata_fps) // (4 * max_workers))
+            results = list(executor.map(_validate_file, metadata_fps, chunksize=chunksize))
+
+    errors = []
+    if len(metadata_fps) == 0:
+        errors.append(f'No metadata files found at {path}')
+
+    found = {}
+    for result in results:
+        for token in result.tokens:
+            if token in found:
+                errors.append(f'Token {token} found in {found[token]} and {result.path}')
+            else:
+                found[token] = result.path
+
+    missing = expected.difference(found)
+    if len(missing) != 0:
+        errors.append(_missing_tokens_error(missing))
+
+    report = MetadataReport(results, errors, time.perf_counter() - start)
+    logger.info(f'{len(results)} metadata files validated in {report.seconds:.2f}s')
+
+    return report
@@ -0,0 +1,146 @@
+"""Native script minting policies built in memory, with their policy ids
+computed in-process instead of through `cardano-cli transaction policyid`.
+Scripts use the JSON format of cardano-cli, as written by
+`write_policy_script()`."""
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from automint.utils import cbor
+from automint.utils.transaction import encode_native_script
+
+logger = logging.getLogger(__name__)
+
+# Prefix of native scripts when hashed, distinguishing them from Plutus scripts
+NATIVE_SCRIPT_TAG = b'\x00'
+
+
+def sig_script(key_hash):
+    '''Return script requiring a signature of the key with `key_hash`'''
+    return {'keyHash': key_hash, 'type': 'sig'}
+
+
+def time_locked_script(key_hash, before):
+    '''Return script requiring a signature of the key with `key_hash` in a
+    transaction valid only before slot `before`'''
+    return {
+        'type': 'all',
+        'scripts': [sig_script(key_hash), {'slot': before, 'type': 'before'}]
+    }
+
+
+def multisig_script(key_hashes, required=None, before=None):
+    '''Return script requiring signatures of `required` of the keys with
+    `key_hashes` (all of them by default), in a transaction valid only
+    before slot `before` if given'''
+    scripts = [sig_script(key_hash) for key_hash in key_hashes]
+
+    if required is None or required == len(scripts):
+        script = {'type': 'all', 'scripts': scripts}
+    elif 0 < required < len(scripts):
+        script = {'type': 'atLeast', 'required': required, 'scripts': scripts}
+    else:
+        raise Exception(f'Cannot require {required} of {len(scripts)} signatures')
+
+    if before is not None:
+        script = {'type': 'all', 'scripts': [script, {'slot': before, 'type': 'before'}]}
+
+    return script
+
+
+def _script_key(script):
+    return json.dumps(script, sort_keys=True, separators=(',', ':'))
+
+
+def script_hash(script):
+    '''Return hex policy id (blake2b-224 hash) of a native script'''
+    return hashlib.blake2b(NATIVE_SCRIPT_TAG + cbor.dumps(encode_native_script(script)), digest_size=28).hexdigest()
+
+
+def read_policy_script(script_path):
+    with open(script_path, 'r') as script_f:
+        script = json.load(script_f)
+        script_f.close()
+
+    return script
+
+
+def write_script(script_path, script):
+    with open(script_path, 'w') as script_f:
+        json.dump(script, script_f, indent=4)
+        script_f.close()
+
+    return script_path
+
+
+class PolicyRegistry(object):
+    '''Registry of minting policies in `working_dir`. Each script is written
+    once, to `<name>.script` where the name defaults to the policy id, so
+    policies used concurrently never overwrite each other. Policy ids are
+    computed in-process and cached by script content. Scripts already in
+    `working_dir` are registered on creation.'''
+    def __init__(self, working_dir):
+        self.working_dir = working_dir
+        self._ids = {}
+        self._paths = {}
+        self._scripts = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(working_dir, exist_ok=True)
+        for filename in sorted(os.listdir(working_dir)):
+            if filename.endswith('.script'):
+                script_path = os.path.join(working_dir, filename)
+                self._add(read_policy_script(script_path), script_path)
+
+    def _add(self, script, script_path):
+        policy_id = self.policy_id(script)
+        self._scripts[policy_id] = script
+        self._paths.setdefault(policy_id, script_path)
+        return policy_id
+
+    def policy_id(self, script):
+        '''Return policy id of a script, cached by script content'''
+        key = _script_key(script)
+        if key not in self._ids:
+            self._ids[key] = script_hash(script)
+        return self._ids[key]
+
+    def register(self, script, name=None):
+        '''Write script to `<name>.script` unless it is already registered,
+        return its policy id. Raises an Exception if a different script
+        was written under the same name.'''
+        policy_id = self.policy_id(script)
+
+        with self._lock:
+            if policy_id in self._paths:
+                return policy_id
+
+            script_path = os.path.join(self.working_dir, f'{name if name is not None else policy_id}.script')
+            if os.path.exists(script_path):
+                existing_id = self.policy_id(read_policy_script(script_path))
+                if existing_id != policy_id:
+                    raise Exception(f'{script_path} already holds the script of policy {existing_id}')
+            else:
+                logger.info(f'Writing policy script to {script_path}')
+                write_script(script_path, script)
+
+            return self._add(script, script_path)
+
+    def get_script(self, policy_id):
+        return self._scripts[policy_id]
+
+    def get_script_path(self, policy_id):
+        '''Return path of the script of a policy, to pass as the minting
+        script of a transaction'''
+        return self._paths[policy_id]
+
+    def get_policy_ids(self):
+        return list(self._paths)
+
+    def __contains__(self, policy_id):
+        return policy_id in self._paths
+
+    def __len__(self):
+        return len(self._paths)
@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from automint.config import TESTNET_MAGIC_DEFAULT
+from automint.utils.fees import load_protocol_params
+from automint.utils.utils import get_protocol_params, network_name, query_tip
+
+logger = logging.getLogger(__name__)
+
+
+class ProtocolParamsCache(object):
+    '''Cache of protocol parameters in memory and in `cache_dir`, keyed by
+    network. Protocol parameters only change at epoch boundaries, so the
+    node is only queried again once the epoch the parameters were
+    fetched in has ended (estimated from the `slotsToEpochEnd` reported
+    by the tip) or `ttl` seconds have passed. Once the estimated end of
+    the epoch is reached, the tip is queried and the parameters are only
+    fetched again if the epoch has actually changed.
+
+    `tip_provider`, if given, is called with `use_testnet` and
+    `testnet_magic` instead of `query_tip()` to obtain the tip, such as
+    `TipProvider.get_tip`.
+
+    '''
+    def __init__(self, cache_dir, ttl=6 * 60 * 60, slot_length=1, tip_provider=None):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.slot_length = slot_length
+        self.tip_provider = tip_provider if tip_provider is not None else query_tip
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _network_dir(self, network):
+        return os.path.join(self.cache_dir, network)
+
+    def _meta_path(self, network):
+        return os.path.join(self._network_dir(network), 'protocol.meta.json')
+
+    def _load_entry(self, network):
+        '''Load cache entry written by a previous process, None if missing'''
+        meta_path = self._meta_path(network)
+        if not os.path.exists(meta_path):
+            return None
+
+        with open(meta_path, 'r') as f:
+            entry = json.load(f)
+            f.close()
+
+        if not os.path.exists(entry['path']):
+            return None
+
+        entry['params'] = load_protocol_params(entry['path'])
+        return entry
+
+    def _epoch_ends_at(self, tip, now):
+        if 'slotsToEpochEnd' in tip:
+            return now + tip['slotsToEpochEnd'] * self.slot_length
+        # Without an estimate of the end of the epoch, fall back to the TTL
+        return now + self.ttl
+
+    def _fetch(self, network, use_testnet, testnet_magic):
+        tip = self.tip_provider(use_testnet=use_testnet, testnet_magic=testnet_magic)
+        if not tip:
+            raise Exception(f'Unable to query tip for {network}')
+
+        network_dir = self._network_dir(network)
+        os.makedirs(network_dir, exist_ok=True)
+
+        protocol_json_path = get_protocol_params(network_dir, use_testnet=use_testnet, testnet_magic=testnet_magic)
+        if protocol_json_path == '':
+            raise Exception(f'Unable to fetch protocol parameters for {network}')
+
+        now = time.time()
+        entry = {
+            'path': protocol_json_path,
+            'epoch': tip['epoch'],
+            'fetched_at': now,
+            'epoch_ends_at': self._epoch_ends_at(tip, now)
+        }
+        self._save_entry(network, entry)
+
+        logger.info(f'Fetched protocol parameters for {network} in epoch {entry["epoch"]}')
+
+        entry['params'] = load_protocol_params(protocol_json_path)
+        return entry
+
+    def _save_entry(self, network, entry):
+        with open(self._meta_path(network), 'w') as f:
+            json.dump({k: v for k, v in entry.items() if k != 'params'}, f, indent=4)
+            f.close()
+
+    def _get_entry(self, use_testnet, testnet_magic):
+        network = network_name(use_testnet, testnet_magic)
+
+        with self._lock:
+            entry = self._entries.get(network)
+            if entry is None:
+                entry = self._load_entry(network)
+
+            now = time.time()
+            if entry is not None and now >= entry['fetched_at'] + self.ttl:
+                entry = None
+
+            if entry is not None and now >= entry['epoch_ends_at']:
+                tip = self.tip_provider(use_testnet=use_testnet, testnet_magic=testnet_magic)
+                if tip and tip['epoch'] == entry['epoch']:
+                    entry['epoch_ends_at'] = self._epoch_ends_at(tip, now)
+                    self._save_entry(network, entry)
+                else:
+                    entry = None
+
+            if entry is None:
+                entry = self._fetch(network, use_testnet, testnet_magic)
+
+            self._entries[network] = entry
+            return entry
+
+    def get(self, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+        '''Return the parsed protocol parameters'''
+        return self._get_entry(use_testnet, testnet_magic)['params']
+
+    def get_path(self, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+        '''Return the path of the protocol parameters file, for use with
+        cardano-cli'''
+        return self._get_entry(use_testnet, testnet_magic)['path']
+
+    def invalidate(self, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+        '''Force the parameters to be fetched again on the next access'''
+        network = network_name(use_testnet, testnet_magic)
+        with self._lock:
+            self._entries.pop(network, None)
+            meta_path = self._meta_path(network)
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
@@ -0,0 +1,181 @@
+import asyncio
+import collections
+import contextlib
+import logging
+import subprocess
+import threading
+
+from automint.config import CARDANO_CLI, CARDANO_CLI_MAX_PROCESSES
+
+logger = logging.getLogger(__name__)
+
+
+class _ProcessSlots(object):
+    '''Counting semaphore shared by threads and coroutines. Threads block in
+    `acquire()`, coroutines wait in `acquire_async()` on their event loop
+    without holding a thread. Released slots go to the waiters in order.'''
+    def __init__(self, count):
+        self._lock = threading.Lock()
+        self._free = count
+        # threading.Event of a thread or (loop, future) of a coroutine
+        self._waiters = collections.deque()
+
+    def acquire(self):
+        with self._lock:
+            if self._free > 0 and len(self._waiters) == 0:
+                self._free -= 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+
+        # The slot is handed over by `release()`
+        event.wait()
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._free > 0 and len(self._waiters) == 0:
+                self._free -= 1
+                return
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.append(waiter)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # Cancelled after the slot was handed over, pass it on. If the
+            # hand over is still pending, `_grant()` passes it on instead.
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def _grant(self, future):
+        if future.done():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self):
+        with self._lock:
+            while len(self._waiters) > 0:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+
+                loop, future = waiter
+                try:
+                    loop.call_soon_threadsafe(self._grant, future)
+                    return
+                except RuntimeError:
+                    # Event loop closed, its coroutine no longer waits
+                    continue
+
+            self._free += 1
+
+    def __enter__(self):
+        self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class CLIRunner(object):
+    '''Runs cardano-cli commands. The executable is started directly
+    (without a shell) and at most `max_processes` cardano-cli processes
+    run at any time, further calls block until a process finishes.
+
+    All of automint's cardano-cli calls (including the coroutines of
+    `automint.utils.aio`) go through the runner returned by
+    `get_runner()`. A different executable (such as a fake cardano-cli
+    for tests) or a subclass overriding `run()`, `run_async()` and
+    `popen()` can be installed with `set_runner()`.
+
+    '''
+    def __init__(self, executable=CARDANO_CLI, max_processes=CARDANO_CLI_MAX_PROCESSES):
+        assert max_processes > 0
+        self.executable = executable
+        self.max_processes = max_processes
+        # Shared by the threads calling `run()` and the coroutines calling
+        # `run_async()` so the limit holds across both
+        self._slots = _ProcessSlots(max_processes)
+
+    def get_cmd(self, args):
+        return [self.executable] + [str(arg) for arg in args]
+
+    def run(self, args):
+        '''Run cardano-cli with the given arguments and return the
+        completed process with text stdout and stderr'''
+        cmd = self.get_cmd(args)
+        logger.debug(f'Running {cmd}')
+
+        with self._slots:
+            return subprocess.run(cmd, capture_output=True, text=True)
+
+    async def run_async(self, args):
+        '''Coroutine running cardano-cli with the given arguments, returns
+        the completed process with text stdout and stderr. Counts against
+        the same `max_processes` limit as `run()`. The process is killed
+        if the coroutine is cancelled.'''
+        cmd = self.get_cmd(args)
+        logger.debug(f'Running {cmd}')
+
+        await self._slots.acquire_async()
+        try:
+            proc = await asyncio.create_subprocess_exec(*cmd,
+                                                        stdout=asyncio.subprocess.PIPE,
+                                                        stderr=asyncio.subprocess.PIPE)
+            try:
+                stdout, stderr = await proc.communicate()
+            except asyncio.CancelledError:
+                if proc.returncode is None:
+                    proc.kill()
+                await proc.wait()
+                raise
+        finally:
+            self._slots.release()
+
+        return subprocess.CompletedProcess(cmd, proc.returncode, stdout.decode(), stderr.decode())
+
+    @contextlib.contextmanager
+    def popen(self, args):
+        '''Context manager starting cardano-cli with the given arguments and
+        yielding the process, its stdout and stderr are text pipes. The
+        process is killed if it is still running on exit.'''
+        cmd = self.get_cmd(args)
+        logger.debug(f'Running {cmd}')
+
+        with self._slots:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            try:
+                yield proc
+            finally:
+                if proc.poll() is None:
+                    proc.kill()
+                proc.communicate()
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    '''Return the runner used for cardano-cli calls'''
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = CLIRunner()
+        return _runner
+
+
+def set_runner(runner):
+    '''Set the runner used for cardano-cli calls, returns the previous one'''
+    global _runner
+    with _runner_lock:
+        previous, _runner = _runner, runner
+        return previous
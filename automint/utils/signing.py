@@ -0,0 +1,194 @@
+"""In-process signing of transactions with Ed25519 payment keys, an
+alternative to `cardano-cli conway transaction sign`."""
+import functools
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import nacl.signing
+
+from automint.utils import cbor
+from automint.utils.envelope import read_text_envelope, write_text_envelope
+from automint.utils.transaction import SET_TAG, TX_DESCRIPTION, blake2b_256
+from automint.utils.utils import _tx_name_from_path, unique_tx_name
+
+SIGNED_TX_TYPE = 'Tx ConwayEra'
+WITNESS_TYPE = 'TxWitness ConwayEra'
+KEY_WITNESS_DESCRIPTION = 'Key Witness ShelleyEra'
+
+
+def read_signing_key(skey_path):
+    '''Return the Ed25519 signing key of a `.skey` text envelope as written
+    by `cardano-cli address key-gen`'''
+    envelope_type, _, key_cbor = read_text_envelope(skey_path)
+    if 'SigningKey' not in envelope_type:
+        raise Exception(f'{skey_path} is not a signing key file ({envelope_type})')
+
+    seed = cbor.loads(key_cbor)
+    if len(seed) != 32:
+        raise Exception(f'Unsupported signing key in {skey_path}, only normal (non extended) keys can be used')
+
+    return nacl.signing.SigningKey(seed)
+
+
+def verification_key_bytes(signing_key):
+    return bytes(signing_key.verify_key)
+
+
+def make_vkey_witness(signing_key, tx_body_hash):
+    '''Return vkey witness [verification key, signature] of a transaction
+    body hash'''
+    return [verification_key_bytes(signing_key), signing_key.sign(tx_body_hash).signature]
+
+
+def _key_hash(witness):
+    return hashlib.blake2b(witness[0], digest_size=28).digest()
+
+
+def add_vkey_witnesses(tx_cbor, witnesses):
+    '''Return transaction CBOR with the vkey witnesses added to its witness
+    set. The body and auxiliary data are kept byte for byte and the
+    witnesses are ordered by key hash, as done by cardano-cli.'''
+    items = cbor.split_array(tx_cbor)
+    witness_set = cbor.loads(items[1])
+
+    existing = witness_set.get(0)
+    if isinstance(existing, cbor.Tag):
+        existing = existing.value
+    by_key = {bytes(w[0]): w for w in (existing or [])}
+    for witness in witnesses:
+        by_key[bytes(witness[0])] = witness
+
+    new_witness_set = {0: cbor.Tag(SET_TAG, sorted(by_key.values(), key=_key_hash))}
+    for key in sorted(witness_set):
+        if key != 0:
+            new_witness_set[key] = witness_set[key]
+
+    items[1] = cbor.dumps(new_witness_set)
+    return cbor.dumps([cbor.RawCBOR(item) for item in items])
+
+
+def sign_transaction(tx_cbor, signing_keys):
+    '''Return CBOR of the transaction signed with the signing keys'''
+    tx_body_hash = blake2b_256(cbor.split_array(tx_cbor)[0])
+    return add_vkey_witnesses(tx_cbor, [make_vkey_witness(key, tx_body_hash) for key in signing_keys])
+
+
+def sign_tx_native(nft_dir, signing_wallets, raw_matx_path, tx_name=None):
+    """Sign transaction without calling cardano-cli, drop-in replacement for
+    `sign_tx()`. The signing keys are read once per Wallet."""
+    if type(signing_wallets) != list:
+        signing_wallets = [signing_wallets]
+
+    if tx_name is None:
+        tx_name = _tx_name_from_path(raw_matx_path)
+
+    signed_matx_path = os.path.join(nft_dir, f'{tx_name}.signed')
+
+    _, _, tx_cbor = read_text_envelope(raw_matx_path)
+    signed_cbor = sign_transaction(tx_cbor, [wallet.get_signing_key() for wallet in signing_wallets])
+
+    return write_text_envelope(signed_matx_path, SIGNED_TX_TYPE, TX_DESCRIPTION, signed_cbor)
+
+
+def write_witness(witness_path, witness):
+    '''Write vkey witness to a witness file in the format of `cardano-cli
+    transaction witness`'''
+    return write_text_envelope(witness_path, WITNESS_TYPE, KEY_WITNESS_DESCRIPTION, cbor.dumps([0, witness]))
+
+
+def read_witness(witness_path):
+    '''Return vkey witness [verification key, signature] of a witness
+    file'''
+    envelope_type, _, witness_cbor = read_text_envelope(witness_path)
+    if envelope_type != WITNESS_TYPE:
+        raise Exception(f'{witness_path} is not a transaction witness file ({envelope_type})')
+
+    witness_kind, witness = cbor.loads(witness_cbor)
+    if witness_kind != 0:
+        raise Exception(f'Unsupported witness in {witness_path}, only key witnesses can be assembled')
+
+    return witness
+
+
+def _witness_path(nft_dir, raw_matx_path, signer_name, tx_name):
+    if tx_name is None:
+        tx_name = _tx_name_from_path(raw_matx_path)
+    return os.path.join(nft_dir, f'{tx_name}.{signer_name}.witness')
+
+
+def witness_tx_native(nft_dir, signing_wallet, raw_matx_path, tx_name=None):
+    """Write the witness of one wallet for a transaction without calling
+    cardano-cli, counterpart of `witness_tx()`"""
+    _, _, tx_cbor = read_text_envelope(raw_matx_path)
+    witness = make_vkey_witness(signing_wallet.get_signing_key(), blake2b_256(cbor.split_array(tx_cbor)[0]))
+
+    return write_witness(_witness_path(nft_dir, raw_matx_path, signing_wallet.name, tx_name), witness)
+
+
+def assemble_tx_native(nft_dir, raw_matx_path, witness_paths, tx_name=None):
+    """Write signed transaction from a transaction and the witnesses of its
+    signers without calling cardano-cli, counterpart of `assemble_tx()`"""
+    if tx_name is None:
+        tx_name = _tx_name_from_path(raw_matx_path)
+
+    signed_matx_path = os.path.join(nft_dir, f'{tx_name}.signed')
+
+    _, _, tx_cbor = read_text_envelope(raw_matx_path)
+    signed_cbor = add_vkey_witnesses(tx_cbor, [read_witness(witness_path) for witness_path in witness_paths])
+
+    return write_text_envelope(signed_matx_path, SIGNED_TX_TYPE, TX_DESCRIPTION, signed_cbor)
+
+
+# Signing keys of the pool workers, each key file is read once per worker
+@functools.lru_cache(maxsize=None)
+def _cached_signing_key(skey_path):
+    return read_signing_key(skey_path)
+
+
+def _witness_worker(task):
+    raw_matx_path, skey_path, witness_path = task
+
+    _, _, tx_cbor = read_text_envelope(raw_matx_path)
+    witness = make_vkey_witness(_cached_signing_key(skey_path), blake2b_256(cbor.split_array(tx_cbor)[0]))
+
+    return write_witness(witness_path, witness)
+
+
+def sign_batch(nft_dir, raw_matx_paths, skey_paths, max_workers=None):
+    """Sign many transactions with the same signing keys. One witness per
+    transaction and key is created across a pool of `max_workers`
+    processes, then the witnesses of each transaction are assembled and
+    removed. Returns the paths of the signed transactions."""
+    tx_names = [_tx_name_from_path(raw_matx_path) for raw_matx_path in raw_matx_paths]
+    if len(set(tx_names)) != len(tx_names):
+        raise Exception('Transactions of a batch must have distinct file names, their signed transactions would overwrite each other')
+
+    # Witnesses are named after the batch and the position of the
+    # transaction, never after the transaction file
+    batch_name = unique_tx_name('batch')
+
+    tasks = []
+    witness_paths = []
+    for i, raw_matx_path in enumerate(raw_matx_paths):
+        paths = [os.path.join(nft_dir, f'{batch_name}-{i}.key{j}.witness') for j in range(len(skey_paths))]
+        tasks += [(raw_matx_path, skey_path, path) for skey_path, path in zip(skey_paths, paths)]
+        witness_paths.append(paths)
+
+    try:
+        if max_workers == 1:
+            for task in tasks:
+                _witness_worker(task)
+        else:
+            max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                chunksize = max(1, len(tasks) // (4 * max_workers))
+                list(executor.map(_witness_worker, tasks, chunksize=chunksize))
+
+        return [assemble_tx_native(nft_dir, raw_matx_path, paths)
+                for raw_matx_path, paths in zip(raw_matx_paths, witness_paths)]
+    finally:
+        for paths in witness_paths:
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
@@ -0,0 +1,73 @@
+import logging
+import threading
+import time
+
+from automint.config import TESTNET_MAGIC_DEFAULT
+from automint.utils.utils import network_name, query_tip
+
+logger = logging.getLogger(__name__)
+
+
+class TipProvider(object):
+    '''Provides the tip of the chain without a cardano-cli call per
+    request. The tip of each network is queried once, afterwards the
+    current slot is extrapolated from the time elapsed since the query
+    and the slot length (in seconds). The tip is queried again after
+    `resync_interval` seconds, when the extrapolated slot passes the end
+    of the epoch, or on `sync()`.
+
+    `query`, if given, is called with `use_testnet` and `testnet_magic`
+    instead of `query_tip()`.
+
+    '''
+    def __init__(self, slot_length=1, resync_interval=10 * 60, query=None):
+        assert slot_length > 0
+        self.slot_length = slot_length
+        self.resync_interval = resync_interval
+        self.query = query if query is not None else query_tip
+        # network name -> (tip, monotonic time of the query)
+        self._tips = {}
+        self._lock = threading.Lock()
+
+    def _sync(self, network, use_testnet, testnet_magic):
+        tip = self.query(use_testnet=use_testnet, testnet_magic=testnet_magic)
+        if not tip or 'slot' not in tip:
+            raise Exception(f'Unable to query tip for {network}')
+
+        logger.debug(f'Synced tip of {network} at slot {tip["slot"]}')
+        self._tips[network] = (tip, time.monotonic())
+        return self._tips[network]
+
+    def sync(self, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+        '''Query the tip now, returns the tip reported by the node'''
+        network = network_name(use_testnet, testnet_magic)
+        with self._lock:
+            return dict(self._sync(network, use_testnet, testnet_magic)[0])
+
+    def get_tip(self, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+        '''Return tip in the format of `query_tip()`, with `slot` and
+        `slotsToEpochEnd` extrapolated to the current time'''
+        network = network_name(use_testnet, testnet_magic)
+
+        with self._lock:
+            synced = self._tips.get(network)
+            if synced is None:
+                synced = self._sync(network, use_testnet, testnet_magic)
+
+            tip, synced_at = synced
+            elapsed = time.monotonic() - synced_at
+            slots = int(elapsed / self.slot_length)
+
+            if elapsed >= self.resync_interval or slots > tip.get('slotsToEpochEnd', slots):
+                tip, synced_at = self._sync(network, use_testnet, testnet_magic)
+                slots = 0
+
+        tip = dict(tip)
+        tip['slot'] += slots
+        if 'slotsToEpochEnd' in tip:
+            tip['slotsToEpochEnd'] -= slots
+        return tip
+
+    def current_slot(self, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+        '''Return the estimated current slot'''
+        return self.get_tip(use_testnet, testnet_magic)['slot']
@@ -0,0 +1,237 @@
+"""In-process construction of Conway era transactions, an alternative to
+`cardano-cli conway transaction build-raw` for the transactions automint
+supports: UTXO inputs, outputs without datums, minting with native
+scripts, metadata and an upper validity bound.
+
+The transaction is encoded the way the ledger serialises it, with body
+fields in ascending key order, inputs as a set (tag 258) sorted by
+transaction id and index, outputs in the legacy array format and
+multi-asset maps sorted by policy id and asset name."""
+import hashlib
+import json
+import os
+import re
+
+from automint.utils import bech32
+from automint.utils import cbor
+from automint.utils.envelope import read_text_envelope, write_text_envelope
+
+UNWITNESSED_TX_TYPE = 'Unwitnessed Tx ConwayEra'
+TX_DESCRIPTION = 'Ledger Cddl Format'
+
+# Tags of the CBOR encoding of sets and of Alonzo style auxiliary data
+SET_TAG = 258
+AUX_DATA_TAG = 259
+
+METADATA_MAX_BYTES = 64
+
+
+def blake2b_256(data):
+    return hashlib.blake2b(data, digest_size=32).digest()
+
+
+def _asset_name_key(name):
+    # Asset names are ordered by length first, then lexicographically
+    return (len(name), name)
+
+
+def encode_multi_asset(native_tokens, allow_negative=False):
+    '''Return multi-asset map {policy id: {asset name: quantity}} of the
+    native tokens of an Account'''
+    policies = {}
+    for token in native_tokens.values():
+        quantity = token['quantity']
+        if quantity < 0 and not allow_negative:
+            raise Exception(f'Negative quantity of {token["policy_id"]}.{token["name"]} in transaction output')
+        policy_id = bytes.fromhex(token['policy_id'])
+        policies.setdefault(policy_id, {})[token['name'].encode()] = quantity
+
+    return {
+        policy_id: {name: assets[name] for name in sorted(assets, key=_asset_name_key)}
+        for policy_id, assets in sorted(policies.items())
+    }
+
+
+def encode_value(account):
+    '''Return ledger encoding of the contents of an Account'''
+    if account.get_lovelace() < 0:
+        raise Exception('Negative lovelace in transaction output')
+
+    if len(account.get_native_tokens()) == 0:
+        return account.get_lovelace()
+
+    return [account.get_lovelace(), encode_multi_asset(account.get_native_tokens())]
+
+
+def encode_output(receiver):
+    '''Return ledger encoding of a transaction output to a receiver'''
+    _, address = bech32.decode(receiver.addr)
+    return [address, encode_value(receiver.get_account())]
+
+
+def encode_native_script(script):
+    '''Return CBOR structure of a native script given in the JSON format of
+    cardano-cli (as written by `write_policy_script()`)'''
+    script_type = script['type']
+
+    if script_type == 'sig':
+        return [0, bytes.fromhex(script['keyHash'])]
+    if script_type == 'all':
+        return [1, [encode_native_script(s) for s in script['scripts']]]
+    if script_type == 'any':
+        return [2, [encode_native_script(s) for s in script['scripts']]]
+    if script_type == 'atLeast':
+        return [3, script['required'], [encode_native_script(s) for s in script['scripts']]]
+    if script_type == 'after':
+        return [4, script['slot']]
+    if script_type == 'before':
+        return [5, script['slot']]
+
+    raise Exception(f'Unknown native script type {script_type}')
+
+
+def _metadata_text_or_bytes(value):
+    if value.startswith('0x'):
+        try:
+            value = bytes.fromhex(value[2:])
+        except ValueError:
+            pass
+    length = len(value) if isinstance(value, bytes) else len(value.encode())
+    if length > METADATA_MAX_BYTES:
+        raise Exception(f'Metadata value longer than {METADATA_MAX_BYTES} bytes: {value!r}')
+    return value
+
+
+def _metadata_key(key):
+    '''Convert JSON object key to a metadata map key, integer-like keys
+    become integers and `0x` prefixed hex keys become bytes, as done by
+    cardano-cli'''
+    if re.fullmatch(r'-?[0-9]+', key):
+        return int(key)
+    return _metadata_text_or_bytes(key)
+
+
+def _sort_canonical(items):
+    '''Sort map entries by the CBOR encoding of their keys, shorter
+    encodings first (RFC 7049 canonical order)'''
+    encoded = [(cbor.dumps(key), key, value) for key, value in items]
+    encoded.sort(key=lambda entry: (len(entry[0]), entry[0]))
+    return {key: value for _, key, value in encoded}
+
+
+def _metadata_value(value):
+    '''Convert JSON value to transaction metadata following the no schema
+    mapping of cardano-cli'''
+    if isinstance(value, bool) or value is None or isinstance(value, float):
+        raise Exception(f'Unsupported metadata value {value!r}')
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        return _metadata_text_or_bytes(value)
+    if isinstance(value, list):
+        return [_metadata_value(v) for v in value]
+    if isinstance(value, dict):
+        items = [(_metadata_key(k), _metadata_value(v)) for k, v in value.items()]
+        if len({k for k, _ in items}) != len(items):
+            raise Exception(f'Duplicate keys in metadata map {value!r}')
+        return _sort_canonical(items)
+
+    raise Exception(f'Unsupported metadata value {value!r}')
+
+
+def encode_metadata(metadata_json):
+    '''Return transaction metadata {label: value} from the JSON object of a
+    metadata file'''
+    metadata = {}
+    for label in sorted(metadata_json, key=int):
+        metadata[int(label)] = _metadata_value(metadata_json[label])
+    return metadata
+
+
+def encode_auxiliary_data(metadata_json):
+    return cbor.Tag(AUX_DATA_TAG, {0: encode_metadata(metadata_json)})
+
+
+def _load_json(fp):
+    with open(fp, 'r') as f:
+        content = json.load(f)
+        f.close()
+    return content
+
+
+def build_transaction(input_utxos, output_accounts, minting_account=None, fee=0, metadata=None, invalid_after=None, minting_script=None):
+    """Return CBOR of an unsigned transaction, arguments are the same as
+    for `build_raw_transaction()` except that `metadata` may also be the
+    already loaded metadata JSON object"""
+    if type(input_utxos) != list:
+        input_utxos = [input_utxos]
+
+    if type(output_accounts) != list:
+        output_accounts = [output_accounts]
+
+    if fee == 0:
+        output_accounts = list(map(lambda rec: rec.get_blank_receiver(), output_accounts))
+
+    inputs = sorted((bytes.fromhex(utxo.txHash), utxo.index) for utxo in input_utxos)
+
+    outputs = [encode_output(acc) for acc in output_accounts]
+
+    body = {
+        0: cbor.Tag(SET_TAG, [list(tx_in) for tx_in in inputs]),
+        1: outputs,
+        2: fee
+    }
+
+    if invalid_after:
+        assert type(invalid_after) == int
+        body[3] = invalid_after
+
+    auxiliary_data = None
+    if metadata:
+        metadata_json = _load_json(metadata) if isinstance(metadata, str) else metadata
+        auxiliary_data = cbor.dumps(encode_auxiliary_data(metadata_json))
+        body[7] = blake2b_256(auxiliary_data)
+
+    if minting_account and len(minting_account.get_account().get_native_tokens()) != 0:
+        body[9] = encode_multi_asset(minting_account.get_account().get_native_tokens(), allow_negative=True)
+
+    witness_set = {}
+    if minting_script:
+        if type(minting_script) == str:
+            minting_script = [minting_script]
+        scripts = sorted(cbor.dumps(encode_native_script(_load_json(fp))) for fp in minting_script)
+        witness_set[1] = cbor.Tag(SET_TAG, [cbor.RawCBOR(script) for script in scripts])
+
+    return cbor.dumps([
+        body,
+        witness_set,
+        True,
+        cbor.RawCBOR(auxiliary_data) if auxiliary_data is not None else None
+    ])
+
+
+def get_tx_id(tx_cbor):
+    """Return the id of a transaction (hex), the hash of its body as it is
+    serialised in the transaction. `tx_cbor` is either a full transaction
+    or a transaction body"""
+    if tx_cbor[0] >> 5 == 5:
+        return blake2b_256(tx_cbor).hex()
+    return blake2b_256(cbor.split_array(tx_cbor)[0]).hex()
+
+
+def get_tx_id_from_file(tx_path):
+    """Return the id of the transaction in a raw or signed transaction file,
+    same as `cardano-cli transaction txid`"""
+    _, _, tx_cbor = read_text_envelope(tx_path)
+    return get_tx_id(tx_cbor)
+
+
+def build_raw_transaction_native(working_dir, input_utxos, output_accounts, minting_account=None, fee=0, metadata=None, invalid_after=None, minting_script=None, tx_name='matx'):
+    """Builds transactions without calling cardano-cli, drop-in replacement
+    for `build_raw_transaction()`"""
+    raw_matx_path = os.path.join(working_dir, f'{tx_name}.raw')
+
+    tx_cbor = build_transaction(input_utxos, output_accounts, minting_account=minting_account, fee=fee,
+                                metadata=metadata, invalid_after=invalid_after, minting_script=minting_script)
+
+    return write_text_envelope(raw_matx_path, UNWITNESSED_TX_TYPE, TX_DESCRIPTION, tx_cbor)
@@ -1,45 +1,64 @@
-import subprocess
 import os
+import uuid
 import logging
 import json
 import requests
 import binascii
-from automint.config import CARDANO_CLI, TESTNET_MAGIC_DEFAULT
+import functools
+import sys
+from automint.config import TESTNET_MAGIC_DEFAULT
+from automint.utils.address import POINTER_CREDENTIAL, stake_address, stake_credential, verification_key_hash
+from automint.utils.policy import read_policy_script, script_hash, sig_script, time_locked_script, write_script
+from automint.utils.runner import get_runner
 
 logger = logging.getLogger(__name__)
 
+# Token names repeat across every UTXO, receiver and transaction so the
+# conversions are cached
+@functools.lru_cache(maxsize=65536)
 def convert_to_hex(ascii_str):
     hex_str = binascii.hexlify(ascii_str.encode())
     return hex_str.decode('utf-8')
 
 
+@functools.lru_cache(maxsize=65536)
 def convert_from_hex(hex_str):
     return bytes.fromhex(hex_str).decode('UTF-8')
 
-    
 
-def get_protocol_params(working_dir, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
-    """Query protocol parameters and write to file"""
+@functools.lru_cache(maxsize=65536)
+def split_token_id(token_id):
+    """Split a `<policy_id>.<name>` token id into its interned parts"""
+    policy_id, name = token_id.split('.')
+    return sys.intern(policy_id), sys.intern(name)
+
+
+def _network_args(use_testnet, testnet_magic):
+    if use_testnet:
+        return ['--testnet-magic', str(testnet_magic)]
+    return ['--mainnet']
+
+
+def network_name(use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+    '''Return name identifying the network, used as key of caches'''
+    return f'testnet-{testnet_magic}' if use_testnet else 'mainnet'
 
+
+def _protocol_params_cmd(working_dir, use_testnet, testnet_magic):
     protocol_json_path = os.path.join(working_dir, 'protocol.json')
 
-    cmd_builder = [CARDANO_CLI.replace(' ', '\ '),
-                   'conway',
+    cmd_builder = ['conway',
                    'query',
                    'protocol-parameters',
                    '--out-file',
                    protocol_json_path]
 
-    if use_testnet:
-        cmd_builder.append('--testnet-magic')
-        cmd_builder.append(str(testnet_magic))
-    else:
-        cmd_builder.append('--mainnet')
+    cmd_builder += _network_args(use_testnet, testnet_magic)
 
-    cmd = ' '.join(cmd_builder)
+    return cmd_builder, protocol_json_path
 
-    proc = subprocess.run(cmd, capture_output=True, text=True, shell=True)
 
+def _protocol_params_result(proc, protocol_json_path):
     if proc.stderr != '':
         logger.error('Failed to fetch protocol parameters...')
         return ''
@@ -47,90 +66,73 @@ def get_protocol_params(working_dir, use_testnet=False, testnet_magic=TESTNET_MA
     return protocol_json_path
 
 
+def get_protocol_params(working_dir, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+    """Query protocol parameters and write to file"""
+    cmd_builder, protocol_json_path = _protocol_params_cmd(working_dir, use_testnet, testnet_magic)
+
+    proc = get_runner().run(cmd_builder)
+
+    return _protocol_params_result(proc, protocol_json_path)
+
+
 def get_key_hash(policy_vkey_path):
-    """Generate and return key hash given policy verification key"""
+    """Return key hash of a verification key, computed in-process"""
 
     if not os.path.exists(policy_vkey_path):
         raise Exception(f'Policy verification key file expected at {policy_vkey_path} does not exists.')
 
-    proc = subprocess.run([CARDANO_CLI,
-                           'address',
-                           'key-hash',
-                           '--payment-verification-key-file',
-                           policy_vkey_path], capture_output=True, text=True)
+    return verification_key_hash(policy_vkey_path)
+
 
-    if proc.stderr != "":
-        logger.error('Failed to compute keyHash')
+def unique_tx_name(prefix='matx'):
+    """Return a transaction name not used by any other call, to build
+    several transactions in the same directory concurrently"""
+    return f'{prefix}-{uuid.uuid4().hex}'
 
-    return proc.stdout.strip('\n')
 
+def _tx_name_from_path(raw_matx_path):
+    name = os.path.basename(raw_matx_path)
+    return name[:-len('.raw')] if name.endswith('.raw') else name
 
-def write_policy_script(working_dir, keyHash, force=False):
+
+def write_policy_script(working_dir, keyHash, force=False, script_name='policy'):
     """Write policy script to file and return location"""
-    script_path = os.path.join(working_dir, 'policy.script')
+    script_path = os.path.join(working_dir, f'{script_name}.script')
 
     if force or not os.path.exists(script_path):
         logger.info(f'Writing policy script to {script_path}')
-        with open(script_path, 'w') as script_f:
-            json.dump({
-                'keyHash': keyHash,
-                'type': 'sig'
-            }, script_f, indent=4)
-            script_f.close()
+        write_script(script_path, sig_script(keyHash))
 
     return script_path
 
 
-def write_policy_script_with_time_lock(working_dir, keyHash, before, force=False):
+def write_policy_script_with_time_lock(working_dir, keyHash, before, force=False, script_name='policy'):
     """Write policy script to file and return location"""
-    script_path = os.path.join(working_dir, 'policy.script')
+    script_path = os.path.join(working_dir, f'{script_name}.script')
 
     if force or not os.path.exists(script_path):
         logger.info(f'Writing policy script to {script_path}')
-        with open(script_path, 'w') as script_f:
-            json.dump({
-                'type': 'all',
-                'scripts': [{
-                    'keyHash': keyHash,
-                    'type': 'sig'
-                }, {
-                    'slot': before,
-                    'type': 'before'
-                }]
-            }, script_f, indent=4)
-            script_f.close()
+        write_script(script_path, time_locked_script(keyHash, before))
 
     return script_path
 
 
 def get_policy_id(policy_script_path):
-    """Return policy id given policy script"""
-    proc = subprocess.run([CARDANO_CLI,
-                           'conway',
-                           'transaction',
-                           'policyid',
-                           '--script-file',
-                           policy_script_path], capture_output=True, text=True)
-
-    if proc.stderr != '':
-        logger.error(f'Error encountered when determining policy ID from script\n{proc.stderr}')
+    """Return policy id given policy script, computed in-process"""
+    return script_hash(read_policy_script(policy_script_path))
 
-    return proc.stdout.strip('\n')
-
-def build_raw_transaction(working_dir, input_utxos, output_accounts, minting_account=None, fee=0, metadata=None, invalid_after=None, minting_script=None):
-    """Builds transactions"""
 
+def _build_raw_transaction_cmd(working_dir, input_utxos, output_accounts, minting_account, fee, metadata, invalid_after, minting_script, tx_name='matx'):
     if type(input_utxos) != list:
         input_utxos = [input_utxos]
 
     if type(output_accounts) != list:
         output_accounts = [output_accounts]
 
-    raw_matx_path = os.path.join(working_dir, 'matx.raw')
+    raw_matx_path = os.path.join(working_dir, f'{tx_name}.raw')
 
     # Only generate/overwrite the keys if they do not exist or force=True
-    cmd_builder = [CARDANO_CLI.replace(' ', '\ '),
-                   'conway',
+    cmd_builder = ['conway',
                    'transaction',
                    'build-raw',
                    '--fee',
@@ -147,10 +149,10 @@ def build_raw_transaction(working_dir, input_utxos, output_accounts, minting_acc
 
     for acc in output_accounts:
         cmd_builder.append('--tx-out')
-        cmd_builder.append(str(acc))
+        cmd_builder.append(acc.format_tx_out())
 
     if minting_account:
-        cmd_builder.append(f'--mint={minting_account}')
+        cmd_builder.append(f'--mint={minting_account.format_mint()}')
 
     if metadata:
         cmd_builder.append('--metadata-json-file')
@@ -172,21 +174,29 @@ def build_raw_transaction(working_dir, input_utxos, output_accounts, minting_acc
                 cmd_builder.append('--minting-script-file')
                 cmd_builder.append(script)
 
-    cmd = " ".join(cmd_builder)
+    logger.debug(f'Transaction build command:\n{cmd_builder}')
 
-    logger.debug(f'Transaction build command:\n{cmd}')
+    return cmd_builder, raw_matx_path
 
-    proc = subprocess.run(cmd, capture_output=True, text=True, shell=True)
 
+def _build_raw_transaction_result(proc, cmd_builder, raw_matx_path):
     if proc.stderr != '':
         logger.error(f'Error encountered when building transaction\n{cmd_builder}\n{proc.stderr}')
 
     return raw_matx_path
 
 
-def calculate_tx_fee(raw_matx_path, protocol_json_path, input_utxos, output_accounts, witness_count=2, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
-    """Calculate transaction fees"""
+def build_raw_transaction(working_dir, input_utxos, output_accounts, minting_account=None, fee=0, metadata=None, invalid_after=None, minting_script=None, tx_name='matx'):
+    """Builds transactions, written to `<tx_name>.raw` in working_dir"""
+    cmd_builder, raw_matx_path = _build_raw_transaction_cmd(working_dir, input_utxos, output_accounts, minting_account,
+                                                            fee, metadata, invalid_after, minting_script, tx_name)
+
+    proc = get_runner().run(cmd_builder)
+
+    return _build_raw_transaction_result(proc, cmd_builder, raw_matx_path)
+
 
+def _calculate_tx_fee_cmd(raw_matx_path, protocol_json_path, input_utxos, output_accounts, witness_count, use_testnet, testnet_magic):
     if type(input_utxos) != list:
         input_utxos = [input_utxos]
 
@@ -195,8 +205,7 @@ def calculate_tx_fee(raw_matx_path, protocol_json_path, input_utxos, output_acco
 
     assert witness_count >= len(input_utxos)
 
-    cmd_builder = [CARDANO_CLI.replace(' ', '\ '),
-                   'conway',
+    cmd_builder = ['conway',
                    'transaction',
                    'calculate-min-fee',
                    '--tx-body-file',
@@ -210,18 +219,14 @@ def calculate_tx_fee(raw_matx_path, protocol_json_path, input_utxos, output_acco
                    '--protocol-params-file',
                    protocol_json_path]
 
-    if use_testnet:
-        cmd_builder.append('--testnet-magic')
-        cmd_builder.append(str(testnet_magic))
-    else:
-        cmd_builder.append('--mainnet')
+    cmd_builder += _network_args(use_testnet, testnet_magic)
 
-    cmd = ' '.join(cmd_builder)
+    logger.debug(cmd_builder)
 
-    logger.debug(cmd)
+    return cmd_builder
 
-    proc = subprocess.run(cmd, capture_output=True, text=True, shell=True)
 
+def _calculate_tx_fee_result(proc):
     if proc.stderr != '':
         logger.error(f'Error encountered when calculating transcation fee...\n{proc.stdout}')
         logger.debug(f'{proc.stderr}')
@@ -230,16 +235,27 @@ def calculate_tx_fee(raw_matx_path, protocol_json_path, input_utxos, output_acco
     return int(proc.stdout.split()[0])
 
 
-def sign_tx(nft_dir, signing_wallets, raw_matx_path, force=False, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
-    """Generate and write signed transaction file"""
+def calculate_tx_fee(raw_matx_path, protocol_json_path, input_utxos, output_accounts, witness_count=2, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+    """Calculate transaction fees"""
+    cmd_builder = _calculate_tx_fee_cmd(raw_matx_path, protocol_json_path, input_utxos, output_accounts,
+                                        witness_count, use_testnet, testnet_magic)
+
+    proc = get_runner().run(cmd_builder)
+
+    return _calculate_tx_fee_result(proc)
+
+
+def _sign_tx_cmd(nft_dir, signing_wallets, raw_matx_path, use_testnet, testnet_magic, tx_name=None):
     if type(signing_wallets) != list:
         signing_wallets = [signing_wallets]
 
-    signed_matx_path = os.path.join(nft_dir, 'matx.signed')
+    if tx_name is None:
+        tx_name = _tx_name_from_path(raw_matx_path)
+
+    signed_matx_path = os.path.join(nft_dir, f'{tx_name}.signed')
 
     # Only generate/overwrite the keys if they do not exist or force=True
-    cmd_builder = [CARDANO_CLI.replace(' ', '\ '),
-                   'conway',
+    cmd_builder = ['conway',
                    'transaction',
                    'sign',
                    '--tx-body-file',
@@ -251,18 +267,14 @@ def sign_tx(nft_dir, signing_wallets, raw_matx_path, force=False, use_testnet=Fa
         cmd_builder.append('--signing-key-file')
         cmd_builder.append(wallet.get_skey_path())
 
-    if use_testnet:
-        cmd_builder.append('--testnet-magic')
-        cmd_builder.append(str(testnet_magic))
-    else:
-        cmd_builder.append('--mainnet')
+    cmd_builder += _network_args(use_testnet, testnet_magic)
 
-    cmd = ' '.join(cmd_builder)
+    logger.debug(cmd_builder)
 
-    logger.debug(cmd)
+    return cmd_builder, signed_matx_path
 
-    proc = subprocess.run(cmd, capture_output=True, text=True, shell=True)
 
+def _sign_tx_result(proc, signed_matx_path):
     if proc.stderr != '':
         logger.error(f'Error encountered when signing transaction\n{proc.stderr}')
         return ''
@@ -270,26 +282,112 @@ def sign_tx(nft_dir, signing_wallets, raw_matx_path, force=False, use_testnet=Fa
     return signed_matx_path
 
 
-def submit_transaction(signed_matx_path, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
-    """Submit signed transaction"""
+def sign_tx(nft_dir, signing_wallets, raw_matx_path, force=False, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT, tx_name=None):
+    """Generate and write signed transaction file `<tx_name>.signed`, by
+    default named after the raw transaction file"""
+    cmd_builder, signed_matx_path = _sign_tx_cmd(nft_dir, signing_wallets, raw_matx_path, use_testnet, testnet_magic, tx_name)
+
+    proc = get_runner().run(cmd_builder)
+
+    return _sign_tx_result(proc, signed_matx_path)
+
+
+def _witness_tx_cmd(nft_dir, signing_wallet, raw_matx_path, use_testnet, testnet_magic, tx_name=None):
+    if tx_name is None:
+        tx_name = _tx_name_from_path(raw_matx_path)
+
+    witness_path = os.path.join(nft_dir, f'{tx_name}.{signing_wallet.name}.witness')
+
+    cmd_builder = ['conway',
+                   'transaction',
+                   'witness',
+                   '--tx-body-file',
+                   raw_matx_path,
+                   '--signing-key-file',
+                   signing_wallet.get_skey_path(),
+                   '--out-file',
+                   witness_path]
+
+    cmd_builder += _network_args(use_testnet, testnet_magic)
+
+    logger.debug(cmd_builder)
+
+    return cmd_builder, witness_path
 
-    cmd_builder = [CARDANO_CLI.replace(' ', '\ '),
-                   'conway',
+
+def _witness_tx_result(proc, witness_path):
+    if proc.stderr != '':
+        logger.error(f'Error encountered when witnessing transaction\n{proc.stderr}')
+        return ''
+
+    return witness_path
+
+
+def witness_tx(nft_dir, signing_wallet, raw_matx_path, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT, tx_name=None):
+    """Write the witness of one wallet for a transaction to
+    `<tx_name>.<wallet name>.witness`, to be combined with
+    `assemble_tx()`"""
+    cmd_builder, witness_path = _witness_tx_cmd(nft_dir, signing_wallet, raw_matx_path, use_testnet, testnet_magic, tx_name)
+
+    proc = get_runner().run(cmd_builder)
+
+    return _witness_tx_result(proc, witness_path)
+
+
+def _assemble_tx_cmd(nft_dir, raw_matx_path, witness_paths, tx_name=None):
+    if tx_name is None:
+        tx_name = _tx_name_from_path(raw_matx_path)
+
+    signed_matx_path = os.path.join(nft_dir, f'{tx_name}.signed')
+
+    cmd_builder = ['conway',
+                   'transaction',
+                   'assemble',
+                   '--tx-body-file',
+                   raw_matx_path,
+                   '--out-file',
+                   signed_matx_path]
+
+    for witness_path in witness_paths:
+        cmd_builder.append('--witness-file')
+        cmd_builder.append(witness_path)
+
+    logger.debug(cmd_builder)
+
+    return cmd_builder, signed_matx_path
+
+
+def _assemble_tx_result(proc, signed_matx_path):
+    if proc.stderr != '':
+        logger.error(f'Error encountered when assembling transaction\n{proc.stderr}')
+        return ''
+
+    return signed_matx_path
+
+
+def assemble_tx(nft_dir, raw_matx_path, witness_paths, tx_name=None):
+    """Write signed transaction `<tx_name>.signed` from a transaction and
+    the witnesses of its signers"""
+    cmd_builder, signed_matx_path = _assemble_tx_cmd(nft_dir, raw_matx_path, witness_paths, tx_name)
+
+    proc = get_runner().run(cmd_builder)
+
+    return _assemble_tx_result(proc, signed_matx_path)
+
+
+def _submit_transaction_cmd(signed_matx_path, use_testnet, testnet_magic):
+    cmd_builder = ['conway',
                    'transaction',
                    'submit',
                    '--tx-file',
                    signed_matx_path]
 
-    if use_testnet:
-        cmd_builder.append('--testnet-magic')
-        cmd_builder.append(str(testnet_magic))
-    else:
-        cmd_builder.append('--mainnet')
+    cmd_builder += _network_args(use_testnet, testnet_magic)
 
-    cmd = ' '.join(cmd_builder)
+    return cmd_builder
 
-    proc = subprocess.run(cmd, capture_output=True, text=True, shell=True)
 
+def _submit_transaction_result(proc):
     if proc.stderr != '':
         logger.error(f'Error encountered when submitting transaction\n{proc.stderr}')
         return False
@@ -299,6 +397,15 @@ def submit_transaction(signed_matx_path, use_testnet=False, testnet_magic=TESTNE
     return True
 
 
+def submit_transaction(signed_matx_path, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+    """Submit signed transaction"""
+    cmd_builder = _submit_transaction_cmd(signed_matx_path, use_testnet, testnet_magic)
+
+    proc = get_runner().run(cmd_builder)
+
+    return _submit_transaction_result(proc)
+
+
 def get_return_address_from_utxo(utxo):
     try:
         r = requests.get(f"https://cardanoscan.io/transaction/{utxo}")
@@ -317,6 +424,18 @@ def get_return_address_from_utxo(utxo):
 
 
 def get_stake_key(address):
+    """Return stake address of an address, '' if it has none. Derived
+    in-process except for pointer addresses, looked up on cardanoscan.io"""
+    try:
+        credential = stake_credential(address)
+    except Exception:
+        logger.error(f'Invalid address {address}')
+        return ''
+    if credential is None:
+        return ''
+    if credential[0] != POINTER_CREDENTIAL:
+        return stake_address(address)
+
     try:
         req = requests.get(f"https://cardanoscan.io/address/{address}")
 
@@ -330,8 +449,7 @@ def get_stake_key(address):
 
 
 def get_cli_version():
-    proc = subprocess.run([CARDANO_CLI,
-                           '--version'], capture_output=True, text=True,)
+    proc = get_runner().run(['--version'])
 
     if proc.stderr != '':
         logger.error('Unable to get version')
@@ -340,24 +458,25 @@ def get_cli_version():
     return proc.stdout.split()[1]
 
 
-def query_tip(use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
-    cmd_builder = [CARDANO_CLI,
-                   'latest',
+def _query_tip_cmd(use_testnet, testnet_magic):
+    cmd_builder = ['latest',
                    'query',
                    'tip']
 
-    if use_testnet:
-        cmd_builder.append('--testnet-magic')
-        cmd_builder.append(str(testnet_magic))
-    else:
-        cmd_builder.append('--mainnet')
+    cmd_builder += _network_args(use_testnet, testnet_magic)
 
-    cmd = ' '.join(cmd_builder)
+    return cmd_builder
 
-    proc = subprocess.run(cmd, capture_output=True, text=True, shell=True)
 
+def _query_tip_result(proc):
     if proc.stderr != '':
         logger.error('Unable to query tip information')
         return {}
 
     return json.loads(proc.stdout)
+
+
+def query_tip(use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+    proc = get_runner().run(_query_tip_cmd(use_testnet, testnet_magic))
+
+    return _query_tip_result(proc)
@@ -0,0 +1,131 @@
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # File locks are not available on Windows, the ledger file can then
+    # only be shared between threads of one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class SpendLedger(object):
+    '''Record of the UTXOs which are leased to a transaction being built or
+    were spent by a submitted transaction, so that concurrent builders
+    never select the same UTXO.
+
+    A lease is held by an owner (any string, such as the transaction
+    name) and expires after `lease_duration` seconds unless the UTXOs are
+    released or marked spent before. Spent UTXOs are remembered for
+    `spent_duration` seconds, until a UTXO query no longer returns them.
+
+    With `path`, the ledger is kept in a JSON file which is locked for
+    every operation so that several processes can share it. Queries take
+    a shared lock and the file is only rewritten when an operation
+    changed the entries.
+
+    '''
+    def __init__(self, path=None, lease_duration=10 * 60, spent_duration=60 * 60):
+        self.path = path
+        self.lease_duration = lease_duration
+        self.spent_duration = spent_duration
+        # identifier -> {'owner': ..., 'state': 'leased' | 'spent', 'expires_at': ...}
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _transaction(self, write=True):
+        '''Hold the ledger for a read-modify-write of its entries, or only
+        for reading them unless `write`'''
+        with self._lock:
+            if self.path is None:
+                self._expire()
+                yield self._entries
+                return
+
+            with open(self.path, 'a+') as f:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX if write else fcntl.LOCK_SH)
+                try:
+                    f.seek(0)
+                    content = f.read()
+                    self._entries = json.loads(content) if content.strip() != '' else {}
+                    # Expired entries of a query are dropped by the next write
+                    self._expire()
+
+                    yield self._entries
+
+                    if write:
+                        updated = json.dumps(self._entries)
+                        if updated != content:
+                            f.seek(0)
+                            f.truncate()
+                            f.write(updated)
+                            f.flush()
+                            os.fsync(f.fileno())
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                f.close()
+
+    def _expire(self):
+        now = time.time()
+        for identifier in [i for i, entry in self._entries.items() if entry['expires_at'] <= now]:
+            entry = self._entries.pop(identifier)
+            if entry['state'] == 'leased':
+                logger.info(f'Lease of {identifier} by {entry["owner"]} expired')
+
+    def lease(self, identifiers, owner):
+        '''Lease all the UTXOs to `owner`, or none of them if any is already
+        leased or spent. Returns True if the lease was granted.'''
+        identifiers = list(identifiers)
+        with self._transaction() as entries:
+            for identifier in identifiers:
+                entry = entries.get(identifier)
+                if entry is not None and (entry['state'] == 'spent' or entry['owner'] != owner):
+                    return False
+
+            expires_at = time.time() + self.lease_duration
+            for identifier in identifiers:
+                entries[identifier] = {'owner': owner, 'state': 'leased', 'expires_at': expires_at}
+
+        return True
+
+    def release(self, owner):
+        '''Release the UTXOs leased to `owner`, returns their identifiers'''
+        with self._transaction() as entries:
+            released = [i for i, entry in entries.items() if entry['owner'] == owner and entry['state'] == 'leased']
+            for identifier in released:
+                entries.pop(identifier)
+
+        return released
+
+    def mark_spent(self, owner):
+        '''Mark the UTXOs leased to `owner` as spent, returns their
+        identifiers'''
+        with self._transaction() as entries:
+            spent = [i for i, entry in entries.items() if entry['owner'] == owner and entry['state'] == 'leased']
+            expires_at = time.time() + self.spent_duration
+            for identifier in spent:
+                entries[identifier] = {'owner': owner, 'state': 'spent', 'expires_at': expires_at}
+
+        return spent
+
+    def unavailable(self):
+        '''Return set of identifiers of the UTXOs leased or spent'''
+        with self._transaction(write=False) as entries:
+            return set(entries)
+
+    def is_available(self, identifier):
+        return identifier not in self.unavailable()
+
+    def leased_to(self, owner):
+        '''Return identifiers of the UTXOs currently leased to `owner`'''
+        with self._transaction(write=False) as entries:
+            return [i for i, entry in entries.items() if entry['owner'] == owner and entry['state'] == 'leased']
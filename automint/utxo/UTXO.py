@@ -1,20 +1,31 @@
-import copy
-from automint.account import Account
+import json
+import sys
+from automint.account import Account, AccountBuilder
 from automint.receivers import TxReceiver
-from automint.utils import convert_to_hex
-from automint.utils.utils import convert_from_hex
+from automint.utils import bech32
+from automint.utils import cbor
+from automint.utils.envelope import read_text_envelope
+from automint.utils.transaction import get_tx_id
+from automint.utils.utils import convert_from_hex, split_token_id
 
 
 class UTXO(object):
+    '''A UTXO keeps its lovelace amount and the raw native asset segment
+    of the cardano-cli output. The native assets are only decoded into an
+    Account the first time `get_account()` is called.'''
+    __slots__ = ('txHash', 'index', '_lovelace', '_raw_assets', '_account')
+
     def __init__(self, utxo_str):
         self.txHash = None
         self.index = None
-        self.account = None
+        self._lovelace = None
+        self._raw_assets = None
+        self._account = None
         self.parse_utxo_str(utxo_str)
 
         assert self.txHash != None
         assert self.index != None
-        assert self.account != None
+        assert self._lovelace != None
 
     def parse_utxo_str(self, utxo_str):
         # Split raw utxo string
@@ -24,36 +35,103 @@ class UTXO(object):
         self.txHash = utxo_str[0]
         self.index = int(utxo_str[1])
 
-        # Create account
-        self.account = Account()
-
-        # Parse tokens component
-        tokens_str = utxo_str[2].split('+')
-
-        # Extract lovelace
-        lovelace = int(tokens_str[0].replace('lovelace', '').strip())
-        self.account = self.account.add_lovelace(lovelace)
-
-        # Extract native_tokens
-        if len(tokens_str) >= 2:
-            native_assets_str = tokens_str[1:]
-            for native_asset_str in native_assets_str:
-                if native_asset_str.strip() == 'TxOutDatumHashNone' or native_asset_str.strip() == 'TxOutDatumNone':
-                    continue
-                qty, asset_hex = native_asset_str.strip().split()
-                qty = int(qty)
-
-                policy_id, ticker_hex = asset_hex.split('.')
-                ticker = convert_from_hex(ticker_hex)
-
-                asset = f'{policy_id}.{ticker}'
-                self.account = self.account.add_native_token(asset, qty)
+        # Extract lovelace, the native tokens are decoded on demand
+        tokens_str = utxo_str[2].split('+', 1)
+        self._lovelace = int(tokens_str[0].replace('lovelace', '').strip())
+        self._raw_assets = tokens_str[1] if len(tokens_str) == 2 else ''
+        self._account = None
+
+    @staticmethod
+    def _iter_raw_assets_str(raw_assets):
+        '''Yield (qty, policy_id, ticker_hex) from the native asset
+        segment of a row of the `query utxo` table'''
+        for native_asset_str in raw_assets.split('+'):
+            native_asset_str = native_asset_str.strip()
+            if native_asset_str == '':
+                # Lovelace only rows without a datum have no asset segment
+                continue
+            if native_asset_str.startswith('TxOutDatum'):
+                # The datum is always the last element of the row
+                break
+            qty, asset_hex = native_asset_str.split()
+            policy_id, ticker_hex = split_token_id(asset_hex)
+            yield int(qty), policy_id, ticker_hex
+
+    @staticmethod
+    def _iter_raw_assets_json(raw_assets):
+        '''Yield (qty, policy_id, ticker_hex) from the `value` of a UTXO in
+        the `query utxo --output-json` output'''
+        for policy_id, assets in raw_assets.items():
+            if policy_id == 'lovelace':
+                continue
+            policy_id = sys.intern(policy_id)
+            for ticker_hex, qty in assets.items():
+                yield qty, policy_id, ticker_hex
+
+    def _iter_raw_assets(self):
+        if isinstance(self._raw_assets, dict):
+            return self._iter_raw_assets_json(self._raw_assets)
+        return self._iter_raw_assets_str(self._raw_assets)
+
+    def _decode_account(self):
+        # Each asset appears at most once in a UTXO so the token
+        # dictionary is filled directly rather than through AccountBuilder
+        native_tokens = {}
+        for qty, policy_id, ticker_hex in self._iter_raw_assets():
+            ticker = convert_from_hex(ticker_hex)
+            native_tokens[sys.intern(f'{policy_id}.{ticker}')] = {
+                'name': ticker,
+                'policy_id': policy_id,
+                'quantity': qty
+            }
+
+        return Account._from_parts(self._lovelace, native_tokens)
+
+    @classmethod
+    def from_json(cls, identifier, utxo_json):
+        '''Create UTXO from an entry of `cardano-cli query utxo --output-json`,
+        `identifier` is the `<txHash>#<index>` key of the entry'''
+        utxo = cls.__new__(cls)
+
+        tx_hash, index = identifier.split('#')
+        utxo.txHash = tx_hash
+        utxo.index = int(index)
+        utxo._lovelace = utxo_json['value']['lovelace']
+        utxo._raw_assets = utxo_json['value']
+        utxo._account = None
+
+        return utxo
+
+    @classmethod
+    def from_account(cls, tx_hash, index, account):
+        '''Create UTXO holding the contents of an Account, such as an output
+        of a transaction which is not on chain yet'''
+        utxo = cls.__new__(cls)
+
+        utxo.txHash = tx_hash
+        utxo.index = index
+        utxo._lovelace = account.get_lovelace()
+        utxo._raw_assets = None
+        utxo._account = account
+
+        return utxo
 
     def get_utxo_identifier(self):
         return f'{self.txHash}#{self.index}'
 
+    def get_lovelace(self):
+        '''Return lovelace in UTXO without decoding the native tokens'''
+        return self._lovelace
+
     def get_account(self):
-        return self.account
+        if self._account is None:
+            self._account = self._decode_account()
+            self._raw_assets = None
+        return self._account
+
+    @property
+    def account(self):
+        return self.get_account()
 
     def __str__(self):
         return f'{self.get_utxo_identifier()}'
@@ -61,8 +139,77 @@ class UTXO(object):
     def convert_to_receiver(self, addr):
         '''Converts UTXO to TxReceiver object, copying all contents over'''
         new_receiver = TxReceiver(addr)
-        new_receiver.account = self.account.duplicate()
+        new_receiver.account = self.get_account().duplicate()
         return new_receiver
 
     def size(self):
-        return self.account.size()
+        if self._account is not None:
+            return self._account.size()
+        return 1 + sum(1 for _ in self._iter_raw_assets())
+
+
+def iter_utxo_table(lines):
+    '''Yield UTXOs from an iterable over the lines of the text table
+    printed by `cardano-cli query utxo`, such as its stdout pipe'''
+    lines = iter(lines)
+
+    # Skip the header and separator lines
+    for _ in range(2):
+        next(lines, None)
+
+    for line in lines:
+        line = line.strip()
+        if line != '':
+            yield UTXO(line)
+
+
+def parse_utxo_table(output):
+    '''Return list of UTXOs parsed from the text table printed by
+    `cardano-cli query utxo`'''
+    return list(iter_utxo_table(output.split('\n')))
+
+
+def parse_utxo_json(output):
+    '''Return list of UTXOs parsed from the output of `cardano-cli query
+    utxo --output-json`'''
+    return [UTXO.from_json(identifier, utxo_json) for identifier, utxo_json in json.loads(output).items()]
+
+
+def _decode_output_value(value):
+    '''Return Account of the ledger encoding of a transaction output value'''
+    if isinstance(value, int):
+        return Account().add_lovelace(value)
+
+    lovelace, multi_asset = value
+    builder = AccountBuilder()
+    builder.add_lovelace(lovelace)
+    for policy_id, assets in multi_asset.items():
+        for name, quantity in assets.items():
+            builder.add_native_token(f'{policy_id.hex()}.{name.decode()}', quantity)
+    return builder.build()
+
+
+def utxos_from_transaction(tx_path, address=None):
+    '''Return the UTXOs created by a transaction (raw or signed file) once
+    it is on chain, without waiting for it to be. The transaction id is
+    computed locally so that the outputs, such as the change, can be spent
+    by a following transaction right away. With `address`, only the
+    outputs paying to that address are returned.'''
+    _, _, tx_cbor = read_text_envelope(tx_path)
+    tx_id = get_tx_id(tx_cbor)
+    body = cbor.loads(cbor.split_array(tx_cbor)[0])
+
+    address_bytes = bech32.decode(address)[1] if address is not None else None
+
+    utxos = []
+    for index, output in enumerate(body[1]):
+        # Legacy array outputs and Babbage style map outputs both hold the
+        # address at 0 and the value at 1
+        output_address, value = output[0], output[1]
+
+        if address_bytes is not None and output_address != address_bytes:
+            continue
+
+        utxos.append(UTXO.from_account(tx_id, index, _decode_output_value(value)))
+
+    return utxos
@@ -0,0 +1,149 @@
+import bisect
+from collections.abc import MutableMapping
+
+
+class UTXOSet(MutableMapping):
+    '''Mapping of `<txHash>#<index>` identifiers to UTXOs which maintains
+    indexes over the UTXOs for fast selection.
+
+    UTXOs are indexed by lovelace amount and by size (number of assets,
+    see `UTXO.size()`), both kept as sorted lists so that a selection is
+    a binary search. The index by asset id needs the native tokens of
+    every UTXO to be decoded and is therefore only built on the first
+    asset query, it is maintained from then on.
+
+    '''
+    def __init__(self, utxos=()):
+        self._utxos = {}
+        self._by_lovelace = []
+        self._by_size = {}
+        self._by_asset = None
+
+        # Bulk load, the indexes are sorted once rather than per UTXO. A
+        # later UTXO with the same identifier replaces an earlier one.
+        for utxo in utxos:
+            self._utxos[utxo.get_utxo_identifier()] = utxo
+
+        self._by_lovelace = sorted((utxo.get_lovelace(), identifier) for identifier, utxo in self._utxos.items())
+        for key in self._by_lovelace:
+            self._by_size.setdefault(self._utxos[key[1]].size(), []).append(key)
+
+    def add(self, utxo):
+        '''Add UTXO to the set, replacing any UTXO with the same identifier'''
+        identifier = utxo.get_utxo_identifier()
+        if identifier in self._utxos:
+            self.remove(identifier)
+
+        self._utxos[identifier] = utxo
+
+        key = (utxo.get_lovelace(), identifier)
+        bisect.insort(self._by_lovelace, key)
+        bisect.insort(self._by_size.setdefault(utxo.size(), []), key)
+
+        if self._by_asset is not None:
+            self._index_assets(utxo)
+
+    def remove(self, identifier):
+        '''Remove and return the UTXO with the given identifier'''
+        utxo = self._utxos.pop(identifier)
+
+        key = (utxo.get_lovelace(), identifier)
+        self._remove_key(self._by_lovelace, key)
+
+        size = utxo.size()
+        self._remove_key(self._by_size[size], key)
+        if len(self._by_size[size]) == 0:
+            self._by_size.pop(size)
+
+        if self._by_asset is not None:
+            for token_id in utxo.get_account().get_native_tokens():
+                identifiers = self._by_asset[token_id]
+                identifiers.discard(identifier)
+                if len(identifiers) == 0:
+                    self._by_asset.pop(token_id)
+
+        return utxo
+
+    @staticmethod
+    def _remove_key(sorted_list, key):
+        i = bisect.bisect_left(sorted_list, key)
+        assert sorted_list[i] == key
+        del sorted_list[i]
+
+    def _index_assets(self, utxo):
+        identifier = utxo.get_utxo_identifier()
+        for token_id in utxo.get_account().get_native_tokens():
+            self._by_asset.setdefault(token_id, set()).add(identifier)
+
+    def without(self, identifiers):
+        '''Return new UTXOSet of the UTXOs whose identifiers are not in
+        `identifiers`, the indexes are filtered rather than rebuilt'''
+        identifiers = set(identifiers)
+        subset = UTXOSet()
+        subset._utxos = {identifier: utxo for identifier, utxo in self._utxos.items() if identifier not in identifiers}
+        subset._by_lovelace = [key for key in self._by_lovelace if key[1] not in identifiers]
+
+        for size, keys in self._by_size.items():
+            kept = [key for key in keys if key[1] not in identifiers]
+            if len(kept) > 0:
+                subset._by_size[size] = kept
+
+        if self._by_asset is not None:
+            subset._by_asset = {}
+            for token_id, asset_identifiers in self._by_asset.items():
+                kept = asset_identifiers - identifiers
+                if len(kept) > 0:
+                    subset._by_asset[token_id] = kept
+
+        return subset
+
+    def smallest_with_lovelace(self, min_lovelace):
+        '''Return the UTXO with the least lovelace that holds at least
+        `min_lovelace`, None if there is no such UTXO'''
+        i = bisect.bisect_left(self._by_lovelace, (min_lovelace,))
+        if i == len(self._by_lovelace):
+            return None
+        return self._utxos[self._by_lovelace[i][1]]
+
+    def smallest_size_with_lovelace(self, min_lovelace):
+        '''Return the UTXO with the fewest assets that holds at least
+        `min_lovelace`, ties are broken by the least lovelace. Returns None
+        if there is no such UTXO'''
+        for size in sorted(self._by_size):
+            keys = self._by_size[size]
+            i = bisect.bisect_left(keys, (min_lovelace,))
+            if i < len(keys):
+                return self._utxos[keys[i][1]]
+        return None
+
+    def with_asset(self, token_id):
+        '''Return list of UTXOs holding the given native token'''
+        if self._by_asset is None:
+            self._by_asset = {}
+            for utxo in self._utxos.values():
+                self._index_assets(utxo)
+
+        return [self._utxos[identifier] for identifier in sorted(self._by_asset.get(token_id, ()))]
+
+    def by_lovelace(self, descending=False):
+        '''Yield UTXOs sorted by lovelace amount. The set must not be
+        modified while iterating.'''
+        keys = reversed(self._by_lovelace) if descending else self._by_lovelace
+        for _, identifier in keys:
+            yield self._utxos[identifier]
+
+    def __getitem__(self, identifier):
+        return self._utxos[identifier]
+
+    def __setitem__(self, identifier, utxo):
+        assert identifier == utxo.get_utxo_identifier()
+        self.add(utxo)
+
+    def __delitem__(self, identifier):
+        self.remove(identifier)
+
+    def __iter__(self):
+        return iter(self._utxos)
+
+    def __len__(self):
+        return len(self._utxos)
@@ -1 +1,7 @@
 from .UTXO import UTXO
+from .UTXO import iter_utxo_table
+from .UTXO import parse_utxo_table
+from .UTXO import parse_utxo_json
+from .UTXO import utxos_from_transaction
+from .UTXOSet import UTXOSet
+from .SpendLedger import SpendLedger
@@ -1,18 +1,28 @@
 import os
-import subprocess
 import logging
-from automint.utxo import UTXO
-from automint.config import CARDANO_CLI, TESTNET_MAGIC_DEFAULT
+import threading
+from automint.account import Account
+from automint.selection import LargestFirst
+from automint.utxo import UTXO, UTXOSet, SpendLedger, iter_utxo_table, parse_utxo_table, parse_utxo_json, utxos_from_transaction
+from automint.config import TESTNET_MAGIC_DEFAULT
+from automint.utils import address
+from automint.utils.runner import get_runner
+from automint.utils.signing import read_signing_key
+from automint.utils.utils import submit_transaction
 
 
 logger = logging.getLogger(__name__)
 
 
 class Wallet(object):
-    def __init__(self, wallet_dir, wallet_name, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+    def __init__(self, wallet_dir, wallet_name, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT, spend_ledger=None):
         '''
         This class will represent one wallet and support querying of wallet
         details such as utxos, locating of signing and verification keys, etc
+
+        UTXOs selected with an owner are leased in `spend_ledger` until the
+        transaction is submitted. Pass a SpendLedger backed by a file to
+        share the leases with other processes.
         '''
         self.name = wallet_name
         self.use_testnet = use_testnet
@@ -26,8 +36,15 @@ class Wallet(object):
         # Generate keys as required
         self.set_up(wallet_dir)
 
-        # Keep dictionary of UTXOs
-        self.UTXOs = {}
+        # Keep indexed set of UTXOs. Its indexes are not thread safe, the
+        # lock guards every access which may modify them (such as
+        # submissions from the workers of a BatchMinter)
+        self.UTXOs = UTXOSet()
+        self._utxo_lock = threading.RLock()
+        self.spend_ledger = spend_ledger if spend_ledger is not None else SpendLedger()
+
+        # Signing key for in-process signing, read on first use
+        self._signing_key = None
 
     def set_up(self, wallet_dir):
         if not os.path.exists(wallet_dir):
@@ -37,39 +54,17 @@ class Wallet(object):
 
         if not os.path.exists(self.s_key_fp) and not os.path.exists(self.v_key_fp):
             logger.info(f'Signing and verification keys for wallet {self.name} not found, generating...')
-            proc = subprocess.run([CARDANO_CLI,
-                                   'address',
-                                   'key-gen',
-                                   '--verification-key-file',
-                                   self.v_key_fp,
-                                   '--signing-key-file',
-                                   self.s_key_fp], capture_output=True, text=True)
-            if proc.stderr != "":
-                logger.error(f'Error encountered when generating wallet keys\n{proc.stderr}')
+            # Same key files as `cardano-cli address key-gen`
+            address.generate_key_pair(self.s_key_fp, self.v_key_fp)
 
         if not os.path.exists(self.addr_fp):
             logger.info(f'Address file for wallet {self.name} not found, generating...')
 
-            cmd_builder = [CARDANO_CLI.replace(' ', '\ '),
-                           'address',
-                           'build',
-                           '--payment-verification-key-file',
-                           self.v_key_fp,
-                           '--out-file',
-                           self.addr_fp]
-
-            if self.use_testnet:
-                cmd_builder.append('--testnet-magic')
-                cmd_builder.append(str(self.testnet_magic))
-            else:
-                cmd_builder.append('--mainnet')
-
-            cmd = ' '.join(cmd_builder)
-
-            proc = subprocess.run(cmd, capture_output=True, text=True, shell=True)
-
-            if proc.stderr != '':
-                logger.info(f'Error encountered when generating wallet address\n{proc.stderr}')
+            # Enterprise address of the payment key, as `cardano-cli address build`
+            addr = address.enterprise_address(address.read_verification_key(self.v_key_fp), use_testnet=self.use_testnet)
+            with open(self.addr_fp, 'w') as addr_f:
+                addr_f.write(addr)
+                addr_f.close()
 
         assert os.path.exists(self.s_key_fp)
         assert os.path.exists(self.v_key_fp)
@@ -79,15 +74,11 @@ class Wallet(object):
             self.addr = addr_f.read().strip()
             addr_f.close()
 
-        # TODO: Check that address is bech32 valid
-        assert self.addr != ""
-
-    def query_utxo(self):
-        '''Query the blockchain for all UTXOs at the wallet address'''
-        self.UTXOs = {}
+        if not address.is_valid_address(self.addr, use_testnet=self.use_testnet):
+            raise Exception(f'Address of wallet {self.name} in {self.addr_fp} is not a valid {"testnet" if self.use_testnet else "mainnet"} address')
 
-        cmd_builder = [CARDANO_CLI,
-                       'conway',
+    def _query_utxo_cmd(self, output_json=False):
+        cmd_builder = ['conway',
                        'query',
                        'utxo',
                        '--address',
@@ -99,49 +90,181 @@ class Wallet(object):
         else:
             cmd_builder.append('--mainnet')
 
-        cmd = ' '.join(cmd_builder)
+        if output_json:
+            cmd_builder.append('--output-json')
 
-        proc = subprocess.run(cmd, capture_output=True, text=True, shell=True)
+        return cmd_builder
 
-        if proc.stderr != '':
-            logger.info(f'Error encountered when querying UTXO for wallet {self.name}\n{proc.stderr}')
+    def query_utxo(self, output_json=False):
+        '''Query the blockchain for all UTXOs at the wallet address. With
+        `output_json`, the JSON output of cardano-cli is parsed instead
+        of the text table, which is faster and also handles UTXOs with
+        inline datums'''
+        if output_json:
+            proc = get_runner().run(self._query_utxo_cmd(output_json=True))
+            utxos = UTXOSet(self._query_utxo_result(proc, output_json=True))
+        else:
+            utxos = UTXOSet(self.iter_utxos())
 
-        raw_utxo_str_list = list(filter(lambda x: x != '', proc.stdout.split('\n')[2:]))
-        for raw_utxo_str in raw_utxo_str_list:
-            utxo = UTXO(raw_utxo_str)
-            self.UTXOs.update({
-                utxo.get_utxo_identifier(): utxo
-            })
+        with self._utxo_lock:
+            self.UTXOs = utxos
 
         return self.get_utxos()
 
+    async def query_utxo_async(self, output_json=False):
+        '''Coroutine counterpart of `query_utxo()`'''
+        proc = await get_runner().run_async(self._query_utxo_cmd(output_json=output_json))
+
+        utxos = UTXOSet(self._query_utxo_result(proc, output_json=output_json))
+        with self._utxo_lock:
+            self.UTXOs = utxos
+
+        return self.get_utxos()
+
+    def _query_utxo_result(self, proc, output_json=False):
+        if proc.stderr != '':
+            logger.info(f'Error encountered when querying UTXO for wallet {self.name}\n{proc.stderr}')
+
+        if output_json:
+            return parse_utxo_json(proc.stdout) if proc.stdout.strip() != '' else []
+        return parse_utxo_table(proc.stdout)
+
+    def iter_utxos(self):
+        '''Query the blockchain for UTXOs at the wallet address and yield
+        them one at a time as the output of cardano-cli is read, without
+        holding the whole output in memory. The UTXOs are not stored in
+        the wallet, use `query_utxo()` for that.'''
+        with get_runner().popen(self._query_utxo_cmd()) as proc:
+            # stderr is drained while stdout is read, a full stderr pipe
+            # would otherwise block cardano-cli
+            stderr_chunks = []
+            reader = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+            reader.start()
+            completed = False
+            try:
+                yield from iter_utxo_table(proc.stdout)
+                completed = True
+            finally:
+                if not completed:
+                    # Stopped before the end of the output
+                    proc.kill()
+                reader.join()
+        stderr = ''.join(stderr_chunks)
+
+        if stderr != '':
+            logger.info(f'Error encountered when querying UTXO for wallet {self.name}\n{stderr}')
+
     def get_utxo(self, identifier=None):
         '''Returns UTXO specified by identifier if provided, otherwise, returns arbitrary UTXO'''
         if identifier is None:
-            if len(self.UTXOs) == 0:
-                return None
+            with self._utxo_lock:
+                if len(self.UTXOs) == 0:
+                    return None
 
-            # Automatically select UTXOs with more than 2000000 lovelace and smallest size
-            valid_utxos = list(filter(lambda u: self.UTXOs.get(u).get_account().get_lovelace() >= 2000000, self.UTXOs.keys()))
-            valid_utxos = sorted(valid_utxos, key=lambda u: self.UTXOs.get(u).size())
+                # Automatically select UTXOs with more than 2000000 lovelace and smallest size
+                utxo = self.UTXOs.smallest_size_with_lovelace(2000000)
 
-            if len(valid_utxos) == 0:
+            if utxo is None:
                 # No UTXO remaining after filtering
                 raise Exception('No UTXO could be selected automatically, please specify via identfier named argument')
 
-            return self.UTXOs.get(valid_utxos[0])
+            return utxo
 
         # Returns the UTXO given the identifier if found, None otherwise
         return self.UTXOs.get(identifier, None)
 
     def get_utxos(self):
-        '''Return all UTXOs within Wallet as a dictionary indexed by txHash'''
+        '''Return all UTXOs within Wallet as a UTXOSet (a mapping indexed by
+        `<txHash>#<index>`)'''
         return self.UTXOs
 
+    def get_utxos_with_asset(self, token_id):
+        '''Return list of UTXOs within Wallet holding the given native token'''
+        with self._utxo_lock:
+            return self.UTXOs.with_asset(token_id)
+
+    def get_available_utxos(self):
+        '''Return UTXOSet of the UTXOs within Wallet which are neither leased
+        nor spent'''
+        unavailable = self.spend_ledger.unavailable()
+        with self._utxo_lock:
+            return self.UTXOs.without(unavailable)
+
+    def select_utxos(self, target, selector=None, owner=None):
+        '''Select UTXOs within Wallet covering the target Account, returns a
+        Selection with the inputs and the change. Uses largest-first
+        selection unless another CoinSelector is given.
+
+        With `owner`, only available UTXOs are selected and they are leased
+        to the owner until `submit_transaction()` or `release_utxos()`.'''
+        if selector is None:
+            selector = LargestFirst()
+
+        if owner is None:
+            with self._utxo_lock:
+                return selector.select(self.UTXOs, target)
+
+        while True:
+            selection = selector.select(self.get_available_utxos(), target)
+            identifiers = [utxo.get_utxo_identifier() for utxo in selection.get_inputs()]
+            if self.spend_ledger.lease(identifiers, owner):
+                return selection
+            # Another builder leased one of the UTXOs in the meantime
+            logger.debug(f'UTXOs selected for {owner} were leased concurrently, selecting again')
+
+    def release_utxos(self, owner):
+        '''Release the UTXOs leased to owner, such as after a failed build'''
+        return self.spend_ledger.release(owner)
+
+    def add_transaction_outputs(self, tx_path):
+        '''Add the outputs of a submitted transaction paying to the wallet
+        address (such as its change) to the Wallet before it is confirmed,
+        so that following transactions can spend them. Returns the UTXOs
+        added.'''
+        utxos = utxos_from_transaction(tx_path, address=self.addr)
+        with self._utxo_lock:
+            for utxo in utxos:
+                self.UTXOs.add(utxo)
+        return utxos
+
+    def submit_transaction(self, signed_matx_path, owner):
+        '''Submit the transaction spending the UTXOs leased to owner. On
+        success, the UTXOs are marked spent and removed from the Wallet and
+        the outputs paying to the wallet are added to it. The UTXOs are
+        released otherwise.'''
+        if submit_transaction(signed_matx_path, use_testnet=self.use_testnet, testnet_magic=self.testnet_magic):
+            outputs = utxos_from_transaction(signed_matx_path, address=self.addr)
+            with self._utxo_lock:
+                for identifier in self.spend_ledger.mark_spent(owner):
+                    self.UTXOs.pop(identifier, None)
+                for utxo in outputs:
+                    self.UTXOs.add(utxo)
+            return True
+
+        self.spend_ledger.release(owner)
+        return False
+
+    def remove_utxo(self, identifier):
+        '''Remove consumed UTXO from the Wallet and return it'''
+        with self._utxo_lock:
+            return self.UTXOs.remove(identifier)
+
+    def get_balance(self):
+        '''Return the total contents of all UTXOs within Wallet as an Account'''
+        with self._utxo_lock:
+            return Account.sum(utxo.get_account() for utxo in self.UTXOs.values())
+
     def get_skey_path(self):
         '''Return filepath to signing key'''
         return self.s_key_fp
 
+    def get_signing_key(self):
+        '''Return the Ed25519 signing key of the wallet for in-process
+        signing, it is read from the signing key file only once'''
+        if self._signing_key is None:
+            self._signing_key = read_signing_key(self.s_key_fp)
+        return self._signing_key
+
     def get_vkey_path(self):
         '''Return filepath to verification key'''
         return self.v_key_fp
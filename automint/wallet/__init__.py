@@ -1 +1,3 @@
 from .Wallet import Wallet
+from .provisioning import provision_wallets
+from .provisioning import load_wallets
@@ -0,0 +1,101 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from automint.config import TESTNET_MAGIC_DEFAULT
+from automint.utils import cbor
+from automint.utils.address import KEY_ENVELOPES, base_address, enterprise_address, generate_key_pair, read_verification_key
+from automint.utils.envelope import write_text_envelope
+from automint.utils.signing import read_signing_key
+from automint.wallet.Wallet import Wallet
+
+logger = logging.getLogger(__name__)
+
+
+def _key_pair(skey_path, vkey_path, role, force):
+    '''Return the verification key of a key pair, generated when neither
+    key file exists (or `force`) and derived from the signing key when
+    only the verification key is missing'''
+    if force or (not os.path.exists(skey_path) and not os.path.exists(vkey_path)):
+        return generate_key_pair(skey_path, vkey_path, role=role)
+
+    if not os.path.exists(skey_path):
+        raise Exception(f'{vkey_path} exists without its signing key {skey_path}')
+
+    if not os.path.exists(vkey_path):
+        logger.info(f'Verification key {vkey_path} not found, deriving it from {skey_path}...')
+        vkey = bytes(read_signing_key(skey_path).verify_key)
+        write_text_envelope(vkey_path, *KEY_ENVELOPES[(role, False)], cbor.dumps(vkey))
+        return vkey
+
+    return read_verification_key(vkey_path)
+
+
+def _provision_wallet(args):
+    '''Write the keys and address of one wallet, existing files are kept
+    unless `force`'''
+    wallet_dir, wallet_name, use_testnet, stake, force = args
+
+    skey_path = os.path.join(wallet_dir, f'{wallet_name}.skey')
+    vkey_path = os.path.join(wallet_dir, f'{wallet_name}.vkey')
+    addr_path = os.path.join(wallet_dir, f'{wallet_name}.addr')
+
+    payment_vkey = _key_pair(skey_path, vkey_path, 'payment', force)
+
+    if stake:
+        stake_skey_path = os.path.join(wallet_dir, f'{wallet_name}.stake.skey')
+        stake_vkey_path = os.path.join(wallet_dir, f'{wallet_name}.stake.vkey')
+        stake_vkey = _key_pair(stake_skey_path, stake_vkey_path, 'stake', force)
+        address = base_address(payment_vkey, stake_vkey, use_testnet=use_testnet)
+    else:
+        address = enterprise_address(payment_vkey, use_testnet=use_testnet)
+
+    if force or not os.path.exists(addr_path):
+        # Written without a trailing newline, as by `cardano-cli address build`
+        with open(addr_path, 'w') as addr_f:
+            addr_f.write(address)
+            addr_f.close()
+
+    return wallet_name
+
+
+def provision_wallets(wallet_dir, wallet_names, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT, stake=False, force=False, max_workers=1):
+    '''Create many wallets without calling cardano-cli. Keys are generated
+    and addresses derived in-process, the `.skey`, `.vkey` and `.addr`
+    files are the same as those written by `Wallet`. Addresses are
+    enterprise addresses, or base addresses with a stake key pair
+    (`<name>.stake.skey` and `<name>.stake.vkey`) when `stake` is set.
+    Existing wallets are kept unless `force`. With `max_workers` above 1,
+    the wallets are written by a pool of processes.
+
+    Returns dictionary of wallet name to Wallet.'''
+    os.makedirs(wallet_dir, exist_ok=True)
+
+    tasks = [(wallet_dir, name, use_testnet, stake, force) for name in wallet_names]
+    if max_workers == 1:
+        for task in tasks:
+            _provision_wallet(task)
+    else:
+        max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            chunksize = max(1, len(tasks) // (4 * max_workers))
+            list(executor.map(_provision_wallet, tasks, chunksize=chunksize))
+
+    logger.info(f'Provisioned {len(tasks)} wallets in {wallet_dir}')
+
+    return {name: Wallet(wallet_dir, name, use_testnet=use_testnet, testnet_magic=testnet_magic) for name in wallet_names}
+
+
+def load_wallets(wallet_dir, use_testnet=False, testnet_magic=TESTNET_MAGIC_DEFAULT):
+    '''Return dictionary of wallet name to Wallet of every wallet in a
+    directory (with `.skey`, `.vkey` and `.addr` files), sorted by name'''
+    wallets = {}
+    for filename in sorted(os.listdir(wallet_dir)):
+        if not filename.endswith('.addr'):
+            continue
+
+        name = filename[:-len('.addr')]
+        if all(os.path.exists(os.path.join(wallet_dir, f'{name}.{ext}')) for ext in ('skey', 'vkey')):
+            wallets[name] = Wallet(wallet_dir, name, use_testnet=use_testnet, testnet_magic=testnet_magic)
+
+    return wallets
@@ -0,0 +1,58 @@
+import random
+import time
+
+from automint.account import Account
+from automint.selection import LargestFirst, RandomImprove, BranchAndBound
+from automint.utils import convert_to_hex
+from automint.utxo import UTXO, UTXOSet
+
+UTXO_COUNT = 20000
+TARGET_COUNT = 50
+POLICY_ID = 'ab' * 28
+
+
+def generate_utxos(count, seed=0):
+    rng = random.Random(seed)
+    utxos = []
+    for i in range(count):
+        lovelace = rng.choice([1, 2, 5, 10, 20, 50, 100]) * 1000000 + rng.randint(0, 999999)
+        assets = ''
+        if rng.random() < 0.1:
+            assets = f' + {rng.randint(1, 5)} {POLICY_ID}.{convert_to_hex(f"Token{rng.randint(0, 99):02}")}'
+        utxos.append(UTXO(f'{i:064x} 0 {lovelace} lovelace{assets} + TxOutDatumNone'))
+    return UTXOSet(utxos)
+
+
+def generate_targets(count, seed=1):
+    rng = random.Random(seed)
+    targets = []
+    for _ in range(count):
+        target = Account().add_lovelace(rng.randint(1, 500) * 1000000)
+        if rng.random() < 0.3:
+            target = target.add_native_token(f'{POLICY_ID}.Token{rng.randint(0, 99):02}', 1)
+        targets.append(target)
+    return targets
+
+
+if __name__ == '__main__':
+    utxos = generate_utxos(UTXO_COUNT)
+    targets = generate_targets(TARGET_COUNT)
+
+    strategies = {
+        'largest-first': LargestFirst(),
+        'random-improve': RandomImprove(seed=0),
+        'branch-and-bound': BranchAndBound(tolerance=1000000, max_tries=100000),
+    }
+
+    print(f'{TARGET_COUNT} selections over {UTXO_COUNT} UTXOs')
+    for name, selector in strategies.items():
+        inputs = 0
+        change = 0
+        start = time.perf_counter()
+        for target in targets:
+            selection = selector.select(utxos, target)
+            inputs += len(selection)
+            change += selection.get_change().get_lovelace()
+        elapsed = time.perf_counter() - start
+        print(f'{name:>16}: {elapsed / TARGET_COUNT * 1000:8.2f} ms per selection, '
+              f'{inputs / TARGET_COUNT:6.1f} inputs, {change / TARGET_COUNT / 1000000:8.2f} ADA change on average')
@@ -0,0 +1,77 @@
+import json
+import random
+import time
+
+from automint.utils import convert_to_hex
+from automint.utxo import parse_utxo_table, parse_utxo_json
+
+UTXO_COUNT = 10000
+MAX_ASSETS = 20
+POLICIES = [f'{i:056x}' for i in range(5)]
+
+
+def generate_utxos(count, seed=0):
+    '''Return list of (txHash, index, lovelace, {token_id: quantity})'''
+    rng = random.Random(seed)
+    utxos = []
+    for i in range(count):
+        assets = {}
+        for _ in range(rng.randint(0, MAX_ASSETS)):
+            policy_id = rng.choice(POLICIES)
+            assets[f'{policy_id}.Token{rng.randint(0, 9999):04}'] = rng.randint(1, 10)
+        utxos.append((f'{i:064x}', rng.randint(0, 3), rng.randint(1000000, 100000000), assets))
+    return utxos
+
+
+def to_table(utxos):
+    lines = ['                           TxHash                                 TxIx        Amount',
+             '-' * 86]
+    for tx_hash, index, lovelace, assets in utxos:
+        amount = [f'{lovelace} lovelace']
+        for token_id, qty in assets.items():
+            policy_id, name = token_id.split('.')
+            amount.append(f'{qty} {policy_id}.{convert_to_hex(name)}')
+        amount.append('TxOutDatumNone')
+        lines.append(f'{tx_hash}     {index}        {" + ".join(amount)}')
+    return '\n'.join(lines) + '\n'
+
+
+def to_json(utxos):
+    output = {}
+    for tx_hash, index, lovelace, assets in utxos:
+        value = {'lovelace': lovelace}
+        for token_id, qty in assets.items():
+            policy_id, name = token_id.split('.')
+            value.setdefault(policy_id, {})[convert_to_hex(name)] = qty
+        output[f'{tx_hash}#{index}'] = {
+            'address': 'addr1...',
+            'datum': None,
+            'datumhash': None,
+            'inlineDatum': None,
+            'referenceScript': None,
+            'value': value
+        }
+    return json.dumps(output)
+
+
+def bench(name, fn, data, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(data)
+        timings.append(time.perf_counter() - start)
+    print(f'{name:>12}: {min(timings) * 1000:8.1f} ms per {UTXO_COUNT} UTXOs (best of {repeat})')
+
+
+if __name__ == '__main__':
+    utxos = generate_utxos(UTXO_COUNT)
+    table = to_table(utxos)
+    json_str = to_json(utxos)
+
+    assert len(parse_utxo_table(table)) == len(parse_utxo_json(json_str))
+
+    # UTXOs decode their native tokens on first access to `get_account()`
+    bench('text', parse_utxo_table, table)
+    bench('json', parse_utxo_json, json_str)
+    bench('text+account', lambda data: [utxo.get_account() for utxo in parse_utxo_table(data)], table)
+    bench('json+account', lambda data: [utxo.get_account() for utxo in parse_utxo_json(data)], json_str)
@@ -4,7 +4,10 @@ from automint.receivers import MintingReceiver
 from automint.wallet import Wallet
 from automint.utxo import UTXO
 from automint.utils import get_protocol_params, get_policy_id, get_key_hash, write_policy_script, get_policy_id, build_raw_transaction, calculate_tx_fee, submit_transaction, sign_tx
-from automint.utils import query_tip
+from automint.utils import calculate_min_fee
+from automint.utils.fees import PLACEHOLDER_FEE
+from automint.utils import ProtocolParamsCache
+from automint.utils import TipProvider
 from automint.utils import convert_to_hex
 import logging
 import os
@@ -59,8 +62,11 @@ if __name__ == '__main__':
     input_utxo = payment_wallet.get_utxo('013f097180a76fcec4d8e661ec10d2a6be5c6d8b1f866af70caeaaf5d310041e#1')
     logger.info(f'UTXO to be consumed: {input_utxo}')
 
-    # Query blockchain parameters
-    protocol_param_fp = get_protocol_params(TMP_DIR, use_testnet=False)
+    # Query blockchain parameters, they are cached in TMP_DIR and only
+    # queried again in a later epoch
+    tip_provider = TipProvider()
+    protocol_params = ProtocolParamsCache(TMP_DIR, tip_provider=tip_provider.get_tip)
+    protocol_param_fp = protocol_params.get_path(use_testnet=False)
     logger.info(f'Protocol parameters written to {protocol_param_fp}')
 
     # Acquire policy script and ID
@@ -94,27 +100,33 @@ if __name__ == '__main__':
 
     receivers = [tx_receiver]
 
-    # Draft transaction with 0 fees. `receiver.get_blank_receiver()`
-    # simply returns a clone of the same receiver but with 0 lovelace
-    # balance.
+    # Draft transaction used to size the fee. It is built with a
+    # placeholder fee, encoded on as many bytes as any real fee, and with
+    # the receiver still holding all the lovelace of the input, so the
+    # draft is never smaller than the final transaction. (A draft with 0
+    # fees would replace the outputs with blank 0 lovelace receivers and
+    # underestimate the fee.)
 
     # Note: Specifing the metadata parameter attaches the metadata at
     # the specified location to the transcation. If no metadata is to
     # be added, simply omit the argument.
 
-    invalid_after_slot = query_tip(use_testnet=False)['slot'] + 3600
+    # The slot is extrapolated from the last tip query, no cardano-cli
+    # call is needed per transaction
+    invalid_after_slot = tip_provider.current_slot(use_testnet=False) + 3600
 
     raw_matx_path = build_raw_transaction(TMP_DIR,
                                           input_utxo,
                                           receivers,
                                           minting_receiver,
+                                          fee=PLACEHOLDER_FEE,
                                           invalid_after=invalid_after_slot,
                                           minting_script=policy_script_fp)
     logger.info(f'Draft transaction written to {raw_matx_path}...')
 
-    # Caculate fees
-    fee = calculate_tx_fee(raw_matx_path, protocol_param_fp, input_utxo, receivers, use_testnet=True)
-    fee = int(fee * 2)
+    # Caculate fees from the protocol parameters, the transaction is
+    # signed by both the payment and the policy wallets
+    fee = calculate_min_fee(raw_matx_path, protocol_param_fp, witness_count=2)
     logger.info(f'Calculated transaction fee: {fee} lovelace')
 
     # Adjust fees in lovelace in receiver
@@ -0,0 +1,47 @@
+import os
+import shutil
+import tempfile
+
+import automint.utils as utils
+from automint.receivers import MintingReceiver
+from automint.utxo import UTXO
+
+# Regenerates the golden transactions of test/test_Transaction.py with
+# `cardano-cli conway transaction build-raw`, which needs no node. The
+# unit tests then check that the in-process builder is byte identical.
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GOLDEN_DIR = os.path.join(ROOT_DIR, 'test', 'golden')
+ADDRESS = 'addr1v909djup82fnvqzf5k0twztapyyq07laatzng95meqd2xpca3e3c0'
+POLICY_ID = '1406fbb1af2a3f005518e921c016f585a4039b976f7959bfa6ec2486'
+TX_HASH = 'ca324bb0a46a9b96bc5c7b0feaf23159aafd5fe6d39a691412d5171013d67b1c'
+
+
+def write_golden(raw_matx_path, golden_name):
+    shutil.copy(raw_matx_path, os.path.join(GOLDEN_DIR, golden_name))
+    print(f'Wrote {golden_name}')
+
+
+if __name__ == '__main__':
+    tmp_dir = tempfile.mkdtemp()
+
+    utxo = UTXO(f'{TX_HASH} 0 3000000 lovelace + TxOutDatumNone')
+    receiver = utxo.convert_to_receiver(ADDRESS)
+    receiver.remove_lovelace(170000)
+    write_golden(utils.build_raw_transaction(tmp_dir, utxo, receiver, fee=170000), 'simple_tx.raw')
+
+    utxo = UTXO(f'{TX_HASH} 1 5000000 lovelace + TxOutDatumNone')
+    tx_receiver = utxo.convert_to_receiver(ADDRESS)
+    minting_receiver = MintingReceiver()
+    for token in ['TestToken01', 'TestToken00']:
+        tx_receiver.add_native_token(f'{POLICY_ID}.{token}', 1)
+        minting_receiver.add_native_token(f'{POLICY_ID}.{token}', 1)
+    tx_receiver.remove_lovelace(200000)
+    write_golden(utils.build_raw_transaction(tmp_dir, utxo, [tx_receiver], minting_receiver,
+                                             fee=200000,
+                                             metadata=os.path.join(ROOT_DIR, 'test', 'metadata_test_1.json'),
+                                             invalid_after=89000000,
+                                             minting_script=os.path.join(GOLDEN_DIR, 'policy.script')),
+                 'minting_tx.raw')
+
+    shutil.rmtree(tmp_dir)
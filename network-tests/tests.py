@@ -1,7 +1,8 @@
 import json
 
 import automint.utils as utils
-import automint.wallet.Wallet as Wallet
+from automint.receivers import MintingReceiver
+from automint.wallet import Wallet
 
 
 if __name__ == '__main__':
@@ -26,3 +27,92 @@ if __name__ == '__main__':
         print(f'txHash: {utxo}')
         print(f'Lovelace: {utxo.get_account().get_lovelace()}')
         print(json.dumps(utxo.get_account().get_native_tokens()))
+
+    # Compare in-process fee calculation with cardano-cli
+    if len(wallet.get_utxos()) > 0:
+        utxo = wallet.get_utxo(list(wallet.get_utxos())[0])
+        receiver = utxo.convert_to_receiver(wallet.get_address())
+        raw_matx_path = utils.build_raw_transaction('.', utxo, receiver)
+        cli_fee = utils.calculate_tx_fee(raw_matx_path, protocol_param_fp, utxo, receiver,
+                                         witness_count=1, use_testnet=USE_TESTNET)
+        fee = utils.calculate_min_fee(raw_matx_path, protocol_param_fp, witness_count=1)
+        print(f'Fee (cardano-cli): {cli_fee}')
+        print(f'Fee (automint): {fee}')
+        assert fee == cli_fee
+
+        # Compare in-process transaction building with cardano-cli
+        with open(utils.build_raw_transaction('.', utxo, receiver, fee=fee), 'r') as f:
+            cli_tx = f.read()
+        with open(utils.build_raw_transaction_native('.', utxo, receiver, fee=fee), 'r') as f:
+            native_tx = f.read()
+        print(f'Transaction (cardano-cli): {cli_tx}')
+        print(f'Transaction (automint): {native_tx}')
+        assert native_tx == cli_tx
+
+        # Compare locally computed transaction id with cardano-cli
+        raw_matx_path = utils.build_raw_transaction('.', utxo, receiver, fee=fee)
+        proc = utils.runner.get_runner().run(['conway', 'transaction', 'txid', '--tx-body-file', raw_matx_path])
+        cli_tx_id = proc.stdout.strip()
+        if cli_tx_id.startswith('{'):
+            cli_tx_id = json.loads(cli_tx_id)['txhash']
+        tx_id = utils.get_tx_id_from_file(raw_matx_path)
+        print(f'Transaction id (cardano-cli): {cli_tx_id}')
+        print(f'Transaction id (automint): {tx_id}')
+        assert tx_id == cli_tx_id
+
+        # Compare in-process signing with cardano-cli
+        cli_signed = utils.sign_tx('.', wallet, raw_matx_path, use_testnet=USE_TESTNET, tx_name='cli')
+        native_signed = utils.sign_tx_native('.', wallet, raw_matx_path, tx_name='native')
+        with open(cli_signed, 'r') as f_cli, open(native_signed, 'r') as f_native:
+            cli_signed_tx = json.load(f_cli)
+            native_signed_tx = json.load(f_native)
+        print(f'Signed transaction (cardano-cli): {cli_signed_tx}')
+        print(f'Signed transaction (automint): {native_signed_tx}')
+        assert native_signed_tx['cborHex'] == cli_signed_tx['cborHex']
+        assert native_signed_tx['type'] == cli_signed_tx['type']
+
+        # Compare in-process witnesses and assembly with cardano-cli
+        cli_witness = utils.witness_tx('.', wallet, raw_matx_path, use_testnet=USE_TESTNET, tx_name='cli')
+        native_witness = utils.witness_tx_native('.', wallet, raw_matx_path, tx_name='native')
+        with open(cli_witness, 'r') as f_cli, open(native_witness, 'r') as f_native:
+            assert json.load(f_cli)['cborHex'] == json.load(f_native)['cborHex']
+        cli_assembled = utils.assemble_tx('.', raw_matx_path, [cli_witness], tx_name='cli-assembled')
+        with open(cli_assembled, 'r') as f:
+            assert json.load(f)['cborHex'] == native_signed_tx['cborHex']
+
+        # Compare in-process address derivation with cardano-cli
+        proc = utils.runner.get_runner().run(['address', 'build', '--payment-verification-key-file', wallet.get_vkey_path()] +
+                                             (['--testnet-magic', str(wallet.testnet_magic)] if USE_TESTNET else ['--mainnet']))
+        native_addr = utils.enterprise_address(utils.read_verification_key(wallet.get_vkey_path()), use_testnet=USE_TESTNET)
+        print(f'Address (cardano-cli): {proc.stdout.strip()}')
+        print(f'Address (automint): {native_addr}')
+        assert native_addr == proc.stdout.strip()
+
+        # Compare in-process policy id with cardano-cli
+        registry = utils.PolicyRegistry('policies')
+        policy_id = registry.register(utils.time_locked_script(utils.get_key_hash(wallet.get_vkey_path()), 90000000))
+        proc = utils.runner.get_runner().run(['conway', 'transaction', 'policyid', '--script-file', registry.get_script_path(policy_id)])
+        print(f'Policy id (cardano-cli): {proc.stdout.strip()}')
+        print(f'Policy id (automint): {policy_id}')
+        assert policy_id == proc.stdout.strip()
+
+        # Compare a minting transaction with metadata built in-process with
+        # cardano-cli, the metadata keys exercise the no schema mapping
+        metadata_fp = 'metadata.json'
+        with open(metadata_fp, 'w') as f:
+            json.dump({'721': {policy_id: {'Token': {'name': 'Token', 'image': 'ipfs://...', '10': '0xcafe', '2': 1}},
+                               'version': '1.0'}}, f)
+        tx_receiver = utxo.convert_to_receiver(wallet.get_address())
+        minting_receiver = MintingReceiver()
+        tx_receiver.add_native_token(f'{policy_id}.Token', 1)
+        minting_receiver.add_native_token(f'{policy_id}.Token', 1)
+        tx_receiver.remove_lovelace(fee)
+        minting_args = dict(fee=fee, metadata=metadata_fp, invalid_after=89000000,
+                            minting_script=registry.get_script_path(policy_id))
+        with open(utils.build_raw_transaction('.', utxo, [tx_receiver], minting_receiver, tx_name='cli-mint', **minting_args), 'r') as f:
+            cli_tx = json.load(f)
+        with open(utils.build_raw_transaction_native('.', utxo, [tx_receiver], minting_receiver, tx_name='native-mint', **minting_args), 'r') as f:
+            native_tx = json.load(f)
+        print(f'Minting transaction (cardano-cli): {cli_tx}')
+        print(f'Minting transaction (automint): {native_tx}')
+        assert native_tx['cborHex'] == cli_tx['cborHex']
@@ -12,7 +12,8 @@ setuptools.setup(
     ],
     python_requires=">=3.7",
     install_requires = [
-        'requests'
+        'requests',
+        'pynacl'
     ],
     license_files=('LICENSE',),
 )
@@ -1,6 +1,7 @@
+import time
 import unittest
 
-from automint.account import Account
+from automint.account import Account, AccountBuilder
 
 
 class AccountTests(unittest.TestCase):
@@ -45,3 +46,120 @@ class AccountTests(unittest.TestCase):
         account = account.add_native_token('12345.tokenA', 2)
         account = account.remove_native_token('56789.tokenA', 2)
         self.assertEqual(str(account), '1500000+"2 12345.tokenA + -2 56789.tokenA"')
+
+    def test_account_immutable(self):
+        '''Operations on an Account must not modify the original Account'''
+        account_a = Account().add_lovelace(1000).add_native_token('12345.tokenA', 2)
+        account_b = account_a.add_native_token('12345.tokenA', 3).remove_lovelace(500)
+
+        self.assertEqual(account_a.get_lovelace(), 1000)
+        self.assertEqual(account_a.get_native_token('12345.tokenA')['quantity'], 2)
+        self.assertEqual(account_b.get_lovelace(), 500)
+        self.assertEqual(account_b.get_native_token('12345.tokenA')['quantity'], 5)
+
+        account_c = account_b.remove_native_token('12345.tokenA', 5)
+        self.assertEqual(account_c.get_native_token('12345.tokenA'), 0)
+        self.assertEqual(account_b.get_native_token('12345.tokenA')['quantity'], 5)
+
+    def test_account_builder(self):
+        '''AccountBuilder modifies in place without affecting built Accounts'''
+        builder = Account().add_native_token('12345.tokenA', 1).to_builder()
+        account_a = builder.build()
+
+        builder.add_lovelace(2000).add_native_token('12345.tokenA', 1).add_native_token('12345.tokenB', 1)
+        account_b = builder.build()
+
+        self.assertEqual(account_a.get_lovelace(), 0)
+        self.assertEqual(account_a.size(), 2)
+        self.assertEqual(account_b.get_lovelace(), 2000)
+        self.assertEqual(account_b.get_native_token('12345.tokenA')['quantity'], 2)
+        self.assertIs(builder.build(), account_b)
+
+        builder.remove_native_token('12345.tokenB', 1)
+        self.assertEqual(account_b.size(), 3)
+        self.assertEqual(builder.build().size(), 2)
+
+    def test_account_equality(self):
+        account_a = Account().add_lovelace(1000).add_native_token('12345.tokenA', 2)
+        account_b = Account().add_native_token('12345.tokenA', 1).add_native_token('12345.tokenA', 1).add_lovelace(1000)
+        self.assertEqual(account_a, account_b)
+        self.assertNotEqual(account_a, account_b.add_native_token('12345.tokenB', 1))
+        self.assertNotEqual(account_a, account_b.add_native_token('12345.tokenA', 1))
+
+    def test_account_sum(self):
+        '''Account.sum should match folding the accounts pairwise'''
+        accounts = [Account().add_lovelace(1000 * i).add_native_token(f'12345.token{i % 3}', i)
+                    for i in range(1, 10)]
+
+        expected = Account()
+        for account in accounts:
+            expected = expected + account
+
+        self.assertEqual(Account.sum(accounts), expected)
+        self.assertEqual(sum(accounts), expected)
+        self.assertEqual(Account.sum([]), Account())
+
+    def test_builder_iadd(self):
+        builder = Account().add_lovelace(1000).to_builder()
+        builder += Account().add_lovelace(500).add_native_token('12345.tokenA', 1)
+        builder += Account().add_native_token('12345.tokenA', 2)
+        self.assertEqual(builder.build(), Account().add_lovelace(1500).add_native_token('12345.tokenA', 3))
+
+    def test_format_native_tokens(self):
+        account = Account().add_native_token('12345.tokenB', 1).add_native_token('12345.tokenA', 2)
+        self.assertEqual(account.format_native_tokens(), '2 12345.746f6b656e41 + 1 12345.746f6b656e42')
+        self.assertIs(account.format_native_tokens(), account.format_native_tokens())
+        self.assertEqual(account.add_lovelace(1).format_native_tokens(), account.format_native_tokens())
+        self.assertEqual(account.remove_native_token('12345.tokenB', 1).format_native_tokens(), '2 12345.746f6b656e41')
+
+    def test_token_log_branches(self):
+        '''Accounts derived from the same Account see only their own
+        changes'''
+        base = Account()
+        for i in range(100):
+            base = base.add_native_token(f'12345.token{i:03}', 1)
+        branch_a = base.add_native_token('12345.token000', 1).remove_native_token('12345.token001', 1)
+        branch_b = base.add_native_token('12345.token000', 5)
+
+        self.assertEqual(base.get_native_token('12345.token000')['quantity'], 1)
+        self.assertEqual(base.get_native_token('12345.token001')['quantity'], 1)
+        self.assertEqual(branch_a.get_native_token('12345.token000')['quantity'], 2)
+        self.assertEqual(branch_a.get_native_token('12345.token001'), 0)
+        self.assertEqual(branch_b.get_native_token('12345.token000')['quantity'], 6)
+        self.assertEqual(len(base.get_native_tokens()), 100)
+        self.assertEqual(len(branch_a.get_native_tokens()), 99)
+        self.assertEqual(len(branch_b.get_native_tokens()), 100)
+        self.assertEqual(branch_b.remove_native_token('12345.token000', 5), base)
+
+    def test_token_updates_do_not_copy(self):
+        '''Per-token operations on an Account with many tokens take constant
+        time, the token dictionary is not copied each time'''
+        account = AccountBuilder()
+        for i in range(20000):
+            account.add_native_token(f'12345.token{i:05}', 1)
+        account = account.build()
+
+        start = time.perf_counter()
+        for i in range(2000):
+            account = account.add_native_token(f'12345.token{i:05}', 1)
+            self.assertEqual(account.get_native_token(f'12345.token{i:05}')['quantity'], 2)
+        elapsed = time.perf_counter() - start
+
+        # Copying 20000 entries 2000 times takes well over a second
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(sum(token['quantity'] for token in account.get_native_tokens().values()), 22000)
+
+    def test_returned_entries_are_copies(self):
+        account = Account().add_native_token('12345.token', 3)
+        derived = account.add_lovelace(5)
+        builder = derived.to_builder()
+
+        derived.get_native_token('12345.token')['quantity'] = 99
+        derived.get_native_tokens()['12345.token']['quantity'] = 99
+        derived.get_native_tokens().pop('12345.token')
+        builder.get_native_token('12345.token')['quantity'] = 99
+
+        for snapshot in [account, derived, builder.build()]:
+            self.assertEqual(snapshot.get_native_token('12345.token')['quantity'], 3)
+            self.assertEqual(snapshot.get_native_tokens()['12345.token']['quantity'], 3)
+
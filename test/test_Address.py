@@ -0,0 +1,233 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import nacl.signing
+
+from automint.utils import bech32
+from automint.utils import get_key_hash, get_stake_key
+from automint.utils.address import (base_address, decode_address, enterprise_address, is_valid_address, key_hash,
+                                    payment_credential, read_verification_key, stake_address, stake_credential,
+                                    verification_key_hash, write_key_pair)
+from automint.utils.envelope import read_text_envelope
+from automint.utils.runner import CLIRunner, get_runner, set_runner
+from automint.wallet import Wallet, load_wallets, provision_wallets
+
+# CIP-19 test vectors
+PAYMENT_VKEY = bech32.decode('addr_vk1w0l2sr2zgfm26ztc6nl9xy8ghsk5sh6ldwemlpmp9xylzy4dtf7st80zhd')[1]
+STAKE_VKEY = bech32.decode('stake_vk1px4j0r2fk7ux5p23shz8f3y5y2qam7s954rgf3lg5merqcj6aetsft99wu')[1]
+ENTERPRISE_MAINNET = 'addr1vx2fxv2umyhttkxyxp8x0dlpdt3k6cwng5pxj3jhsydzers66hrl8'
+ENTERPRISE_TESTNET = 'addr_test1vz2fxv2umyhttkxyxp8x0dlpdt3k6cwng5pxj3jhsydzerspjrlsz'
+BASE_MAINNET = 'addr1qx2fxv2umyhttkxyxp8x0dlpdt3k6cwng5pxj3jhsydzer3n0d3vllmyqwsx5wktcd8cc3sq835lu7drv2xwl2wywfgse35a3x'
+BASE_TESTNET = 'addr_test1qz2fxv2umyhttkxyxp8x0dlpdt3k6cwng5pxj3jhsydzer3n0d3vllmyqwsx5wktcd8cc3sq835lu7drv2xwl2wywfgs68faae'
+POINTER_MAINNET = 'addr1gx2fxv2umyhttkxyxp8x0dlpdt3k6cwng5pxj3jhsydzer5pnz75xxcrzqf96k'
+SCRIPT_ENTERPRISE_MAINNET = 'addr1w8phkx6acpnf78fuvxn0mkew3l0fd058hzquvz7w36x4gtcyjy7wx'
+SCRIPT_HASH = 'c37b1b5dc0669f1d3c61a6fddb2e8fde96be87b881c60bce8e8d542f'
+REWARD_MAINNET = 'stake1uyehkck0lajq8gr28t9uxnuvgcqrc6070x3k9r8048z8y5gh6ffgw'
+
+FAILING_CLI = '''#!/usr/bin/env python3
+import sys
+sys.stderr.write('cardano-cli should not be called')
+sys.exit(1)
+'''
+
+
+class AddressTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_enterprise_address(self):
+        self.assertEqual(enterprise_address(PAYMENT_VKEY), ENTERPRISE_MAINNET)
+        self.assertEqual(enterprise_address(PAYMENT_VKEY, use_testnet=True), ENTERPRISE_TESTNET)
+
+    def test_base_address(self):
+        self.assertEqual(base_address(PAYMENT_VKEY, STAKE_VKEY), BASE_MAINNET)
+        self.assertEqual(base_address(PAYMENT_VKEY, STAKE_VKEY, use_testnet=True), BASE_TESTNET)
+
+    def test_key_pair_envelopes(self):
+        skey_path = os.path.join(self.tmp_dir, 'stake.skey')
+        vkey_path = os.path.join(self.tmp_dir, 'stake.vkey')
+        write_key_pair(skey_path, vkey_path, bytes(32), STAKE_VKEY, role='stake')
+
+        envelope_type, description, key_cbor = read_text_envelope(skey_path)
+        self.assertEqual(envelope_type, 'StakeSigningKeyShelley_ed25519')
+        self.assertEqual(key_cbor, bytes.fromhex('5820') + bytes(32))
+
+        envelope_type, description, _ = read_text_envelope(vkey_path)
+        self.assertEqual(envelope_type, 'StakeVerificationKeyShelley_ed25519')
+        self.assertEqual(description, 'Stake Verification Key')
+        self.assertEqual(read_verification_key(vkey_path), STAKE_VKEY)
+
+    def test_read_verification_key_rejects_signing_key(self):
+        skey_path = os.path.join(self.tmp_dir, 'payment.skey')
+        write_key_pair(skey_path, os.path.join(self.tmp_dir, 'payment.vkey'), bytes(32), PAYMENT_VKEY)
+
+        with self.assertRaises(Exception):
+            read_verification_key(skey_path)
+
+    def test_decode_address(self):
+        network_id, address_type, payment, stake = decode_address(BASE_TESTNET)
+        self.assertEqual((network_id, address_type), (0, 0))
+        self.assertEqual(payment, ('key', key_hash(PAYMENT_VKEY)))
+        self.assertEqual(stake, ('key', key_hash(STAKE_VKEY)))
+
+        self.assertEqual(decode_address(ENTERPRISE_MAINNET), (1, 6, ('key', key_hash(PAYMENT_VKEY)), None))
+        self.assertEqual(payment_credential(SCRIPT_ENTERPRISE_MAINNET), ('script', bytes.fromhex(SCRIPT_HASH)))
+        self.assertEqual(stake_credential(POINTER_MAINNET)[0], 'pointer')
+        self.assertEqual(decode_address(REWARD_MAINNET), (1, 14, None, ('key', key_hash(STAKE_VKEY))))
+
+    def test_is_valid_address(self):
+        for address in [BASE_MAINNET, ENTERPRISE_MAINNET, POINTER_MAINNET, SCRIPT_ENTERPRISE_MAINNET, REWARD_MAINNET]:
+            self.assertTrue(is_valid_address(address))
+            self.assertTrue(is_valid_address(address, use_testnet=False))
+            self.assertFalse(is_valid_address(address, use_testnet=True))
+        self.assertTrue(is_valid_address(ENTERPRISE_TESTNET, use_testnet=True))
+
+        invalid = [
+            '',
+            'addr',
+            ENTERPRISE_MAINNET[:-1] + 'q',                                      # Checksum
+            ENTERPRISE_MAINNET.upper()[:10] + ENTERPRISE_MAINNET[10:],          # Mixed case
+            bech32.encode('addr_test', bech32.decode(ENTERPRISE_MAINNET)[1]),   # Prefix of other network
+            bech32.encode('addr', bech32.decode(BASE_MAINNET)[1][:40]),         # Truncated
+            bech32.encode('addr', bytes([0x81]) + bytes(28))                    # Byron address type
+        ]
+        for address in invalid:
+            self.assertFalse(is_valid_address(address), address)
+
+    def test_stake_address(self):
+        self.assertEqual(stake_address(BASE_MAINNET), REWARD_MAINNET)
+        self.assertEqual(get_stake_key(BASE_MAINNET), REWARD_MAINNET)
+        self.assertIsNone(stake_address(ENTERPRISE_MAINNET))
+        self.assertEqual(get_stake_key(ENTERPRISE_MAINNET), '')
+
+    def test_verification_key_hash(self):
+        vkey_path = os.path.join(self.tmp_dir, 'payment.vkey')
+        write_key_pair(os.path.join(self.tmp_dir, 'payment.skey'), vkey_path, bytes(32), PAYMENT_VKEY)
+
+        self.assertEqual(verification_key_hash(vkey_path), key_hash(PAYMENT_VKEY).hex())
+        self.assertEqual(get_key_hash(vkey_path), key_hash(PAYMENT_VKEY).hex())
+
+        # Rewritten key files are hashed again
+        stat = os.stat(vkey_path)
+        write_key_pair(os.path.join(self.tmp_dir, 'payment.skey'), vkey_path, bytes(32), STAKE_VKEY)
+        os.utime(vkey_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertEqual(verification_key_hash(vkey_path), key_hash(STAKE_VKEY).hex())
+
+
+class ProvisioningTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.wallet_dir = os.path.join(self.tmp_dir, 'wallets')
+
+        # Any call to cardano-cli fails the test
+        cli_path = os.path.join(self.tmp_dir, 'cardano-cli')
+        with open(cli_path, 'w') as f:
+            f.write(FAILING_CLI)
+            f.close()
+        os.chmod(cli_path, 0o755)
+
+        self.runner = get_runner()
+        set_runner(CLIRunner(cli_path))
+
+    def tearDown(self):
+        set_runner(self.runner)
+        shutil.rmtree(self.tmp_dir)
+
+    def assertWalletAddress(self, wallet, use_testnet=False):
+        vkey = read_verification_key(wallet.get_vkey_path())
+        self.assertEqual(wallet.get_address(), enterprise_address(vkey, use_testnet=use_testnet))
+
+    def test_provision_wallets(self):
+        names = [f'deposit{i}' for i in range(5)]
+        wallets = provision_wallets(self.wallet_dir, names, use_testnet=True)
+
+        self.assertEqual(list(wallets), names)
+        self.assertEqual(len({wallet.get_address() for wallet in wallets.values()}), len(names))
+        for wallet in wallets.values():
+            self.assertTrue(wallet.get_address().startswith('addr_test1v'))
+            self.assertWalletAddress(wallet, use_testnet=True)
+
+            envelope_type, _, key_cbor = read_text_envelope(wallet.get_skey_path())
+            self.assertEqual(envelope_type, 'PaymentSigningKeyShelley_ed25519')
+            self.assertEqual(bytes(nacl.signing.SigningKey(key_cbor[2:]).verify_key),
+                             read_verification_key(wallet.get_vkey_path()))
+
+    def test_provision_wallets_parallel(self):
+        names = [f'deposit{i}' for i in range(8)]
+        wallets = provision_wallets(self.wallet_dir, names, max_workers=2)
+
+        for wallet in wallets.values():
+            self.assertWalletAddress(wallet)
+
+    def test_provision_wallets_stake(self):
+        wallets = provision_wallets(self.wallet_dir, ['deposit'], stake=True)
+
+        stake_vkey = read_verification_key(os.path.join(self.wallet_dir, 'deposit.stake.vkey'))
+        payment_vkey = read_verification_key(wallets['deposit'].get_vkey_path())
+        self.assertEqual(wallets['deposit'].get_address(), base_address(payment_vkey, stake_vkey))
+
+    def test_provision_keeps_existing(self):
+        address = provision_wallets(self.wallet_dir, ['deposit'])['deposit'].get_address()
+
+        self.assertEqual(provision_wallets(self.wallet_dir, ['deposit'])['deposit'].get_address(), address)
+        self.assertNotEqual(provision_wallets(self.wallet_dir, ['deposit'], force=True)['deposit'].get_address(), address)
+
+    def test_provision_missing_vkey(self):
+        wallet = provision_wallets(self.wallet_dir, ['deposit'])['deposit']
+        with open(wallet.get_skey_path(), 'r') as f:
+            skey = f.read()
+            f.close()
+        with open(wallet.get_vkey_path(), 'r') as f:
+            vkey = f.read()
+            f.close()
+
+        # The verification key is derived again from the kept signing key
+        os.remove(wallet.get_vkey_path())
+        self.assertEqual(provision_wallets(self.wallet_dir, ['deposit'])['deposit'].get_address(), wallet.get_address())
+        with open(wallet.get_skey_path(), 'r') as f:
+            self.assertEqual(f.read(), skey)
+            f.close()
+        with open(wallet.get_vkey_path(), 'r') as f:
+            self.assertEqual(f.read(), vkey)
+            f.close()
+
+        # A verification key without its signing key is not replaced
+        os.remove(wallet.get_skey_path())
+        with self.assertRaises(Exception):
+            provision_wallets(self.wallet_dir, ['deposit'])
+        self.assertFalse(os.path.exists(wallet.get_skey_path()))
+
+    def test_load_wallets(self):
+        provision_wallets(self.wallet_dir, ['b', 'a'])
+        with open(os.path.join(self.wallet_dir, 'orphan.addr'), 'w') as f:
+            f.write(ENTERPRISE_MAINNET)
+            f.close()
+
+        wallets = load_wallets(self.wallet_dir)
+
+        self.assertEqual(list(wallets), ['a', 'b'])
+        for wallet in wallets.values():
+            self.assertWalletAddress(wallet)
+
+    def test_wallet_invalid_address(self):
+        provision_wallets(self.wallet_dir, ['deposit'])
+
+        with self.assertRaises(Exception):
+            Wallet(self.wallet_dir, 'deposit', use_testnet=True)
+
+    def test_wallet_set_up(self):
+        wallet = Wallet(self.wallet_dir, 'payment')
+
+        self.assertWalletAddress(wallet)
+        with open(wallet.addr_fp) as f:
+            self.assertEqual(f.read(), wallet.get_address())
+            f.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
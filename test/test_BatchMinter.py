@@ -0,0 +1,238 @@
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from automint.minting import BatchMinter, BatchTransaction
+from automint.utils import build_raw_transaction_native, cbor, get_tx_id_from_file
+from automint.utils.envelope import read_text_envelope
+from automint.utils.fees import estimate_tx_size
+from automint.utils.runner import CLIRunner, set_runner
+from automint.utxo import UTXO
+from automint.wallet import Wallet
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), 'golden')
+ADDRESS = 'addr1v909djup82fnvqzf5k0twztapyyq07laatzng95meqd2xpca3e3c0'
+POLICY_ID = '1406fbb1af2a3f005518e921c016f585a4039b976f7959bfa6ec2486'
+TX_HASH = 'ca324bb0a46a9b96bc5c7b0feaf23159aafd5fe6d39a691412d5171013d67b1c'
+PROTOCOL_PARAMS = {'txFeeFixed': 155381, 'txFeePerByte': 44, 'maxTxSize': 4096, 'coinsPerUTxOByte': 4310}
+
+# Signing copies the transaction body, submissions are recorded. Signing
+# fails when a file named `fail-sign` exists next to the executable.
+FAKE_CLI = f'''#!{sys.executable}
+import os
+import shutil
+import sys
+
+args = sys.argv[1:]
+cli_dir = os.path.dirname(sys.argv[0])
+if args[1:3] == ['transaction', 'sign']:
+    if os.path.exists(os.path.join(cli_dir, 'fail-sign')):
+        sys.stderr.write('signing failed')
+        sys.exit(1)
+    shutil.copy(args[args.index('--tx-body-file') + 1], args[args.index('--out-file') + 1])
+elif args[1:3] == ['transaction', 'submit']:
+    with open(os.path.join(cli_dir, 'submitted'), 'a') as f:
+        f.write(args[args.index('--tx-file') + 1] + '\\n')
+    print('Transaction successfully submitted.')
+'''
+
+
+class BatchMinterTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.fake_cli = os.path.join(self.tmp_dir, 'cardano-cli')
+        with open(self.fake_cli, 'w') as f:
+            f.write(FAKE_CLI)
+        os.chmod(self.fake_cli, os.stat(self.fake_cli).st_mode | stat.S_IEXEC)
+        self.previous_runner = set_runner(CLIRunner(self.fake_cli))
+
+        keys_dir = os.path.join(self.tmp_dir, 'keys')
+        os.makedirs(keys_dir)
+        for name in ['payment', 'policy']:
+            for ext, content in [('skey', '{}'), ('vkey', '{}'), ('addr', ADDRESS)]:
+                with open(os.path.join(keys_dir, f'{name}.{ext}'), 'w') as f:
+                    f.write(content)
+
+        self.payment_wallet = Wallet(keys_dir, 'payment')
+        self.policy_wallet = Wallet(keys_dir, 'policy')
+        for i in range(10):
+            self.payment_wallet.UTXOs.add(UTXO(f'{TX_HASH} {i} {10000000 + i} lovelace + TxOutDatumNone'))
+
+        self.work_dir = os.path.join(self.tmp_dir, 'work')
+        os.makedirs(self.work_dir)
+
+        self.tokens = [f'TestToken{i:03}' for i in range(60)]
+        self.metadata = {token: {'name': f'Test Token {token[-3:]}', 'image': 'ipfs://' + 'Qm' * 22} for token in self.tokens}
+
+    def tearDown(self):
+        set_runner(self.previous_runner)
+        shutil.rmtree(self.tmp_dir)
+
+    def minter(self, **kwargs):
+        return BatchMinter(self.work_dir, self.payment_wallet, self.policy_wallet, POLICY_ID,
+                           os.path.join(GOLDEN_DIR, 'policy.script'), PROTOCOL_PARAMS, **kwargs)
+
+    def submitted(self):
+        with open(os.path.join(self.tmp_dir, 'submitted'), 'r') as f:
+            return f.read().splitlines()
+
+    def minted_tokens(self, signed_matx_path):
+        _, _, tx_cbor = read_text_envelope(signed_matx_path)
+        body = cbor.loads(tx_cbor)[0]
+        return [name.decode() for name in body[9][bytes.fromhex(POLICY_ID)]]
+
+    def test_mint(self):
+        progress = []
+        transactions = self.minter(progress=lambda tx, completed, total: progress.append((completed, total))).mint(self.tokens, self.metadata)
+
+        self.assertGreater(len(transactions), 1)
+        self.assertEqual(progress[-1], (len(transactions), len(transactions)))
+        self.assertEqual(len(self.submitted()), len(transactions))
+
+        minted = []
+        inputs = set()
+        for transaction in transactions:
+            self.assertEqual(transaction.status, BatchTransaction.SUBMITTED)
+            _, _, tx_cbor = read_text_envelope(transaction.signed_matx_path)
+            self.assertLessEqual(estimate_tx_size(tx_cbor, witness_count=2), PROTOCOL_PARAMS['maxTxSize'])
+
+            tokens = self.minted_tokens(transaction.signed_matx_path)
+            self.assertEqual(sorted(tokens), sorted(transaction.tokens))
+            minted += tokens
+
+            tx_inputs = [utxo.get_utxo_identifier() for utxo in transaction.inputs]
+            self.assertTrue(inputs.isdisjoint(tx_inputs))
+            inputs.update(tx_inputs)
+
+        self.assertEqual(sorted(minted), self.tokens)
+        # The inputs are spent and each transaction's output is available
+        # to following transactions right away
+        self.assertEqual(len(self.payment_wallet.get_utxos()), 10 - len(inputs) + len(transactions))
+        for transaction in transactions:
+            tx_id = get_tx_id_from_file(transaction.signed_matx_path)
+            self.assertIn(f'{tx_id}#0', self.payment_wallet.get_utxos())
+
+    def test_max_tokens_per_tx(self):
+        transactions = self.minter(max_tokens_per_tx=7).plan(self.tokens[:20])
+        self.assertEqual([len(tx.tokens) for tx in transactions], [7, 7, 6])
+
+    def test_min_utxo(self):
+        # Short metadata in large transactions, the output's minimum
+        # lovelace is reached before the maximum size
+        tokens = [f'T{i:03}' for i in range(300)]
+        metadata = {token: {'name': token} for token in tokens}
+        params = dict(PROTOCOL_PARAMS, maxTxSize=16384)
+        for key in list(self.payment_wallet.get_utxos()):
+            self.payment_wallet.UTXOs.remove(key)
+        for i in range(10):
+            self.payment_wallet.UTXOs.add(UTXO(f'{TX_HASH} {i} 5000000 lovelace + TxOutDatumNone'))
+        minter = BatchMinter(self.work_dir, self.payment_wallet, self.policy_wallet, POLICY_ID,
+                             os.path.join(GOLDEN_DIR, 'policy.script'), params)
+
+        transactions = minter.mint(tokens, metadata)
+        self.assertTrue(all(tx.status == BatchTransaction.SUBMITTED for tx in transactions))
+        self.assertEqual(sorted(sum((tx.tokens for tx in transactions), [])), tokens)
+        for transaction in transactions:
+            _, _, tx_cbor = read_text_envelope(transaction.signed_matx_path)
+            self.assertLess(estimate_tx_size(tx_cbor, witness_count=2), params['maxTxSize'] // 2)
+            output = cbor.loads(tx_cbor)[0][1][0]
+            self.assertGreaterEqual(output[1][0], (160 + len(cbor.dumps(output))) * params['coinsPerUTxOByte'])
+
+        # Not enough lovelace for the output of a single token
+        for key in list(self.payment_wallet.get_utxos()):
+            self.payment_wallet.UTXOs.remove(key)
+        self.payment_wallet.UTXOs.add(UTXO(f'{TX_HASH} 99 1000000 lovelace + TxOutDatumNone'))
+        minter = BatchMinter(self.work_dir, self.payment_wallet, self.policy_wallet, POLICY_ID,
+                             os.path.join(GOLDEN_DIR, 'policy.script'), params, lovelace_per_tx=1000000)
+        unavailable = self.payment_wallet.spend_ledger.unavailable()
+        with self.assertRaises(Exception):
+            minter.plan(['T999'])
+        self.assertEqual(self.payment_wallet.spend_ledger.unavailable(), unavailable)
+
+    def test_plan_measures_few_transactions(self):
+        tokens = [f'T{i:04}' for i in range(2000)]
+        params = dict(PROTOCOL_PARAMS, maxTxSize=16384, coinsPerUTxOByte=0)
+        minter = BatchMinter(self.work_dir, self.payment_wallet, self.policy_wallet, POLICY_ID,
+                             os.path.join(GOLDEN_DIR, 'policy.script'), params)
+
+        measured = []
+        measure = minter._measure
+        minter._measure = lambda inputs, batch, metadata: measured.append(len(batch)) or measure(inputs, batch, metadata)
+        transactions = minter.plan(tokens)
+
+        self.assertEqual(sum(len(tx.tokens) for tx in transactions), len(tokens))
+        self.assertGreater(len(transactions[0].tokens), 100)
+        # Bisecting the batch size, not one encoding per token
+        self.assertLess(len(measured), 25 * len(transactions))
+        for transaction in transactions[:-1]:
+            self.assertLessEqual(transaction.tx_size, params['maxTxSize'])
+            self.assertGreater(minter._measure(transaction.inputs, transaction.tokens + ['Extra'], {})[0], params['maxTxSize'])
+
+    def test_resume(self):
+        open(os.path.join(self.tmp_dir, 'fail-sign'), 'w').close()
+        transactions = self.minter().mint(self.tokens, self.metadata)
+        self.assertTrue(all(tx.status == BatchTransaction.FAILED for tx in transactions))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, 'submitted')))
+
+        # Failed transactions spent nothing, their inputs were released
+        self.assertEqual(len(self.payment_wallet.get_available_utxos()), 10)
+        os.remove(os.path.join(self.tmp_dir, 'fail-sign'))
+
+        transactions = self.minter().mint(self.tokens, self.metadata)
+        self.assertTrue(all(tx.status == BatchTransaction.SUBMITTED for tx in transactions))
+        self.assertEqual(sorted(sum((tx.tokens for tx in transactions), [])), self.tokens)
+
+        # Everything was minted, nothing left to do
+        self.assertEqual(self.minter().mint(self.tokens, self.metadata), [])
+
+    def test_resubmit_signed(self):
+        minter = self.minter()
+        transaction = minter.plan(self.tokens[:5])[0]
+        transaction.status = BatchTransaction.SIGNED
+        transaction.signed_matx_path = os.path.join(self.work_dir, 'signed')
+        shutil.copy(os.path.join(GOLDEN_DIR, 'simple_tx.raw'), transaction.signed_matx_path)
+        minter._record(transaction)
+
+        transactions = self.minter().mint(self.tokens[:5])
+        self.assertEqual([tx.tx_name for tx in transactions], [transaction.tx_name])
+        self.assertEqual(transactions[0].status, BatchTransaction.SUBMITTED)
+        self.assertEqual(self.submitted(), [transaction.signed_matx_path])
+
+    def test_journal(self):
+        minter = self.minter()
+        transactions = minter.mint(self.tokens[:3], self.metadata)
+        records = minter.read_journal()
+
+        self.assertEqual(records[transactions[0].tx_name]['status'], BatchTransaction.SUBMITTED)
+        with open(minter.journal_path, 'a') as f:
+            f.write('{"tx_name": "trunc')
+        self.assertEqual(minter.read_journal(), records)
+
+    def test_concurrent_submit(self):
+        signed_paths = []
+        for i, utxo in enumerate(list(self.payment_wallet.get_utxos().values())):
+            receiver = utxo.convert_to_receiver(ADDRESS)
+            receiver.remove_lovelace(200000)
+            signed_paths.append(build_raw_transaction_native(self.work_dir, utxo, receiver, fee=200000, tx_name=f'tx{i}'))
+            self.assertTrue(self.payment_wallet.spend_ledger.lease([utxo.get_utxo_identifier()], f'tx{i}'))
+
+        with ThreadPoolExecutor(max_workers=len(signed_paths)) as executor:
+            results = list(executor.map(self.payment_wallet.submit_transaction, signed_paths,
+                                        [f'tx{i}' for i in range(len(signed_paths))]))
+
+        self.assertTrue(all(results))
+        utxos = self.payment_wallet.get_utxos()
+        expected = {f'{get_tx_id_from_file(path)}#0' for path in signed_paths}
+        self.assertEqual(set(utxos), expected)
+        # The indexes hold exactly the UTXOs of the set, in order
+        self.assertEqual(utxos._by_lovelace, sorted((utxo.get_lovelace(), key) for key, utxo in utxos.items()))
+        self.assertEqual(sum(len(keys) for keys in utxos._by_size.values()), len(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from automint.account import Account
+from automint.selection import CoinSelector, LargestFirst, RandomImprove, BranchAndBound
+from automint.utxo import UTXO, UTXOSet
+
+
+def make_utxo(tx_hash, lovelace, assets=()):
+    assets_str = ''.join(f' + {qty} 12345.{asset}' for asset, qty in assets)
+    return UTXO(f'{tx_hash} 0 {lovelace} lovelace{assets_str} + TxOutDatumNone')
+
+
+class CoinSelectorTests(unittest.TestCase):
+    def setUp(self):
+        self.utxos = UTXOSet([
+            make_utxo('aa', 1000000),
+            make_utxo('bb', 2000000, [('41', 3)]),
+            make_utxo('cc', 3000000),
+            make_utxo('dd', 4000000, [('41', 1), ('42', 5)]),
+            make_utxo('ee', 7000000),
+        ])
+
+    def assertCovers(self, selection, target):
+        '''Check that the inputs pay for the target and the change'''
+        self.assertEqual(selection.total, target + selection.get_change())
+        self.assertGreaterEqual(selection.get_change().get_lovelace(), 0)
+        for token in selection.get_change().get_native_tokens().values():
+            self.assertGreater(token['quantity'], 0)
+
+    def test_largest_first(self):
+        target = Account().add_lovelace(8000000)
+        selection = LargestFirst().select(self.utxos, target)
+        self.assertEqual([str(utxo) for utxo in selection.get_inputs()], ['ee#0', 'dd#0'])
+        self.assertCovers(selection, target)
+
+        target = Account().add_lovelace(1000000).add_native_token('12345.A', 4)
+        selection = LargestFirst().select(self.utxos, target)
+        self.assertEqual(sorted(str(utxo) for utxo in selection.get_inputs()), ['bb#0', 'dd#0'])
+        self.assertCovers(selection, target)
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            CoinSelector()
+
+    def test_insufficient(self):
+        for selector in [LargestFirst(), RandomImprove(seed=0), BranchAndBound()]:
+            with self.assertRaises(Exception):
+                selector.select(self.utxos, Account().add_lovelace(100000000))
+            with self.assertRaises(Exception):
+                selector.select(self.utxos, Account().add_native_token('12345.A', 5))
+
+    def test_max_inputs(self):
+        with self.assertRaises(Exception):
+            LargestFirst(max_inputs=1).select(self.utxos, Account().add_lovelace(8000000))
+
+    def test_random_improve(self):
+        target = Account().add_lovelace(3000000).add_native_token('12345.B', 2)
+        for seed in range(20):
+            selection = RandomImprove(seed=seed).select(self.utxos, target)
+            self.assertCovers(selection, target)
+            self.assertLessEqual(selection.total.get_lovelace(), 3 * 3000000 + 4000000)
+
+    def test_branch_and_bound(self):
+        # 1 + 3 ADA is the only exact match of 4 ADA without native tokens
+        target = Account().add_lovelace(4000000)
+        selection = BranchAndBound().select(self.utxos, target)
+        self.assertEqual(sorted(str(utxo) for utxo in selection.get_inputs()), ['aa#0', 'cc#0'])
+        self.assertEqual(selection.get_change(), Account())
+
+        # No exact match, falls back to largest first
+        target = Account().add_lovelace(2500000)
+        selection = BranchAndBound().select(self.utxos, target)
+        self.assertEqual([str(utxo) for utxo in selection.get_inputs()], ['ee#0'])
+
+        # Tolerance allows a small change
+        selection = BranchAndBound(tolerance=500000).select(self.utxos, target)
+        self.assertEqual([str(utxo) for utxo in selection.get_inputs()], ['cc#0'])
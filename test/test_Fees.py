@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from automint.utils import calculate_min_fee
+from automint.utils import cbor
+from automint.utils.envelope import write_text_envelope
+from automint.utils import build_raw_transaction_native
+from automint.utils.fees import PLACEHOLDER_FEE, estimate_tx_size, min_fee, reference_script_fee
+from automint.utxo import UTXO
+
+ADDRESS = 'addr1v909djup82fnvqzf5k0twztapyyq07laatzng95meqd2xpca3e3c0'
+
+PROTOCOL_PARAMS = {
+    'txFeeFixed': 155381,
+    'txFeePerByte': 44,
+    'minFeeRefScriptCostPerByte': 15
+}
+
+TX_BODY = {
+    0: cbor.Tag(258, [[bytes(range(32)), 0]]),
+    1: [[bytes(29), 1500000], [bytes(29), [2000000, {bytes(28): {b'tokenA': 1}}]]],
+    2: 0,
+    3: 123456789,
+    9: {bytes(28): {b'tokenA': 1}}
+}
+
+WITNESS_SET = {1: cbor.Tag(258, [[0, bytes(28)]])}
+
+
+class FeesTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.tx_cbor = cbor.dumps([TX_BODY, WITNESS_SET, True, None])
+        self.raw_matx_path = write_text_envelope(os.path.join(self.tmp_dir, 'matx.raw'),
+                                                 'Unwitnessed Tx ConwayEra', 'Ledger Cddl Format', self.tx_cbor)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_estimate_tx_size(self):
+        # Same transaction signed by two (distinct) keys
+        witnesses = [[bytes([1] * 32), bytes(64)], [bytes([2] * 32), bytes(64)]]
+        signed = cbor.dumps([TX_BODY, {1: WITNESS_SET[1], 0: cbor.Tag(258, witnesses)}, True, None])
+
+        self.assertEqual(estimate_tx_size(self.tx_cbor, witness_count=2), len(signed))
+        self.assertEqual(estimate_tx_size(self.tx_cbor, witness_count=0), len(self.tx_cbor))
+
+        # Bare transaction body
+        body_cbor = cbor.dumps(TX_BODY)
+        self.assertEqual(estimate_tx_size(body_cbor, witness_count=2),
+                         len(cbor.dumps([TX_BODY, {0: cbor.Tag(258, witnesses)}, True, None])))
+
+    def test_min_fee(self):
+        self.assertEqual(min_fee(PROTOCOL_PARAMS, 300), 155381 + 44 * 300)
+
+        # Reference scripts are priced in tiers of 25600 bytes, 20% more per tier
+        self.assertEqual(reference_script_fee(PROTOCOL_PARAMS, 25600), 25600 * 15)
+        self.assertEqual(reference_script_fee(PROTOCOL_PARAMS, 25700), 25600 * 15 + 100 * 18)
+
+    def test_calculate_min_fee(self):
+        size = estimate_tx_size(self.tx_cbor, witness_count=2)
+        self.assertEqual(calculate_min_fee(self.raw_matx_path, PROTOCOL_PARAMS), 155381 + 44 * size)
+
+    def test_placeholder_draft_covers_final_size(self):
+        '''A draft with the placeholder fee and the unreduced output is never
+        smaller than the final transaction, so its fee is always enough'''
+        utxo = UTXO(f'{"ab" * 32} 0 1000000 lovelace + TxOutDatumNone')
+        receiver = utxo.convert_to_receiver(ADDRESS)
+
+        draft_path = build_raw_transaction_native(self.tmp_dir, utxo, receiver, fee=PLACEHOLDER_FEE, tx_name='draft')
+        fee = calculate_min_fee(draft_path, PROTOCOL_PARAMS, witness_count=2)
+
+        receiver.remove_lovelace(fee)
+        final_path = build_raw_transaction_native(self.tmp_dir, utxo, receiver, fee=fee, tx_name='final')
+        self.assertLessEqual(calculate_min_fee(final_path, PROTOCOL_PARAMS, witness_count=2), fee)
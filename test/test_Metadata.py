@@ -1,6 +1,10 @@
+import json
+import os
+import shutil
+import tempfile
 import unittest
 
-from automint.utils import validate_metadata
+from automint.utils import validate_metadata, validate_metadata_stream, validate_metadata_files
 
 
 class MetadataTests(unittest.TestCase):
@@ -26,3 +30,114 @@ class MetadataTests(unittest.TestCase):
         # Duplicate top level keys (besides 721)
         with self.assertRaises(Exception):
             validate_metadata('test/metadata_test_3.json', ['tokenA', 'tokenB'], '123')
+
+
+class StreamingMetadataTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, content):
+        metadata_fp = os.path.join(self.tmp_dir, 'metadata.json')
+        with open(metadata_fp, 'w') as f:
+            f.write(content if isinstance(content, str) else json.dumps(content, indent=4))
+        return metadata_fp
+
+    def test_validate_metadata_streaming(self):
+        self.assertTrue(validate_metadata('test/metadata_test_1.json', ['tokenA', 'tokenB'], '123', streaming=True))
+
+        for args in [('test/metadata_test_1.json', ['tokenA', 'tokenC'], '123'),
+                     ('test/metadata_test_1.json', ['tokenA', 'tokenB'], '12345'),
+                     ('test/metadata_test_2.json', ['tokenA', 'tokenB'], '12345'),
+                     ('test/metadata_test_3.json', ['tokenA', 'tokenB'], '123')]:
+            with self.assertRaises(Exception):
+                validate_metadata(*args, streaming=True)
+
+    def test_all_errors_reported(self):
+        metadata_fp = self.write({'721': {'123': {
+            'tokenA': {'name': 'Token A', 'image': 'ipfs://' + 'a' * 64},
+            'tokenB': {'name': 'Token B'},
+            'tokenX': {'name': 'Token X', 'image': ['ipfs://', 'x']},
+            'tokenC': {'name': 'Token C', 'image': 'ipfs://c', 'files': [{'src': 'ipfs://c'}]}
+        }}})
+
+        errors = validate_metadata_stream(metadata_fp, ['tokenA', 'tokenB', 'tokenC', 'tokenD'], '123')
+        self.assertEqual(errors, [
+            '721.123.tokenA.image: string longer than 64 bytes, split it into an array of strings',
+            '721.123.tokenB: "image" attribute not found',
+            '721.123.tokenX: unexpected token',
+            '721.123.tokenC.files[0]: "mediaType" attribute not found',
+            '1 tokens not found in metadata: tokenD'
+        ])
+
+    def test_duplicate_tokens(self):
+        metadata_fp = self.write('{"721": {"123": {"tokenA": {"name": "A", "image": "a"}, '
+                                 '"tokenA": {"name": "A", "image": "a"}}}}')
+        self.assertEqual(validate_metadata_stream(metadata_fp, ['tokenA'], '123'), ['721.123.tokenA: duplicate token'])
+
+    def test_version(self):
+        metadata_fp = self.write({'721': {'123': {'tokenA': {'name': 'A', 'image': 'a'}}, 'version': '1.0'}})
+        self.assertEqual(validate_metadata_stream(metadata_fp, ['tokenA'], '123'), [])
+
+    def test_invalid_json(self):
+        metadata_fp = self.write('{"721": {"123": {"tokenA": {"name": "A", "image": "a"}, "tokenB": {"na')
+        errors = validate_metadata_stream(metadata_fp, ['tokenA', 'tokenB'], '123', chunk_size=8)
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].startswith('Invalid JSON'))
+
+    def test_large_file_small_chunks(self):
+        tokens = [f'Token{i:05}' for i in range(5000)]
+        metadata = {'721': {'123': {token: {'name': token, 'image': f'ipfs://{token}', 'id': i}
+                                    for i, token in enumerate(tokens)}}}
+        metadata_fp = self.write(metadata)
+
+        self.assertEqual(validate_metadata_stream(metadata_fp, tokens, '123', chunk_size=100), [])
+        self.assertTrue(validate_metadata(metadata_fp, tokens, '123'))
+
+
+class MetadataFilesTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.tokens = [f'Token{i:03}' for i in range(200)]
+        for token in self.tokens:
+            self.write(f'{token}.json', {'721': {'123': {token: {'name': token, 'image': f'ipfs://{token}'}}}})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, name, metadata):
+        with open(os.path.join(self.tmp_dir, name), 'w') as f:
+            json.dump(metadata, f)
+
+    def test_valid(self):
+        for max_workers in [1, 4]:
+            report = validate_metadata_files(self.tmp_dir, self.tokens, '123', max_workers=max_workers)
+            self.assertTrue(report.valid, str(report))
+            self.assertEqual(len(report.files), 200)
+            self.assertTrue(all(result.seconds >= 0 for result in report.files))
+            self.assertEqual(report.files[0].tokens, ['Token000'])
+
+    def test_glob(self):
+        report = validate_metadata_files(os.path.join(self.tmp_dir, 'Token00*.json'), self.tokens[:10], '123')
+        self.assertTrue(report.valid)
+        self.assertEqual(len(report.files), 10)
+
+    def test_consolidated_errors(self):
+        self.write('Token001.json', {'721': {'123': {'Token001': {'name': 'Token001'}}}})
+        self.write('Token002.json', {'721': {'123': {'Token003': {'name': 'Token003', 'image': 'ipfs://'}}}})
+        self.write('Token004.json', {'721': {'456': {'Token004': {'name': 'Token004', 'image': 'ipfs://'}}}})
+
+        report = validate_metadata_files(self.tmp_dir, self.tokens, '123', max_workers=2)
+        self.assertFalse(report.valid)
+        self.assertEqual([os.path.basename(result.path) for result in report.invalid_files()],
+                         ['Token001.json', 'Token004.json'])
+        self.assertEqual(report.errors[0], f'Token Token003 found in {os.path.join(self.tmp_dir, "Token002.json")} '
+                                           f'and {os.path.join(self.tmp_dir, "Token003.json")}')
+        self.assertEqual(report.errors[1], '2 tokens not found in metadata: Token002, Token004')
+        self.assertIn('"image" attribute not found', str(report))
+
+    def test_no_files(self):
+        report = validate_metadata_files(os.path.join(self.tmp_dir, '*.txt'), [], '123')
+        self.assertFalse(report.valid)
@@ -0,0 +1,89 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from automint.utils import get_policy_id, write_policy_script, write_policy_script_with_time_lock
+from automint.utils.policy import PolicyRegistry, multisig_script, script_hash, sig_script, time_locked_script
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), 'golden')
+KEY_HASH = '5e96a1a2e1f9e3f1c8d0a4b3a2f1e0d9c8b7a6f5e4d3c2b1a0f9e8d7'
+OTHER_KEY_HASH = '00' * 28
+
+
+def _hash(script_cbor_hex):
+    return hashlib.blake2b(bytes.fromhex('00' + script_cbor_hex), digest_size=28).hexdigest()
+
+
+class PolicyTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_script_hash(self):
+        # [0, keyHash] and [1, [[0, keyHash], [5, 90000000]]]
+        self.assertEqual(script_hash(sig_script(KEY_HASH)), _hash(f'8200581c{KEY_HASH}'))
+        self.assertEqual(script_hash(time_locked_script(KEY_HASH, 90000000)),
+                         _hash(f'820182' f'8200581c{KEY_HASH}' '82051a055d4a80'))
+
+    def test_multisig_script(self):
+        self.assertEqual(multisig_script([KEY_HASH, OTHER_KEY_HASH])['type'], 'all')
+
+        script = multisig_script([KEY_HASH, OTHER_KEY_HASH], required=1, before=100)
+        self.assertEqual(script['scripts'][0], {'type': 'atLeast', 'required': 1,
+                                                'scripts': [sig_script(KEY_HASH), sig_script(OTHER_KEY_HASH)]})
+        self.assertEqual(script['scripts'][1], {'slot': 100, 'type': 'before'})
+        self.assertEqual(script_hash(script),
+                         _hash('8201828303018282' f'00581c{KEY_HASH}' f'8200581c{OTHER_KEY_HASH}' '82051864'))
+
+        with self.assertRaises(Exception):
+            multisig_script([KEY_HASH], required=2)
+
+    def test_get_policy_id(self):
+        script_path = write_policy_script_with_time_lock(self.tmp_dir, KEY_HASH, 90000000)
+
+        with open(script_path) as f, open(os.path.join(GOLDEN_DIR, 'policy.script')) as f_golden:
+            self.assertEqual(f.read().strip(), f_golden.read().strip())
+        self.assertEqual(get_policy_id(script_path), script_hash(time_locked_script(KEY_HASH, 90000000)))
+        self.assertEqual(get_policy_id(write_policy_script(self.tmp_dir, KEY_HASH, script_name='sig')),
+                         script_hash(sig_script(KEY_HASH)))
+
+    def test_registry(self):
+        registry = PolicyRegistry(self.tmp_dir)
+        scripts = [time_locked_script(KEY_HASH, slot) for slot in range(100, 110)]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            policy_ids = list(executor.map(registry.register, scripts * 2))
+
+        self.assertEqual(policy_ids[:10], policy_ids[10:])
+        self.assertEqual(len(registry), 10)
+        for script, policy_id in zip(scripts, policy_ids):
+            self.assertEqual(policy_id, script_hash(script))
+            self.assertEqual(registry.get_script(policy_id), script)
+            self.assertEqual(registry.get_script_path(policy_id), os.path.join(self.tmp_dir, f'{policy_id}.script'))
+            self.assertEqual(get_policy_id(registry.get_script_path(policy_id)), policy_id)
+
+    def test_registry_named(self):
+        registry = PolicyRegistry(self.tmp_dir)
+        policy_id = registry.register(sig_script(KEY_HASH), name='collection')
+
+        self.assertEqual(registry.get_script_path(policy_id), os.path.join(self.tmp_dir, 'collection.script'))
+        self.assertEqual(registry.register(sig_script(KEY_HASH), name='other'), policy_id)
+        with self.assertRaises(Exception):
+            registry.register(sig_script(OTHER_KEY_HASH), name='collection')
+
+    def test_registry_loads_existing(self):
+        policy_id = PolicyRegistry(self.tmp_dir).register(sig_script(KEY_HASH), name='collection')
+
+        registry = PolicyRegistry(self.tmp_dir)
+        self.assertIn(policy_id, registry)
+        self.assertEqual(registry.get_policy_ids(), [policy_id])
+        self.assertEqual(registry.get_script_path(policy_id), os.path.join(self.tmp_dir, 'collection.script'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import json
+import os
+import stat
+import sys
+import tempfile
+import time
+import unittest
+
+from automint.utils import ProtocolParamsCache
+from automint.utils.runner import CLIRunner, set_runner
+
+# Writes protocol parameters to the --out-file and counts the queries
+FAKE_CLI = f'''#!{sys.executable}
+import json
+import os
+import sys
+
+args = sys.argv[1:]
+out_file = args[args.index('--out-file') + 1]
+with open(out_file, 'w') as f:
+    json.dump({{'txFeePerByte': 44, 'txFeeFixed': 155381}}, f)
+with open(os.path.join(os.path.dirname(sys.argv[0]), 'queries'), 'a') as f:
+    f.write(' '.join(args) + '\\n')
+'''
+
+
+class ProtocolParamsCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        fake_cli = os.path.join(self.tmp_dir.name, 'cardano-cli')
+        with open(fake_cli, 'w') as f:
+            f.write(FAKE_CLI)
+        os.chmod(fake_cli, os.stat(fake_cli).st_mode | stat.S_IEXEC)
+        self.previous_runner = set_runner(CLIRunner(fake_cli))
+
+        self.cache_dir = os.path.join(self.tmp_dir.name, 'cache')
+        self.tip = {'epoch': 100, 'slotsToEpochEnd': 1000}
+        self.tip_queries = 0
+
+    def tearDown(self):
+        set_runner(self.previous_runner)
+        self.tmp_dir.cleanup()
+
+    def tip_provider(self, use_testnet=False, testnet_magic=None):
+        self.tip_queries += 1
+        return dict(self.tip)
+
+    def queries(self):
+        queries_path = os.path.join(self.tmp_dir.name, 'queries')
+        if not os.path.exists(queries_path):
+            return []
+        with open(queries_path, 'r') as f:
+            return f.read().splitlines()
+
+    def test_cached_in_memory(self):
+        cache = ProtocolParamsCache(self.cache_dir, tip_provider=self.tip_provider)
+        for _ in range(10):
+            self.assertEqual(cache.get()['txFeePerByte'], 44)
+
+        path = cache.get_path()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(len(self.queries()), 1)
+        self.assertEqual(self.tip_queries, 1)
+
+    def test_keyed_by_network(self):
+        cache = ProtocolParamsCache(self.cache_dir, tip_provider=self.tip_provider)
+        cache.get()
+        cache.get(use_testnet=True, testnet_magic=1)
+        cache.get(use_testnet=True, testnet_magic=2)
+        cache.get(use_testnet=True, testnet_magic=1)
+
+        queries = self.queries()
+        self.assertEqual(len(queries), 3)
+        self.assertTrue(queries[0].endswith('--mainnet'))
+        self.assertTrue(queries[1].endswith('--testnet-magic 1'))
+        self.assertNotEqual(cache.get_path(), cache.get_path(use_testnet=True, testnet_magic=1))
+
+    def test_cached_on_disk(self):
+        ProtocolParamsCache(self.cache_dir, tip_provider=self.tip_provider).get()
+        params = ProtocolParamsCache(self.cache_dir, tip_provider=self.tip_provider).get()
+
+        self.assertEqual(params['txFeeFixed'], 155381)
+        self.assertEqual(len(self.queries()), 1)
+
+    def test_epoch_change(self):
+        cache = ProtocolParamsCache(self.cache_dir, tip_provider=self.tip_provider)
+        self.tip['slotsToEpochEnd'] = 0
+        cache.get()
+
+        # Estimated end of epoch reached but still in the same epoch
+        cache.get()
+        self.assertEqual(len(self.queries()), 1)
+        self.assertEqual(self.tip_queries, 2)
+
+        self.tip['epoch'] = 101
+        cache.get()
+        self.assertEqual(len(self.queries()), 2)
+
+    def test_ttl(self):
+        cache = ProtocolParamsCache(self.cache_dir, ttl=0.1, tip_provider=self.tip_provider)
+        cache.get()
+        cache.get()
+        time.sleep(0.15)
+        cache.get()
+
+        self.assertEqual(len(self.queries()), 2)
+
+    def test_invalidate(self):
+        cache = ProtocolParamsCache(self.cache_dir, tip_provider=self.tip_provider)
+        cache.get()
+        cache.invalidate()
+        ProtocolParamsCache(self.cache_dir, tip_provider=self.tip_provider).get()
+        self.assertEqual(len(self.queries()), 2)
+
+        # Picks up the parameters written by the other cache
+        cache.get()
+        self.assertEqual(len(self.queries()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import os
+import stat
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from automint.utils import query_tip, query_tip_async
+from automint.utils.runner import CLIRunner, get_runner, set_runner
+from automint.wallet import Wallet
+
+FAKE_CLI = f'''#!{sys.executable}
+import json
+import os
+import sys
+import time
+
+if sys.argv[1:4] == ['latest', 'query', 'tip']:
+    time.sleep(0.2)
+    print(json.dumps({{'slot': 1234, 'args': sys.argv[1:]}}))
+elif sys.argv[2:4] == ['query', 'utxo']:
+    # More stderr than a pipe buffer holds, written before stdout
+    sys.stderr.write('warning ' * 100000)
+    sys.stderr.flush()
+    print('TxHash TxIx Amount')
+    print('-' * 20)
+    for i in range(3):
+        print(f'abcdef0{{i}} {{i}} 1000000 lovelace + TxOutDatumNone')
+elif sys.argv[1] == 'sleep':
+    time.sleep(float(sys.argv[2]))
+elif sys.argv[1] == 'pid-sleep':
+    with open(sys.argv[3], 'w') as f:
+        f.write(str(os.getpid()))
+    time.sleep(float(sys.argv[2]))
+else:
+    print(json.dumps(sys.argv[1:]))
+'''
+
+
+class RunnerTests(unittest.TestCase):
+    def setUp(self):
+        # Space in the path checks that no shell escaping is needed
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix='automint runner ')
+        self.fake_cli = os.path.join(self.tmp_dir.name, 'fake cardano-cli')
+        with open(self.fake_cli, 'w') as f:
+            f.write(FAKE_CLI)
+        os.chmod(self.fake_cli, os.stat(self.fake_cli).st_mode | stat.S_IEXEC)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_arguments_passed_verbatim(self):
+        args = ['transaction', '--tx-out', 'addr+1000+1 12345.746f6b656e41 + 2 12345.746f6b656e42', '$(echo x)', 'a b']
+        proc = CLIRunner(self.fake_cli).run(args)
+        self.assertEqual(proc.stderr, '')
+        self.assertEqual(json.loads(proc.stdout), args)
+
+    def test_popen(self):
+        with CLIRunner(self.fake_cli).popen(['a', 'b']) as proc:
+            self.assertEqual(json.loads(proc.stdout.read()), ['a', 'b'])
+
+    def test_max_processes(self):
+        runner = CLIRunner(self.fake_cli, max_processes=2)
+        threads = [threading.Thread(target=runner.run, args=(['sleep', '0.3'],)) for _ in range(4)]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Four processes, two at a time
+        self.assertGreaterEqual(time.perf_counter() - start, 0.6)
+
+    def test_set_runner(self):
+        previous = set_runner(CLIRunner(self.fake_cli))
+        try:
+            tip = query_tip(use_testnet=True, testnet_magic=2)
+            self.assertEqual(tip['slot'], 1234)
+            self.assertEqual(tip['args'], ['latest', 'query', 'tip', '--testnet-magic', '2'])
+        finally:
+            set_runner(previous)
+
+        self.assertIsNot(get_runner().executable, self.fake_cli)
+
+    def test_run_async(self):
+        async def run_all():
+            runner = CLIRunner(self.fake_cli, max_processes=2)
+            return await asyncio.gather(*[runner.run_async(['sleep', '0.3']) for _ in range(4)],
+                                        runner.run_async(['a', 'b c']))
+
+        start = time.perf_counter()
+        results = asyncio.run(run_all())
+        self.assertGreaterEqual(time.perf_counter() - start, 0.6)
+        self.assertEqual(json.loads(results[-1].stdout), ['a', 'b c'])
+
+    def test_max_processes_sync_and_async(self):
+        runner = CLIRunner(self.fake_cli, max_processes=1)
+
+        async def run_async():
+            await asyncio.sleep(0.05)
+            return await runner.run_async(['sleep', '0.3'])
+
+        start = time.perf_counter()
+        thread = threading.Thread(target=runner.run, args=(['sleep', '0.3'],))
+        thread.start()
+        asyncio.run(run_async())
+        thread.join()
+        # One process at a time across threads and coroutines
+        self.assertGreaterEqual(time.perf_counter() - start, 0.6)
+
+    def test_run_async_cancelled(self):
+        runner = CLIRunner(self.fake_cli, max_processes=1)
+        pid_path = os.path.join(self.tmp_dir.name, 'pid')
+
+        async def cancel():
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(runner.run_async(['pid-sleep', '10', pid_path]), 0.5)
+            # The process slot was released
+            return await asyncio.wait_for(runner.run_async(['a']), 2)
+
+        self.assertEqual(json.loads(asyncio.run(cancel()).stdout), ['a'])
+        with open(pid_path) as f:
+            pid = int(f.read())
+        with self.assertRaises(ProcessLookupError):
+            os.kill(pid, 0)
+
+    def test_run_async_waiters_hold_no_thread(self):
+        runner = CLIRunner(self.fake_cli, max_processes=1)
+
+        async def run_all():
+            tasks = [asyncio.ensure_future(runner.run_async(['sleep', '0.1'])) for _ in range(20)]
+            await asyncio.sleep(0.05)
+
+            # The executor is not taken by coroutines waiting for a slot
+            start = time.perf_counter()
+            await asyncio.to_thread(lambda: None)
+            elapsed = time.perf_counter() - start
+
+            await asyncio.gather(*tasks)
+            return elapsed
+
+        self.assertLess(asyncio.run(run_all()), 0.5)
+
+    def test_run_async_cancel_waiting(self):
+        runner = CLIRunner(self.fake_cli, max_processes=1)
+
+        async def cancel_waiting():
+            running = asyncio.ensure_future(runner.run_async(['sleep', '0.3']))
+            await asyncio.sleep(0.05)
+            waiting = [asyncio.ensure_future(runner.run_async(['a'])) for _ in range(5)]
+            await asyncio.sleep(0.05)
+            for task in waiting:
+                task.cancel()
+            await running
+
+            # The cancelled waiters did not take or leak the slot
+            thread = threading.Thread(target=runner.run, args=(['sleep', '0.1'],))
+            thread.start()
+            result = await asyncio.wait_for(runner.run_async(['b']), 2)
+            thread.join()
+            return [task.cancelled() for task in waiting], result
+
+        cancelled, result = asyncio.run(cancel_waiting())
+        self.assertEqual(cancelled, [True] * 5)
+        self.assertEqual(json.loads(result.stdout), ['b'])
+
+    def test_iter_utxos_large_stderr(self):
+        previous = set_runner(CLIRunner(self.fake_cli))
+        try:
+            wallet = Wallet(os.path.join(self.tmp_dir.name, 'keys'), 'payment')
+            utxos = []
+            thread = threading.Thread(target=lambda: utxos.extend(wallet.iter_utxos()), daemon=True)
+            thread.start()
+            thread.join(timeout=10)
+            self.assertFalse(thread.is_alive(), 'iter_utxos deadlocked')
+            self.assertEqual([utxo.get_utxo_identifier() for utxo in utxos], [f'abcdef0{i}#{i}' for i in range(3)])
+
+            # Stopping early kills cardano-cli
+            self.assertEqual(next(wallet.iter_utxos()).get_utxo_identifier(), 'abcdef00#0')
+        finally:
+            set_runner(previous)
+
+    def test_query_tip_async(self):
+        previous = set_runner(CLIRunner(self.fake_cli))
+        try:
+            async def query_all():
+                return await asyncio.gather(*[query_tip_async(use_testnet=True) for _ in range(4)])
+
+            # Queries run concurrently
+            start = time.perf_counter()
+            tips = asyncio.run(query_all())
+            self.assertLess(time.perf_counter() - start, 0.8)
+            self.assertEqual([tip['slot'] for tip in tips], [1234] * 4)
+        finally:
+            set_runner(previous)
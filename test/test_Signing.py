@@ -0,0 +1,162 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import nacl.signing
+
+from automint.utils import cbor, sign_tx_native, witness_tx_native, assemble_tx_native, sign_batch
+from automint.utils.envelope import read_text_envelope
+from automint.utils.fees import estimate_tx_size
+from automint.utils.transaction import blake2b_256
+from automint.utils.utils import _assemble_tx_cmd, _witness_tx_cmd
+from automint.wallet import Wallet
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), 'golden')
+ADDRESS = 'addr1v909djup82fnvqzf5k0twztapyyq07laatzng95meqd2xpca3e3c0'
+
+# RFC 8032 Ed25519 test vectors 1 and 2 (seed, public key)
+KEYS = {
+    'payment': ('9d61b19deffd5a60ba844af492ec2cc44449c5697b326919703bac031cae7f60',
+                'd75a980182b10ab7d54bfed3c964073a0ee172f3daa62325af021a68f707511a'),
+    'policy': ('4ccd089b28ff96da9db6c346ec114e0f5b8a319f35aba624da8cf6ed4fb8a6fb',
+               '3d4017c3e843895a92b70aa74d1b7ebc9c982ccf2ec4968cc0cd55f12af4660c')
+}
+
+
+class SigningTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        for name, (seed, _) in KEYS.items():
+            with open(os.path.join(self.tmp_dir, f'{name}.skey'), 'w') as f:
+                json.dump({'type': 'PaymentSigningKeyShelley_ed25519',
+                           'description': 'Payment Signing Key',
+                           'cborHex': f'5820{seed}'}, f)
+            for ext, content in [('vkey', '{}'), ('addr', ADDRESS)]:
+                with open(os.path.join(self.tmp_dir, f'{name}.{ext}'), 'w') as f:
+                    f.write(content)
+
+        self.wallets = [Wallet(self.tmp_dir, 'payment'), Wallet(self.tmp_dir, 'policy')]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_signing_key(self):
+        for wallet in self.wallets:
+            key = wallet.get_signing_key()
+            self.assertEqual(bytes(key.verify_key).hex(), KEYS[wallet.name][1])
+
+    def test_signing_key_cached(self):
+        wallet = self.wallets[0]
+        key = wallet.get_signing_key()
+        os.remove(wallet.get_skey_path())
+        self.assertIs(wallet.get_signing_key(), key)
+
+    def test_sign_tx_native(self):
+        raw_matx_path = os.path.join(GOLDEN_DIR, 'minting_tx.raw')
+        signed_matx_path = sign_tx_native(self.tmp_dir, self.wallets, raw_matx_path)
+        self.assertEqual(signed_matx_path, os.path.join(self.tmp_dir, 'minting_tx.signed'))
+
+        _, _, raw_cbor = read_text_envelope(raw_matx_path)
+        envelope_type, _, signed_cbor = read_text_envelope(signed_matx_path)
+        self.assertEqual(envelope_type, 'Tx ConwayEra')
+
+        raw_items = cbor.split_array(raw_cbor)
+        signed_items = cbor.split_array(signed_cbor)
+        # Body, validity flag and auxiliary data are untouched
+        self.assertEqual(signed_items[0], raw_items[0])
+        self.assertEqual(signed_items[2:], raw_items[2:])
+
+        witness_set = cbor.loads(signed_items[1])
+        self.assertEqual(list(witness_set), [0, 1])
+        self.assertEqual(witness_set[1], cbor.loads(raw_items[1])[1])
+
+        witnesses = witness_set[0].value
+        self.assertEqual(sorted(vkey.hex() for vkey, _ in witnesses), sorted(public for _, public in KEYS.values()))
+        body_hash = blake2b_256(raw_items[0])
+        for vkey, signature in witnesses:
+            nacl.signing.VerifyKey(vkey).verify(body_hash, signature)
+
+        # The fee estimate accounts for the exact size of the witnesses
+        self.assertEqual(len(signed_cbor), estimate_tx_size(raw_cbor, witness_count=2))
+
+    def test_sign_twice(self):
+        raw_matx_path = os.path.join(GOLDEN_DIR, 'simple_tx.raw')
+        signed_matx_path = sign_tx_native(self.tmp_dir, self.wallets[0], raw_matx_path)
+        signed_again = sign_tx_native(self.tmp_dir, self.wallets, signed_matx_path, tx_name='again')
+
+        _, _, signed_cbor = read_text_envelope(signed_again)
+        witnesses = cbor.loads(signed_cbor)[1][0].value
+        self.assertEqual(len(witnesses), 2)
+
+    def read(self, path):
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def test_witness_and_assemble(self):
+        raw_matx_path = os.path.join(GOLDEN_DIR, 'minting_tx.raw')
+        witness_paths = [witness_tx_native(self.tmp_dir, wallet, raw_matx_path) for wallet in reversed(self.wallets)]
+        self.assertEqual(os.path.basename(witness_paths[0]), 'minting_tx.policy.witness')
+        self.assertEqual(self.read(witness_paths[0])['type'], 'TxWitness ConwayEra')
+
+        assembled = assemble_tx_native(self.tmp_dir, raw_matx_path, witness_paths, tx_name='assembled')
+        signed = sign_tx_native(self.tmp_dir, self.wallets, raw_matx_path)
+
+        # Ed25519 signatures are deterministic
+        self.assertEqual(self.read(assembled), self.read(signed))
+
+    def test_sign_batch(self):
+        raw_matx_paths = []
+        for i in range(6):
+            raw_matx_paths.append(shutil.copy(os.path.join(GOLDEN_DIR, 'simple_tx.raw' if i % 2 else 'minting_tx.raw'),
+                                              os.path.join(self.tmp_dir, f'tx{i}.raw')))
+        skey_paths = [wallet.get_skey_path() for wallet in self.wallets]
+
+        for max_workers in [1, 2]:
+            signed_paths = sign_batch(self.tmp_dir, raw_matx_paths, skey_paths, max_workers=max_workers)
+            self.assertEqual([os.path.basename(path) for path in signed_paths], [f'tx{i}.signed' for i in range(6)])
+            for raw_matx_path, signed_path in zip(raw_matx_paths, signed_paths):
+                expected = sign_tx_native(self.tmp_dir, self.wallets, raw_matx_path, tx_name='expected')
+                self.assertEqual(self.read(signed_path), self.read(expected))
+            self.assertEqual([name for name in os.listdir(self.tmp_dir) if name.endswith('.witness')], [])
+
+    def test_sign_batch_same_basename(self):
+        raw_matx_paths = []
+        for golden_name in ['simple_tx.raw', 'minting_tx.raw']:
+            tx_dir = os.path.join(self.tmp_dir, golden_name.split('.')[0])
+            os.makedirs(tx_dir)
+            raw_matx_paths.append(shutil.copy(os.path.join(GOLDEN_DIR, golden_name), os.path.join(tx_dir, 'matx.raw')))
+        skey_paths = [wallet.get_skey_path() for wallet in self.wallets]
+
+        with self.assertRaises(Exception):
+            sign_batch(self.tmp_dir, raw_matx_paths, skey_paths, max_workers=1)
+
+        # In separate batches, the transactions are signed with their own witnesses
+        for raw_matx_path in raw_matx_paths:
+            [signed_path] = sign_batch(self.tmp_dir, [raw_matx_path], skey_paths, max_workers=1)
+            expected = sign_tx_native(self.tmp_dir, self.wallets, raw_matx_path, tx_name='expected')
+            self.assertEqual(self.read(signed_path), self.read(expected))
+
+
+class WitnessCommandTests(unittest.TestCase):
+    def test_commands(self):
+        class SigningWallet(object):
+            name = 'policy'
+
+            def get_skey_path(self):
+                return 'keys/policy.skey'
+
+        cmd, witness_path = _witness_tx_cmd('out', SigningWallet(), 'out/tx-1.raw', True, 2)
+        self.assertEqual(witness_path, os.path.join('out', 'tx-1.policy.witness'))
+        self.assertEqual(cmd, ['conway', 'transaction', 'witness', '--tx-body-file', 'out/tx-1.raw',
+                               '--signing-key-file', 'keys/policy.skey', '--out-file', witness_path,
+                               '--testnet-magic', '2'])
+
+        cmd, signed_path = _assemble_tx_cmd('out', 'out/tx-1.raw', ['a.witness', 'b.witness'])
+        self.assertEqual(signed_path, os.path.join('out', 'tx-1.signed'))
+        self.assertEqual(cmd[-4:], ['--witness-file', 'a.witness', '--witness-file', 'b.witness'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from automint.account import Account
+from automint.utxo import UTXO, SpendLedger
+from automint.wallet import Wallet
+
+ADDRESS = 'addr1v909djup82fnvqzf5k0twztapyyq07laatzng95meqd2xpca3e3c0'
+TX_HASH = 'ca324bb0a46a9b96bc5c7b0feaf23159aafd5fe6d39a691412d5171013d67b1c'
+
+
+def lease_in_process(path, owner):
+    return SpendLedger(path).lease([f'{TX_HASH}#0', f'{TX_HASH}#1'], owner)
+
+
+class SpendLedgerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_lease(self):
+        ledger = SpendLedger()
+        self.assertTrue(ledger.lease(['a#0', 'a#1'], 'tx1'))
+        # All or nothing
+        self.assertFalse(ledger.lease(['a#1', 'a#2'], 'tx2'))
+        self.assertTrue(ledger.is_available('a#2'))
+        # Leasing again to the same owner is allowed
+        self.assertTrue(ledger.lease(['a#0'], 'tx1'))
+
+        self.assertEqual(sorted(ledger.release('tx1')), ['a#0', 'a#1'])
+        self.assertTrue(ledger.lease(['a#1', 'a#2'], 'tx2'))
+
+    def test_mark_spent(self):
+        ledger = SpendLedger()
+        ledger.lease(['a#0'], 'tx1')
+        self.assertEqual(ledger.mark_spent('tx1'), ['a#0'])
+        self.assertEqual(ledger.release('tx1'), [])
+        self.assertFalse(ledger.lease(['a#0'], 'tx1'))
+        self.assertEqual(ledger.unavailable(), {'a#0'})
+
+    def test_expiry(self):
+        ledger = SpendLedger(lease_duration=0.05, spent_duration=0.05)
+        ledger.lease(['a#0'], 'tx1')
+        ledger.lease(['a#1'], 'tx2')
+        ledger.mark_spent('tx2')
+        time.sleep(0.06)
+
+        self.assertEqual(ledger.unavailable(), set())
+        self.assertTrue(ledger.lease(['a#0', 'a#1'], 'tx3'))
+
+    def test_persisted(self):
+        path = os.path.join(self.tmp_dir, 'ledger.json')
+        SpendLedger(path).lease(['a#0'], 'tx1')
+
+        ledger = SpendLedger(path)
+        self.assertFalse(ledger.lease(['a#0'], 'tx2'))
+        ledger.mark_spent('tx1')
+        self.assertEqual(SpendLedger(path).leased_to('tx1'), [])
+        self.assertFalse(SpendLedger(path).is_available('a#0'))
+
+    def test_queries_do_not_write(self):
+        path = os.path.join(self.tmp_dir, 'ledger.json')
+        ledger = SpendLedger(path)
+        ledger.lease(['a#0'], 'tx1')
+        mtime_ns = os.stat(path).st_mtime_ns
+
+        time.sleep(0.01)
+        self.assertEqual(ledger.unavailable(), {'a#0'})
+        self.assertFalse(ledger.is_available('a#0'))
+        self.assertEqual(ledger.leased_to('tx1'), ['a#0'])
+        # Refused lease and release of nothing change no entry
+        self.assertFalse(ledger.lease(['a#0'], 'tx2'))
+        self.assertEqual(ledger.release('tx2'), [])
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime_ns)
+
+        self.assertEqual(ledger.release('tx1'), ['a#0'])
+        self.assertNotEqual(os.stat(path).st_mtime_ns, mtime_ns)
+        self.assertEqual(SpendLedger(path).unavailable(), set())
+
+    def test_shared_between_processes(self):
+        path = os.path.join(self.tmp_dir, 'ledger.json')
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lease_in_process, [path] * 8, [f'tx{i}' for i in range(8)]))
+
+        self.assertEqual(results.count(True), 1)
+
+    def test_wallet_select(self):
+        keys_dir = os.path.join(self.tmp_dir, 'keys')
+        os.makedirs(keys_dir)
+        for ext, content in [('skey', '{}'), ('vkey', '{}'), ('addr', ADDRESS)]:
+            with open(os.path.join(keys_dir, f'payment.{ext}'), 'w') as f:
+                f.write(content)
+
+        wallet = Wallet(keys_dir, 'payment')
+        for i in range(3):
+            wallet.UTXOs.add(UTXO(f'{TX_HASH} {i} {(i + 1) * 1000000} lovelace + TxOutDatumNone'))
+
+        target = Account().add_lovelace(1500000)
+        first = wallet.select_utxos(target, owner='tx1')
+        second = wallet.select_utxos(target, owner='tx2')
+
+        self.assertEqual([utxo.index for utxo in first.get_inputs()], [2])
+        self.assertEqual([utxo.index for utxo in second.get_inputs()], [1])
+        self.assertEqual(len(wallet.get_available_utxos()), 1)
+        self.assertRaises(Exception, wallet.select_utxos, target, owner='tx3')
+
+        wallet.release_utxos('tx2')
+        self.assertEqual(len(wallet.get_available_utxos()), 2)
+        # Without an owner nothing is leased
+        self.assertEqual(len(wallet.select_utxos(target).get_inputs()), 1)
+        self.assertEqual(len(wallet.get_available_utxos()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import time
+import unittest
+
+from automint.utils import TipProvider
+
+
+class TipProviderTests(unittest.TestCase):
+    def setUp(self):
+        self.queries = []
+        self.tip = {'slot': 1000, 'epoch': 100, 'slotsToEpochEnd': 500}
+
+    def query(self, use_testnet=False, testnet_magic=None):
+        self.queries.append((use_testnet, testnet_magic))
+        return dict(self.tip)
+
+    def test_queries_once(self):
+        provider = TipProvider(query=self.query)
+        slots = [provider.current_slot() for _ in range(100)]
+
+        self.assertEqual(len(self.queries), 1)
+        self.assertTrue(all(1000 <= slot <= 1001 for slot in slots))
+
+    def test_extrapolates_slot(self):
+        provider = TipProvider(slot_length=0.01, query=self.query)
+        provider.sync()
+        time.sleep(0.1)
+        tip = provider.get_tip()
+
+        self.assertEqual(len(self.queries), 1)
+        self.assertGreaterEqual(tip['slot'], 1010)
+        self.assertEqual(tip['slot'] + tip['slotsToEpochEnd'], 1500)
+        self.assertEqual(tip['epoch'], 100)
+
+    def test_resync_interval(self):
+        provider = TipProvider(resync_interval=0.05, query=self.query)
+        provider.current_slot()
+        time.sleep(0.06)
+        self.tip['slot'] = 2000
+
+        self.assertEqual(provider.current_slot(), 2000)
+        self.assertEqual(len(self.queries), 2)
+
+    def test_resync_at_end_of_epoch(self):
+        self.tip['slotsToEpochEnd'] = 5
+        provider = TipProvider(slot_length=0.01, query=self.query)
+        provider.current_slot()
+        time.sleep(0.1)
+        self.tip = {'slot': 1010, 'epoch': 101, 'slotsToEpochEnd': 1000}
+
+        self.assertEqual(provider.get_tip()['epoch'], 101)
+        self.assertEqual(len(self.queries), 2)
+
+    def test_keyed_by_network(self):
+        provider = TipProvider(query=self.query)
+        provider.current_slot()
+        provider.current_slot(use_testnet=True, testnet_magic=2)
+        provider.current_slot(use_testnet=True, testnet_magic=2)
+
+        self.assertEqual(self.queries[1], (True, 2))
+        self.assertEqual(len(self.queries), 2)
+
+    def test_query_failure(self):
+        provider = TipProvider(query=lambda **kwargs: {})
+        self.assertRaises(Exception, provider.current_slot)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from automint.receivers import TxReceiver, MintingReceiver
+from automint.utils import build_raw_transaction_native, cbor, convert_to_hex, unique_tx_name, write_policy_script
+from automint.utils.envelope import read_text_envelope
+from automint.utils.transaction import blake2b_256, encode_metadata
+from automint.utils.utils import _build_raw_transaction_cmd, _sign_tx_cmd
+from automint.utxo import UTXO
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), 'golden')
+ADDRESS = 'addr1v909djup82fnvqzf5k0twztapyyq07laatzng95meqd2xpca3e3c0'
+POLICY_ID = '1406fbb1af2a3f005518e921c016f585a4039b976f7959bfa6ec2486'
+TX_HASH = 'ca324bb0a46a9b96bc5c7b0feaf23159aafd5fe6d39a691412d5171013d67b1c'
+
+
+class TransactionTests(unittest.TestCase):
+    '''The golden files pin the serialised transactions. The current files
+    were written by the in-process builder, so they only catch changes of
+    its output: they have not been checked against cardano-cli yet. Running
+    network-tests/golden.py with `cardano-cli conway transaction build-raw`
+    replaces them with the CLI's transactions.'''
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def assertMatchesGolden(self, raw_matx_path, golden_name):
+        with open(raw_matx_path, 'r') as f, open(os.path.join(GOLDEN_DIR, golden_name), 'r') as golden:
+            self.assertEqual(f.read(), golden.read())
+
+    def test_simple_transaction(self):
+        utxo = UTXO(f'{TX_HASH} 0 3000000 lovelace + TxOutDatumNone')
+        receiver = utxo.convert_to_receiver(ADDRESS)
+        receiver.remove_lovelace(170000)
+
+        raw_matx_path = build_raw_transaction_native(self.tmp_dir, utxo, receiver, fee=170000)
+        self.assertMatchesGolden(raw_matx_path, 'simple_tx.raw')
+
+        envelope_type, _, tx_cbor = read_text_envelope(raw_matx_path)
+        self.assertEqual(envelope_type, 'Unwitnessed Tx ConwayEra')
+        body, witness_set, is_valid, auxiliary_data = cbor.loads(tx_cbor)
+        self.assertEqual(body[0], cbor.Tag(258, [[bytes.fromhex(TX_HASH), 0]]))
+        self.assertEqual(body[1][0][1], 2830000)
+        self.assertEqual(body[2], 170000)
+        self.assertEqual(witness_set, {})
+        self.assertIsNone(auxiliary_data)
+
+    def test_minting_transaction(self):
+        utxo = UTXO(f'{TX_HASH} 1 5000000 lovelace + TxOutDatumNone')
+        tx_receiver = utxo.convert_to_receiver(ADDRESS)
+        minting_receiver = MintingReceiver()
+        for token in ['TestToken01', 'TestToken00']:
+            tx_receiver.add_native_token(f'{POLICY_ID}.{token}', 1)
+            minting_receiver.add_native_token(f'{POLICY_ID}.{token}', 1)
+        tx_receiver.remove_lovelace(200000)
+
+        raw_matx_path = build_raw_transaction_native(self.tmp_dir, utxo, [tx_receiver], minting_receiver,
+                                                     fee=200000,
+                                                     metadata='test/metadata_test_1.json',
+                                                     invalid_after=89000000,
+                                                     minting_script=os.path.join(GOLDEN_DIR, 'policy.script'))
+        self.assertMatchesGolden(raw_matx_path, 'minting_tx.raw')
+
+        _, _, tx_cbor = read_text_envelope(raw_matx_path)
+        body, witness_set, _, _ = cbor.loads(tx_cbor)
+        _, _, _, auxiliary_data = cbor.split_array(tx_cbor)
+
+        policy = bytes.fromhex(POLICY_ID)
+        self.assertEqual(body[1][0][1], [4800000, {policy: {b'TestToken00': 1, b'TestToken01': 1}}])
+        self.assertEqual(list(body[9][policy]), [b'TestToken00', b'TestToken01'])
+        self.assertEqual(body[3], 89000000)
+        self.assertEqual(body[7], blake2b_256(auxiliary_data))
+        self.assertEqual(cbor.loads(auxiliary_data).value[0][721][123]['tokenA']['name'], 'Token A')
+        self.assertEqual(witness_set[1].value[0][0], 1)
+
+    def test_metadata_no_schema(self):
+        '''Map keys are converted and sorted as by the no schema mapping of
+        cardano-cli'''
+        metadata = encode_metadata({'721': {'name': 'x', 'aa': 0, '0xab': '0xcd', '10': [], '2': '0xzz', '-1': 1}})
+        self.assertEqual(list(metadata[721].items()),
+                         [(2, '0xzz'), (10, []), (-1, 1), (b'\xab', b'\xcd'), ('aa', 0), ('name', 'x')])
+
+        with self.assertRaises(Exception):
+            encode_metadata({'721': {'1': 'a', '01': 'b'}})
+
+    def test_zero_fee_draft(self):
+        '''Drafts with a fee of 0 have outputs without lovelace, as with build-raw'''
+        utxo = UTXO(f'{TX_HASH} 0 3000000 lovelace + TxOutDatumNone')
+        raw_matx_path = build_raw_transaction_native(self.tmp_dir, utxo, utxo.convert_to_receiver(ADDRESS))
+        _, _, tx_cbor = read_text_envelope(raw_matx_path)
+        self.assertEqual(cbor.loads(tx_cbor)[0][1][0][1], 0)
+
+    def test_negative_output(self):
+        utxo = UTXO(f'{TX_HASH} 0 3000000 lovelace + TxOutDatumNone')
+        receiver = utxo.convert_to_receiver(ADDRESS)
+        receiver.remove_native_token(f'{POLICY_ID}.TestToken00', 1)
+        with self.assertRaises(Exception):
+            build_raw_transaction_native(self.tmp_dir, utxo, receiver, fee=170000)
+
+    def test_concurrent_builds(self):
+        utxo = UTXO(f'{TX_HASH} 0 3000000 lovelace + TxOutDatumNone')
+
+        def build(fee):
+            receiver = utxo.convert_to_receiver(ADDRESS)
+            receiver.remove_lovelace(fee)
+            return fee, build_raw_transaction_native(self.tmp_dir, utxo, receiver, fee=fee, tx_name=unique_tx_name())
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(build, range(170000, 170064)))
+
+        self.assertEqual(len(set(path for _, path in results)), 64)
+        for fee, raw_matx_path in results:
+            _, _, tx_cbor = read_text_envelope(raw_matx_path)
+            self.assertEqual(cbor.loads(tx_cbor)[0][2], fee)
+
+    def test_artifact_names(self):
+        class SigningWallet(object):
+            def get_skey_path(self):
+                return 'payment.skey'
+
+        utxo = UTXO(f'{TX_HASH} 0 3000000 lovelace + TxOutDatumNone')
+        receiver = utxo.convert_to_receiver(ADDRESS)
+
+        _, raw_matx_path = _build_raw_transaction_cmd(self.tmp_dir, utxo, receiver, None, 0, None, None, None)
+        self.assertEqual(raw_matx_path, os.path.join(self.tmp_dir, 'matx.raw'))
+        _, signed_matx_path = _sign_tx_cmd(self.tmp_dir, SigningWallet(), raw_matx_path, False, None)
+        self.assertEqual(signed_matx_path, os.path.join(self.tmp_dir, 'matx.signed'))
+
+        _, raw_matx_path = _build_raw_transaction_cmd(self.tmp_dir, utxo, receiver, None, 0, None, None, None, 'tx-7')
+        self.assertEqual(raw_matx_path, os.path.join(self.tmp_dir, 'tx-7.raw'))
+        _, signed_matx_path = _sign_tx_cmd(self.tmp_dir, SigningWallet(), raw_matx_path, False, None)
+        self.assertEqual(signed_matx_path, os.path.join(self.tmp_dir, 'tx-7.signed'))
+
+        script_path = write_policy_script(self.tmp_dir, '00' * 28, script_name='policy-7')
+        self.assertEqual(script_path, os.path.join(self.tmp_dir, 'policy-7.script'))
+        self.assertNotEqual(unique_tx_name(), unique_tx_name())
+
+    def test_build_raw_cmd_arguments(self):
+        utxo = UTXO(f'{TX_HASH} 1 5000000 lovelace + TxOutDatumNone')
+        tx_receiver = utxo.convert_to_receiver(ADDRESS)
+        minting_receiver = MintingReceiver()
+        for token in ['TestToken00', 'TestToken01']:
+            tx_receiver.add_native_token(f'{POLICY_ID}.{token}', 1)
+            minting_receiver.add_native_token(f'{POLICY_ID}.{token}', 1)
+
+        # Commands are run without a shell, so no argument may be quoted
+        cmd_builder, _ = _build_raw_transaction_cmd(self.tmp_dir, utxo, [tx_receiver], minting_receiver,
+                                                    200000, None, None, None)
+        assets = f'1 {POLICY_ID}.{convert_to_hex("TestToken00")} + 1 {POLICY_ID}.{convert_to_hex("TestToken01")}'
+        tx_out = cmd_builder[cmd_builder.index('--tx-out') + 1]
+        self.assertEqual(tx_out, f'{ADDRESS}+5000000+{assets}')
+        self.assertIn(f'--mint={assets}', cmd_builder)
+        self.assertFalse(any('"' in arg for arg in cmd_builder))
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from automint.account import Account
+from automint.utils import build_raw_transaction_native, cbor, get_tx_id
+from automint.utils.envelope import read_text_envelope, write_text_envelope
+from automint.utxo import UTXO, UTXOSet, iter_utxo_table, parse_utxo_table, parse_utxo_json, utxos_from_transaction
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), 'golden')
+ADDRESS = 'addr1v909djup82fnvqzf5k0twztapyyq07laatzng95meqd2xpca3e3c0'
+POLICY_ID = '1406fbb1af2a3f005518e921c016f585a4039b976f7959bfa6ec2486'
+
+UTXO_TABLE = '''                           TxHash                                 TxIx        Amount
+--------------------------------------------------------------------------------------
+abcdef01     0        5000000 lovelace + TxOutDatumNone
+abcdef02     1        3000000 lovelace + 2 12345.746f6b656e41 + 1 12345.746f6b656e42 + TxOutDatumNone
+'''
+
+UTXO_JSON = json.dumps({
+    'abcdef01#0': {
+        'address': 'addr_test1...',
+        'datum': None,
+        'value': {
+            'lovelace': 5000000
+        }
+    },
+    'abcdef02#1': {
+        'address': 'addr_test1...',
+        'inlineDatum': {'constructor': 0, 'fields': []},
+        'value': {
+            'lovelace': 3000000,
+            '12345': {
+                '746f6b656e41': 2,
+                '746f6b656e42': 1
+            }
+        }
+    }
+})
+
+
+class UTXOTests(unittest.TestCase):
+    def test_parse_utxo_str(self):
+        utxo = UTXO('abcdef02 1 3000000 lovelace + 2 12345.746f6b656e41 + TxOutDatumNone')
+        self.assertEqual(utxo.get_utxo_identifier(), 'abcdef02#1')
+        self.assertEqual(utxo.get_account(), Account().add_lovelace(3000000).add_native_token('12345.tokenA', 2))
+
+    def test_parse_utxo_str_without_datum(self):
+        utxo = UTXO('abcdef01 0 5000000 lovelace')
+        self.assertEqual(utxo.size(), 1)
+        self.assertEqual(utxo.get_account(), Account().add_lovelace(5000000))
+
+        utxos = UTXOSet([utxo])
+        self.assertIn('abcdef01#0', utxos)
+
+    def test_parse_utxo_json_matches_table(self):
+        '''Both query output formats should result in the same UTXOs'''
+        from_table = {str(utxo): utxo.get_account() for utxo in parse_utxo_table(UTXO_TABLE)}
+        from_json = {str(utxo): utxo.get_account() for utxo in parse_utxo_json(UTXO_JSON)}
+
+        self.assertEqual(from_table.keys(), {'abcdef01#0', 'abcdef02#1'})
+        self.assertEqual(from_table, from_json)
+        self.assertEqual(from_json['abcdef02#1'].get_native_token('12345.tokenB')['quantity'], 1)
+
+    def test_iter_utxo_table_lazy(self):
+        '''UTXOs should be parsed only as lines are consumed'''
+        consumed = []
+
+        def lines():
+            for line in UTXO_TABLE.split('\n'):
+                consumed.append(line)
+                yield line
+
+        utxos = iter_utxo_table(lines())
+        self.assertEqual(str(next(utxos)), 'abcdef01#0')
+        self.assertEqual(len(consumed), 3)
+        self.assertEqual([str(utxo) for utxo in utxos], ['abcdef02#1'])
+
+    def test_lazy_account(self):
+        '''Native tokens should only be decoded when the account is requested'''
+        utxo = UTXO('abcdef02 1 3000000 lovelace + 2 12345.746f6b656e41 + 1 12345.746f6b656e42 + TxOutDatumNone')
+        self.assertEqual(utxo.get_lovelace(), 3000000)
+        self.assertEqual(utxo.size(), 3)
+        self.assertIsNone(utxo._account)
+
+        account = utxo.get_account()
+        self.assertIs(utxo.get_account(), account)
+        self.assertEqual(utxo.size(), 3)
+        self.assertFalse(hasattr(utxo, '__dict__'))
+
+    def test_utxos_from_transaction(self):
+        tx_path = os.path.join(GOLDEN_DIR, 'minting_tx.raw')
+        _, _, tx_cbor = read_text_envelope(tx_path)
+        tx_id = hashlib.blake2b(cbor.split_array(tx_cbor)[0], digest_size=32).hexdigest()
+        self.assertEqual(get_tx_id(tx_cbor), tx_id)
+
+        utxos = utxos_from_transaction(tx_path)
+        self.assertEqual([utxo.get_utxo_identifier() for utxo in utxos], [f'{tx_id}#0'])
+        self.assertEqual(utxos[0].get_lovelace(), 4800000)
+        self.assertEqual(utxos[0].get_account().get_native_token(f'{POLICY_ID}.TestToken00')['quantity'], 1)
+        self.assertEqual(utxos[0].size(), 3)
+
+        self.assertEqual(len(utxos_from_transaction(tx_path, address=ADDRESS)), 1)
+        other_address = 'addr1vx2fxv2umyhttkxyxp8x0dlpdt3k6cwng5pxj3jhsydzers66hrl8'
+        self.assertEqual(utxos_from_transaction(tx_path, address=other_address), [])
+
+    def test_map_outputs(self):
+        '''Outputs built by cardano-cli may use the Babbage map format'''
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            body = {0: cbor.Tag(258, [[bytes(32), 0]]),
+                    1: [{0: b'\x61' + bytes(28), 1: [2000000, {bytes.fromhex(POLICY_ID): {b'tokenA': 5}}]}],
+                    2: 170000}
+            tx_path = write_text_envelope(os.path.join(tmp_dir, 'tx.raw'), 'Unwitnessed Tx ConwayEra', '',
+                                          cbor.dumps([body, {}, True, None]))
+
+            utxo, = utxos_from_transaction(tx_path)
+            self.assertEqual(utxo.index, 0)
+            self.assertEqual(utxo.get_account().get_native_token(f'{POLICY_ID}.tokenA')['quantity'], 5)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_chained_transactions(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            utxo = UTXO('ca324bb0a46a9b96bc5c7b0feaf23159aafd5fe6d39a691412d5171013d67b1c 0 3000000 lovelace + TxOutDatumNone')
+            receiver = utxo.convert_to_receiver(ADDRESS)
+            receiver.remove_lovelace(170000)
+            first = build_raw_transaction_native(tmp_dir, utxo, receiver, fee=170000, tx_name='first')
+
+            change, = utxos_from_transaction(first, address=ADDRESS)
+            receiver = change.convert_to_receiver(ADDRESS)
+            receiver.remove_lovelace(170000)
+            second = build_raw_transaction_native(tmp_dir, change, receiver, fee=170000, tx_name='second')
+
+            _, _, tx_cbor = read_text_envelope(second)
+            body = cbor.loads(tx_cbor)[0]
+            self.assertEqual(body[0].value, [[bytes.fromhex(get_tx_id(read_text_envelope(first)[2])), 0]])
+            self.assertEqual(body[1][0][1], 2660000)
+        finally:
+            shutil.rmtree(tmp_dir)
@@ -0,0 +1,85 @@
+import unittest
+
+from automint.utxo import UTXO, UTXOSet
+
+
+def make_utxo(tx_hash, lovelace, assets=()):
+    assets_str = ''.join(f' + 1 12345.{asset}' for asset in assets)
+    return UTXO(f'{tx_hash} 0 {lovelace} lovelace{assets_str} + TxOutDatumNone')
+
+
+class UTXOSetTests(unittest.TestCase):
+    def setUp(self):
+        self.utxos = UTXOSet([
+            make_utxo('aa', 1000000),
+            make_utxo('bb', 5000000, ['41']),
+            make_utxo('cc', 3000000, ['41', '42']),
+            make_utxo('dd', 2500000),
+            make_utxo('ee', 9000000, ['42']),
+        ])
+
+    def test_mapping(self):
+        self.assertEqual(len(self.utxos), 5)
+        self.assertEqual(str(self.utxos['bb#0']), 'bb#0')
+        self.assertEqual(set(self.utxos), {'aa#0', 'bb#0', 'cc#0', 'dd#0', 'ee#0'})
+        self.assertIsNone(self.utxos.get('ff#0'))
+
+    def test_smallest_with_lovelace(self):
+        self.assertEqual(str(self.utxos.smallest_with_lovelace(2000000)), 'dd#0')
+        self.assertEqual(str(self.utxos.smallest_with_lovelace(3000000)), 'cc#0')
+        self.assertIsNone(self.utxos.smallest_with_lovelace(10000000))
+
+    def test_smallest_size_with_lovelace(self):
+        self.assertEqual(str(self.utxos.smallest_size_with_lovelace(2000000)), 'dd#0')
+        self.assertEqual(str(self.utxos.smallest_size_with_lovelace(3000000)), 'bb#0')
+        self.assertEqual(str(self.utxos.smallest_size_with_lovelace(6000000)), 'ee#0')
+
+    def test_with_asset(self):
+        self.assertEqual([str(utxo) for utxo in self.utxos.with_asset('12345.A')], ['bb#0', 'cc#0'])
+        self.assertEqual(self.utxos.with_asset('12345.C'), [])
+
+        # Index is maintained after being built
+        self.utxos.remove('bb#0')
+        self.utxos.add(make_utxo('ff', 2000000, ['41']))
+        self.assertEqual([str(utxo) for utxo in self.utxos.with_asset('12345.A')], ['cc#0', 'ff#0'])
+
+    def test_remove(self):
+        utxo = self.utxos.remove('dd#0')
+        self.assertEqual(str(utxo), 'dd#0')
+        self.assertNotIn('dd#0', self.utxos)
+        self.assertEqual(str(self.utxos.smallest_with_lovelace(2000000)), 'cc#0')
+        self.assertEqual(str(self.utxos.smallest_size_with_lovelace(2000000)), 'bb#0')
+
+        with self.assertRaises(KeyError):
+            self.utxos.remove('dd#0')
+
+    def assertIndexes(self, utxos):
+        self.assertEqual(utxos._by_lovelace, sorted((utxo.get_lovelace(), key) for key, utxo in utxos.items()))
+        for size, keys in utxos._by_size.items():
+            self.assertEqual(keys, sorted((utxos[key].get_lovelace(), key) for key in utxos if utxos[key].size() == size))
+        self.assertEqual(sum(len(keys) for keys in utxos._by_size.values()), len(utxos))
+
+    def test_bulk_load(self):
+        self.assertIndexes(self.utxos)
+
+        # Later UTXOs replace earlier ones with the same identifier
+        utxos = UTXOSet([make_utxo('aa', 1000000), make_utxo('bb', 2000000), make_utxo('aa', 3000000, ['41'])])
+        self.assertEqual(len(utxos), 2)
+        self.assertEqual(utxos['aa#0'].get_lovelace(), 3000000)
+        self.assertIndexes(utxos)
+        self.assertEqual(str(utxos.smallest_size_with_lovelace(2500000)), 'aa#0')
+
+    def test_without(self):
+        self.utxos.with_asset('12345.A')
+        subset = self.utxos.without({'bb#0', 'dd#0', 'ff#0'})
+
+        self.assertEqual(set(subset), {'aa#0', 'cc#0', 'ee#0'})
+        self.assertEqual(len(self.utxos), 5)
+        self.assertIndexes(subset)
+        self.assertEqual([str(utxo) for utxo in subset.with_asset('12345.A')], ['cc#0'])
+        self.assertEqual(str(subset.smallest_with_lovelace(2000000)), 'cc#0')
+
+        # The subset is independent of the set it was taken from
+        subset.remove('cc#0')
+        self.assertIn('cc#0', self.utxos)
+        self.assertIndexes(self.utxos)